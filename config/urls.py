@@ -14,17 +14,22 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from stories.views import static_asset
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('stories.urls')),
+    # Fingerprinted, precompressed assets from STATIC_ROOT
+    re_path(rf"^{re.escape(settings.STATIC_URL.lstrip('/'))}(?P<name>.+)$", static_asset, name='static_asset'),
 ]
 
 # Serve media files in development
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -9,6 +9,7 @@ class VocalTalesApp {
         this.speechSynthesis = window.speechSynthesis;
         this.currentUtterance = null;
         this.isPlaying = false;
+        this.nextStoriesUrl = null;  // cursor URL of the next story library page
         
         this.initializeApp();
     }
@@ -33,6 +34,9 @@ class VocalTalesApp {
         document.getElementById('downloadAudioBtn').addEventListener('click', () => this.downloadAudio());
         document.getElementById('favoriteBtn').addEventListener('click', () => this.toggleFavorite());
         document.getElementById('newStoryBtn').addEventListener('click', () => this.createNewStory());
+        
+        // Story library pages
+        document.getElementById('loadMoreStoriesBtn').addEventListener('click', () => this.loadMoreStories());
     }
     
     checkBrowserSupport() {
@@ -246,25 +250,33 @@ class VocalTalesApp {
             btnLoading.classList.remove('hidden');
             loadingOverlay.classList.remove('hidden');
             
-            const response = await fetch('/api/stories/create/', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': this.getCSRFToken()
-                },
-                body: JSON.stringify(storyData)
-            });
-            
-            const data = await response.json();
-            
-            if (data.success) {
-                this.currentStory = data.story;
-                this.displayStory(data.story);
-                this.loadStoryLibrary(); // Refresh library
-            } else {
-                throw new Error(data.error || 'Failed to generate story');
+            // Stream the story as it is written; fall back to a background job
+            let story = await this.streamStory(storyData, loadingOverlay);
+            
+            if (!story) {
+                const response = await fetch('/api/stories/create/', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': this.getCSRFToken()
+                    },
+                    body: JSON.stringify(storyData)
+                });
+                
+                const data = await response.json();
+                
+                if (!data.success) {
+                    throw new Error(data.error || 'Failed to generate story');
+                }
+                
+                // Generation runs in the background; poll the job until it finishes
+                story = await this.waitForStory(data.status_url);
             }
             
+            this.currentStory = story;
+            this.displayStory(story);
+            this.loadStoryLibrary(); // Refresh library
+            
         } catch (error) {
             console.error('Error generating story:', error);
             this.showError('Oops! Our storyteller is taking a break. Please try again!');
@@ -277,6 +289,94 @@ class VocalTalesApp {
         }
     }
     
+    async streamStory(storyData, loadingOverlay) {
+        if (!window.ReadableStream || !window.TextDecoder) {
+            return null;
+        }
+        
+        const response = await fetch('/api/stories/stream/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.getCSRFToken()
+            },
+            body: JSON.stringify(storyData)
+        });
+        
+        if (!response.ok || !response.body) {
+            return null;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const titleEl = document.getElementById('storyTitle');
+        const textEl = document.getElementById('storyText');
+        let buffer = '';
+        let story = null;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            
+            for (const frame of frames) {
+                const event = this.parseSSEFrame(frame);
+                
+                if (event.type === 'title') {
+                    // First words are here: swap the spinner for the story view
+                    loadingOverlay.classList.add('hidden');
+                    document.getElementById('storyCreator').classList.add('hidden');
+                    document.getElementById('storyDisplay').classList.remove('hidden');
+                    titleEl.textContent = event.data.text;
+                    textEl.textContent = '';
+                } else if (event.type === 'content') {
+                    textEl.textContent += event.data.text;
+                } else if (event.type === 'done') {
+                    story = event.data.story;
+                } else if (event.type === 'error') {
+                    throw new Error(event.data.error);
+                }
+            }
+        }
+        
+        if (!story || story.status !== 'completed') {
+            throw new Error('Story generation failed');
+        }
+        return story;
+    }
+    
+    parseSSEFrame(frame) {
+        let type = 'message';
+        let data = '';
+        for (const line of frame.split('\n')) {
+            if (line.startsWith('event: ')) {
+                type = line.slice(7);
+            } else if (line.startsWith('data: ')) {
+                data += line.slice(6);
+            }
+        }
+        return { type, data: data ? JSON.parse(data) : {} };
+    }
+    
+    async waitForStory(statusUrl, intervalMs = 1000) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+            
+            if (job.status === 'done') {
+                return job.story;
+            }
+            if (job.status === 'failed') {
+                throw new Error('Story generation failed');
+            }
+            
+            await new Promise(resolve => setTimeout(resolve, intervalMs));
+        }
+    }
+    
     displayStory(story) {
         // Hide creator, show story
         document.getElementById('storyCreator').classList.add('hidden');
@@ -326,50 +426,151 @@ class VocalTalesApp {
     
     async playWithGTTS(text, language) {
         try {
-            console.log('Generating audio with gTTS for language:', language);
+            // Pre-rendered narration is served straight from disk, no synthesis wait
+            let audioUrl = await this.preRenderedAudioUrl();
+            
+            if (!audioUrl) {
+                console.log('Generating audio with gTTS for language:', language);
+                
+                const response = await fetch('/api/tts/gtts/', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': this.getCSRFToken()
+                    },
+                    body: JSON.stringify({
+                        text: text,
+                        language: language
+                    })
+                });
+                
+                if (!response.ok) {
+                    throw new Error('gTTS API failed');
+                }
+                audioUrl = await this.audioUrlFromResponse(response);
+            }
+            
+            this.currentAudio = new Audio(audioUrl);
+            this.trackListening(this.currentAudio);
+            
+            this.currentAudio.onended = () => {
+                console.log('gTTS audio ended');
+                document.getElementById('playBtn').classList.remove('hidden');
+                document.getElementById('pauseBtn').classList.add('hidden');
+                if (audioUrl.startsWith('blob:')) {
+                    URL.revokeObjectURL(audioUrl);
+                }
+            };
+            
+            this.currentAudio.onerror = (error) => {
+                console.error('Audio playback error:', error);
+                this.showError('Could not play audio');
+                document.getElementById('playBtn').classList.remove('hidden');
+                document.getElementById('pauseBtn').classList.add('hidden');
+            };
+            
+            await this.currentAudio.play();
+            console.log('gTTS audio started playing');
             
-            const response = await fetch('/api/tts/gtts/', {
+        } catch (error) {
+            console.error('gTTS error:', error);
+            this.showError('Google TTS failed. Trying browser voice...');
+            this.playWithBrowserTTS(text, language);
+        }
+    }
+    
+    async trackListening(audio) {
+        // Report listening progress every 15 seconds, on pause and when the story ends
+        if (!this.currentStory?.id) {
+            return;
+        }
+        try {
+            const response = await fetch(`/api/stories/${this.currentStory.id}/sessions/`, {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json',
                     'X-CSRFToken': this.getCSRFToken()
-                },
-                body: JSON.stringify({
-                    text: text,
-                    language: language
-                })
+                }
             });
+            if (!response.ok) {
+                return;
+            }
+            const session = await response.json();
+            let lastReported = 0;
+            
+            const report = (completed = false) => {
+                lastReported = audio.currentTime;
+                fetch(session.progress_url, {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'X-CSRFToken': this.getCSRFToken()
+                    },
+                    body: JSON.stringify({ position: audio.currentTime, completed: completed }),
+                    keepalive: true
+                }).catch(error => console.warn('Could not report listening progress:', error));
+            };
             
+            audio.addEventListener('timeupdate', () => {
+                if (audio.currentTime - lastReported >= 15) {
+                    report();
+                }
+            });
+            audio.addEventListener('pause', () => {
+                if (!audio.ended) {
+                    report();
+                }
+            });
+            audio.addEventListener('ended', () => report(true));
+        } catch (error) {
+            console.warn('Could not start listening session:', error);
+        }
+    }
+    
+    async preRenderedAudioUrl() {
+        if (this.currentStory.audio_url) {
+            return this.currentStory.audio_url;
+        }
+        
+        // Rendering finishes shortly after the story; check once more before synthesizing
+        try {
+            const response = await fetch(`/api/stories/${this.currentStory.id}/`);
             if (response.ok) {
-                const audioBlob = await response.blob();
-                const audioUrl = URL.createObjectURL(audioBlob);
-                this.currentAudio = new Audio(audioUrl);
-                
-                this.currentAudio.onended = () => {
-                    console.log('gTTS audio ended');
-                    document.getElementById('playBtn').classList.remove('hidden');
-                    document.getElementById('pauseBtn').classList.add('hidden');
-                    URL.revokeObjectURL(audioUrl);
-                };
-                
-                this.currentAudio.onerror = (error) => {
-                    console.error('Audio playback error:', error);
-                    this.showError('Could not play audio');
-                    document.getElementById('playBtn').classList.remove('hidden');
-                    document.getElementById('pauseBtn').classList.add('hidden');
-                };
-                
-                await this.currentAudio.play();
-                console.log('gTTS audio started playing');
-                
-            } else {
-                throw new Error('gTTS API failed');
+                const story = await response.json();
+                this.currentStory.audio_url = story.audio_url;
             }
         } catch (error) {
-            console.error('gTTS error:', error);
-            this.showError('Google TTS failed. Trying browser voice...');
-            this.playWithBrowserTTS(text, language);
+            console.warn('Could not refresh story audio:', error);
+        }
+        return this.currentStory.audio_url;
+    }
+    
+    async audioUrlFromResponse(response) {
+        // Append MP3 chunks as they arrive so playback starts with the first sentence
+        if (window.MediaSource && MediaSource.isTypeSupported('audio/mpeg') && response.body) {
+            const mediaSource = new MediaSource();
+            
+            mediaSource.addEventListener('sourceopen', async () => {
+                const sourceBuffer = mediaSource.addSourceBuffer('audio/mpeg');
+                const reader = response.body.getReader();
+                
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    
+                    await new Promise(resolve => {
+                        sourceBuffer.addEventListener('updateend', resolve, { once: true });
+                        sourceBuffer.appendBuffer(value);
+                    });
+                }
+                mediaSource.endOfStream();
+            }, { once: true });
+            
+            return URL.createObjectURL(mediaSource);
         }
+        
+        // Fallback: wait for the whole file
+        const audioBlob = await response.blob();
+        return URL.createObjectURL(audioBlob);
     }
     
     startReadAlong() {
@@ -417,48 +618,16 @@ class VocalTalesApp {
         }, delay);
     }
     
-    async downloadAudio() {
+    downloadAudio() {
         if (!this.currentStory) return;
         
-        const storyLanguage = this.currentStory.request?.language || 'en';
-        let storyText = this.cleanTextForSpeech(
-            document.getElementById('storyText').textContent || this.currentStory.content,
-            storyLanguage
-        );
-        
-        try {
-            const response = await fetch('/api/tts/download/', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                    'X-CSRFToken': this.getCSRFToken()
-                },
-                body: JSON.stringify({
-                    text: storyText,
-                    language: storyLanguage,
-                    title: this.currentStory.title
-                })
-            });
-            
-            if (response.ok) {
-                const blob = await response.blob();
-                const url = window.URL.createObjectURL(blob);
-                const a = document.createElement('a');
-                a.href = url;
-                a.download = `${this.currentStory.title}.mp3`;
-                document.body.appendChild(a);
-                a.click();
-                document.body.removeChild(a);
-                window.URL.revokeObjectURL(url);
-                
-                this.showSuccess('Audio downloaded successfully!');
-            } else {
-                throw new Error('Download failed');
-            }
-        } catch (error) {
-            console.error('Download error:', error);
-            this.showError('Could not download audio. Try the play button instead.');
-        }
+        // Let the browser stream the file to disk; the server reuses the rendered narration
+        const a = document.createElement('a');
+        a.href = `/api/tts/download/${this.currentStory.id}/`;
+        a.download = `${this.currentStory.title}.mp3`;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
     }
     
     playWithResponsiveVoice(text, language) {
@@ -665,15 +834,26 @@ class VocalTalesApp {
         }
     }
     
-    async loadStoryLibrary() {
+    async loadStoryLibrary(url = '/api/stories/') {
+        // The first page replaces the library; later pages (via `next`) are appended
+        const firstPage = url === '/api/stories/';
+        const loadMoreBtn = document.getElementById('loadMoreStoriesBtn');
+        loadMoreBtn.disabled = true;
+        
         try {
-            const response = await fetch('/api/stories/');
-            const stories = await response.json();
+            const response = await fetch(url);
+            const page = await response.json();
+            const stories = page.results;
             
             const storiesList = document.getElementById('storiesList');
-            storiesList.innerHTML = '';
+            if (firstPage) {
+                storiesList.innerHTML = '';
+            }
             
-            if (stories.length === 0) {
+            this.nextStoriesUrl = page.next;
+            loadMoreBtn.classList.toggle('hidden', !page.next);
+            
+            if (firstPage && stories.length === 0) {
                 storiesList.innerHTML = '<p style="text-align: center; color: white; font-size: 1.1rem;">No stories yet! Create your first magical tale above! ✨</p>';
                 return;
             }
@@ -683,16 +863,19 @@ class VocalTalesApp {
                 storyItem.className = 'story-item';
                 storyItem.innerHTML = `
                     <h3>${story.title}</h3>
-                    <p>${story.content.substring(0, 150)}...</p>
+                    <p>${story.excerpt}...</p>
                     <div style="margin-top: 10px; font-size: 0.8rem; color: #999;">
                         <span>📖 ${story.word_count} words</span>
                         <span style="margin-left: 15px;">⏱️ ${Math.ceil(story.estimated_duration / 60)} min</span>
                     </div>
                 `;
                 
-                storyItem.addEventListener('click', () => {
-                    this.currentStory = story;
-                    this.displayStory(story);
+                storyItem.addEventListener('click', async () => {
+                    // The library only carries an excerpt; fetch the full story
+                    const detail = await fetch(`/api/stories/${story.id}/`);
+                    const fullStory = await detail.json();
+                    this.currentStory = fullStory;
+                    this.displayStory(fullStory);
                 });
                 
                 storiesList.appendChild(storyItem);
@@ -700,6 +883,14 @@ class VocalTalesApp {
             
         } catch (error) {
             console.error('Error loading story library:', error);
+        } finally {
+            loadMoreBtn.disabled = false;
+        }
+    }
+    
+    loadMoreStories() {
+        if (this.nextStoriesUrl) {
+            this.loadStoryLibrary(this.nextStoriesUrl);
         }
     }
     
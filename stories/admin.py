@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import ChildProfile, StoryRequest, GeneratedStory, StorySession, FavoriteStory
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import ChildProfile, StoryRequest, GeneratedStory, StorySession, FavoriteStory, StoryJob, StoryCounter
+from .search import get_search_backend
 
 @admin.register(ChildProfile)
 class ChildProfileAdmin(admin.ModelAdmin):
@@ -18,8 +21,24 @@ class StoryRequestAdmin(admin.ModelAdmin):
 class GeneratedStoryAdmin(admin.ModelAdmin):
     list_display = ['title', 'status', 'word_count', 'estimated_duration', 'created_at']
     list_filter = ['status', 'ai_model_used', 'created_at']
-    search_fields = ['title', 'content']
-    readonly_fields = ['word_count', 'estimated_duration', 'created_at', 'updated_at']
+    search_fields = ['title']
+    readonly_fields = ['content', 'word_count', 'estimated_duration', 'audio_file', 'audio_size', 'audio_duration',
+                       'audio_rendered_at', 'llm_seconds', 'prompt_tokens', 'completion_tokens', 'created_at',
+                       'updated_at', 'completed_at']
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of LIKE scans over every story body.
+        # It only holds completed stories, so the generating and failed ones
+        # admins look up most are matched by title or by the story idea
+        # (placeholders have no title yet).
+        backend = get_search_backend()
+        match = backend.match_sql(search_term) if backend and search_term.strip() else None
+        if match is None:
+            return super().get_search_results(request, queryset, search_term)
+        term = search_term.strip()
+        idea = Q(request__transcription__icontains=term) | Q(request__voice_input__icontains=term)
+        unindexed = ~Q(status='completed') & (Q(title__icontains=term) | idea)
+        return queryset.filter(Q(pk__in=RawSQL(*match)) | unindexed), False
 
 @admin.register(StorySession)
 class StorySessionAdmin(admin.ModelAdmin):
@@ -32,3 +51,14 @@ class FavoriteStoryAdmin(admin.ModelAdmin):
     list_display = ['user', 'story', 'saved_at']
     list_filter = ['saved_at']
     search_fields = ['user__username', 'story__title']
+
+@admin.register(StoryJob)
+class StoryJobAdmin(admin.ModelAdmin):
+    list_display = ['story', 'status', 'attempts', 'locked_by', 'created_at']
+    list_filter = ['status', 'created_at']
+    readonly_fields = ['locked_at', 'created_at', 'updated_at']
+
+@admin.register(StoryCounter)
+class StoryCounterAdmin(admin.ModelAdmin):
+    list_display = ['dimension', 'value', 'count', 'total_seconds']
+    list_filter = ['dimension']
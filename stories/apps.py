@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StoriesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'stories'
+
+    def ready(self):
+        from . import routing, signals  # noqa: F401
@@ -0,0 +1,310 @@
+"""
+Static asset build and delivery.
+
+``collectstatic`` with ``PrecompressedManifestStorage`` copies assets into
+``STATIC_ROOT``, minifying our own CSS and JavaScript (``static/css``,
+``static/js``; admin and other third-party files ship already built and are
+copied as they are). It gives each a content-hashed name
+(``app.3f2a9c1b7e4d.js``, recorded in ``staticfiles.json`` and used by
+``{% static %}``) and writes ``.gz`` - and, when the optional ``brotli``
+package is installed, ``.br`` - siblings next to it. ``asset_response``
+picks the variant the client accepts and serves it from disk; hashed names
+never change content, so they are cached for a year as immutable.
+
+The minifiers are deliberately conservative: they drop comments and
+redundant whitespace but keep line breaks in JavaScript (so automatic
+semicolon insertion is unaffected) and never touch string, template or
+regular expression literals.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse
+
+from .http import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are written without it
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map', '.xml', '.ico')
+MIN_COMPRESS_BYTES = 256  # below this the headers cost more than the saving
+ENCODINGS = ('br', 'gzip')  # server preference when the client accepts both equally
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+_CSS_TOKEN_RE = re.compile(r'''"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|/\*.*?\*/|\s+|[^"'/\s]+|/''', re.DOTALL)
+_CSS_TIGHT_RE = re.compile(r'\s*([{};,])\s*')
+# After these, a "/" starts a regular expression rather than a division
+_JS_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void', 'delete', 'throw', 'yield', 'await')
+
+
+def minify_css(source: str) -> str:
+    """Drop comments and whitespace that CSS doesn't need; strings are kept verbatim"""
+    parts = []
+    for token in _CSS_TOKEN_RE.findall(source):
+        if token.startswith('/*'):
+            continue
+        if token[0] in '"\'':
+            parts.append(('string', token))
+        elif token.isspace():
+            parts.append(('code', ' '))
+        else:
+            parts.append(('code', token))
+
+    out = []
+    code = ''
+    for kind, token in parts + [('string', '')]:
+        if kind == 'code':
+            code += token
+            continue
+        # Tighten the run of code between strings, then keep the string as is.
+        # Space before ":" is left alone: in a selector it is a descendant combinator.
+        code = _CSS_TIGHT_RE.sub(r'\1', code).replace(';}', '}')
+        out.append(re.sub(r':\s+', ':', code))
+        out.append(token)
+        code = ''
+    return ''.join(out).strip()
+
+
+def minify_js(source: str) -> str:
+    """Strip comments, indentation and blank lines from JavaScript.
+
+    Line breaks are kept, so the result parses exactly like the source;
+    string, template and regex literals pass through untouched.
+    """
+    out = []
+    i, n = 0, len(source)
+    template_depth = []  # brace depth at each enclosing template literal's ${
+    braces = 0
+    last = ''  # last significant code character emitted
+
+    def previous_word():
+        match = re.search(r'([A-Za-z_$][\w$]*)\s*$', ''.join(out[-8:]))
+        return match.group(1) if match else ''
+
+    def whitespace(char):
+        # One space between tokens, no indentation, no trailing spaces or blank lines
+        if char == '\n':
+            if out and out[-1] == ' ':
+                out.pop()
+            if out and out[-1][-1] != '\n':
+                out.append('\n')
+        elif out and out[-1][-1] not in ' \n':
+            out.append(' ')
+
+    while i < n:
+        char = source[i]
+        pair = source[i:i + 2]
+
+        if pair == '//':
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if pair == '/*':
+            end = source.find('*/', i + 2)
+            end = n if end == -1 else end + 2
+            # A comment spanning lines still ends the line for semicolon insertion
+            whitespace('\n' if '\n' in source[i:end] else ' ')
+            i = end
+            continue
+        if char.isspace():
+            whitespace('\n' if char == '\n' else ' ')
+            i += 1
+            continue
+
+        if char in '"\'`' or (char == '}' and template_depth and braces == template_depth[-1]):
+            # A string, or a template literal (resumed after a ${...} expression)
+            if char == '}':
+                template_depth.pop()
+                quote = '`'
+            else:
+                quote = char
+            start = i
+            i += 1
+            while i < n:
+                if source[i] == '\\':
+                    i += 2
+                    continue
+                if source[i] == quote:
+                    i += 1
+                    break
+                if quote == '`' and source.startswith('${', i):
+                    i += 2
+                    template_depth.append(braces)
+                    break
+                i += 1
+            out.append(source[start:i])
+            last = quote
+            continue
+
+        if char == '/' and (not last or last in _JS_REGEX_PREFIX or previous_word() in _JS_REGEX_KEYWORDS):
+            start = i
+            i += 1
+            in_class = False
+            while i < n and source[i] != '\n':
+                if source[i] == '\\':
+                    i += 2
+                    continue
+                if source[i] == '[':
+                    in_class = True
+                elif source[i] == ']':
+                    in_class = False
+                elif source[i] == '/' and not in_class:
+                    i += 1
+                    break
+                i += 1
+            while i < n and source[i].isalnum():  # flags
+                i += 1
+            out.append(source[start:i])
+            last = '/'
+            continue
+
+        if char == '{':
+            braces += 1
+        elif char == '}':
+            braces -= 1
+        last = char
+        out.append(char)
+        i += 1
+
+    return ''.join(out).strip()
+
+
+# Extension -> (directory it must be collected into, minifier). The
+# heuristic minifiers are only trusted with our own files.
+MINIFIERS = {'.css': ('css/', minify_css), '.js': ('js/', minify_js)}
+
+
+def compressed_variants(data: bytes) -> dict:
+    """``{encoding: bytes}`` for each encoding that actually shrinks ``data``"""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+class PrecompressedManifestStorage(ManifestStaticFilesStorage):
+    """Manifest storage that minifies our CSS/JS and writes precompressed siblings of everything"""
+
+    def _save(self, name, content):
+        directory, minify = MINIFIERS.get(os.path.splitext(name)[1], ('', None))
+        if minify is not None and name.startswith(directory):
+            content.seek(0)
+            source = content.read()
+            text = source.decode('utf-8') if isinstance(source, bytes) else source
+            content = ContentFile(minify(text).encode('utf-8'))
+        return super()._save(name, content)
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception) and hashed_name:
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if not dry_run:
+            for name in sorted(names):
+                self.compress(name)
+
+    def compress(self, name: str):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as fh:
+            data = fh.read()
+        if len(data) < MIN_COMPRESS_BYTES:
+            return
+        for encoding, body in compressed_variants(data).items():
+            variant = name + ENCODING_SUFFIXES[encoding]
+            if self.exists(variant):
+                self.delete(variant)
+            super()._save(variant, ContentFile(body))
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (development and tests): refer to the source file
+            return name
+
+
+def accepted_encodings(header: str) -> dict:
+    """``{coding: q}`` from an Accept-Encoding header"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        match = re.search(r'q\s*=\s*([0-9.]+)', params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(header: str, available=ENCODINGS):
+    """The best of ``available`` the client accepts, or None for the identity encoding"""
+    accepted = accepted_encodings(header or '')
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_hashed(name: str) -> bool:
+    """Whether ``name`` is a content-hashed file from the manifest (safe to cache forever)"""
+    return name in getattr(staticfiles_storage, 'hashed_files', {}).values()
+
+
+def find_asset(name: str):
+    """Absolute path of ``name`` under STATIC_ROOT, or None (never outside it)"""
+    root = os.path.realpath(settings.STATIC_ROOT)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def asset_response(request, name: str, path: str):
+    """Serve the collected asset at ``path``, precompressed when the client accepts it.
+
+    FileResponse hands the open file to the server, which can send it
+    without copying it through Python (``wsgi.file_wrapper``/sendfile).
+    """
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+        content_type += '; charset=utf-8'
+
+    encoding = None
+    if name.endswith(COMPRESSIBLE_EXTENSIONS):
+        available = [coding for coding in ENCODINGS if os.path.exists(path + ENCODING_SUFFIXES[coding])]
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''), available)
+    if encoding:
+        path += ENCODING_SUFFIXES[encoding]
+
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-" + encoding if encoding else ""}"'
+    if etag_matches(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        del response['Content-Disposition']
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE if is_hashed(name) else REVALIDATE
+    return response
@@ -0,0 +1,183 @@
+"""
+Prompt-result cache for story completions.
+
+Identical requests (same inputs to ``_create_story_prompt`` and same model)
+share one cached completion in Django's cache framework. Concurrent misses
+for the same key inside a process are coalesced so only one upstream call
+is made; the rest wait for its result.
+
+Rendered API responses for story pages live in the same cache, stored with
+the ETag they were rendered for so a stale entry is never served.
+
+Event counters (cache hits, rate-limit events, metrics) are kept in process
+memory instead: a culling cache would evict them and make them look reset.
+"""
+import hashlib
+import json
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+COUNTERS = ('hits', 'misses', 'coalesced', 'bypassed')
+
+
+def get_story_cache():
+    return caches[settings.STORY_CACHE_ALIAS]
+
+
+def _normalize(text: str) -> str:
+    return ' '.join((text or '').lower().split())
+
+
+def story_cache_key(story_request, model: str) -> str:
+    """Stable key over every input the story prompt is built from"""
+    inputs = {
+        'model': model,
+        'genre': story_request.genre,
+        'length': story_request.length,
+        'age_group': story_request.age_group,
+        'language': story_request.language,
+        'idea': _normalize(story_request.voice_input or story_request.transcription),
+        'characters': _normalize(story_request.characters),
+        'setting': _normalize(story_request.setting),
+        'moral_lesson': _normalize(story_request.moral_lesson),
+    }
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+    return f"story-completion:{digest}"
+
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def increment_counter(key: str, delta=1):
+    """Add to a counter in this process's memory.
+
+    Like a ``prometheus_client`` counter: never evicted, starting from zero
+    when the process starts, and each worker process counts its own events.
+    """
+    with _counters_lock:
+        _counters[key] += delta
+
+
+def read_counters(keys) -> dict:
+    with _counters_lock:
+        return {key: _counters[key] for key in keys}
+
+
+def reset_counters():
+    """Zero every counter (tests and benchmarks)"""
+    with _counters_lock:
+        _counters.clear()
+
+
+def record_cache_event(name: str):
+    increment_counter(f"story-cache-stats:{name}")
+
+
+def cache_stats() -> dict:
+    values = read_counters([f"story-cache-stats:{name}" for name in COUNTERS])
+    stats = {name: values[f"story-cache-stats:{name}"] for name in COUNTERS}
+    lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+    stats['hit_rate'] = round((stats['hits'] + stats['coalesced']) / lookups * 100, 2) if lookups else 0
+    return stats
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key: str, fn):
+        """Return ``(result, shared)``; ``shared`` is True for callers that waited"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+_flight = SingleFlight()
+
+
+def get_cached_completion(key: str):
+    text = get_story_cache().get(key)
+    if text is not None:
+        record_cache_event('hits')
+    return text
+
+
+def store_completion(key: str, text: str):
+    get_story_cache().set(key, text, timeout=settings.STORY_CACHE_TTL)
+
+
+def cached_completion(key: str, compute, fresh: bool = False) -> str:
+    """Return the cached completion for ``key``, computing it at most once at a time"""
+    if fresh:
+        record_cache_event('bypassed')
+        return compute()
+
+    text = get_cached_completion(key)
+    if text is not None:
+        return text
+
+    def load():
+        text = compute()
+        store_completion(key, text)
+        return text
+
+    text, shared = _flight.do(key, load)
+    record_cache_event('coalesced' if shared else 'misses')
+    return text
+
+
+def story_response_key(story_id: int) -> str:
+    return f"story-response:detail:{story_id}"
+
+
+def list_response_key(url: str) -> str:
+    return f"story-response:list:{hashlib.sha256(url.encode()).hexdigest()}"
+
+
+def get_rendered(key: str, etag: str):
+    """The cached body rendered for ``etag``, or None if absent or rendered for another version"""
+    entry = get_story_cache().get(key)
+    if entry is not None and entry[0] == etag:
+        return entry[1]
+    return None
+
+
+def store_rendered(key: str, etag: str, body: bytes):
+    get_story_cache().set(key, (etag, body), timeout=settings.STORY_RESPONSE_CACHE_TTL)
+
+
+def forget_story_response(story_id: int):
+    get_story_cache().delete(story_response_key(story_id))
@@ -0,0 +1,120 @@
+"""
+HTTP helpers for serving files from disk with validators and byte ranges,
+and for answering conditional GETs before a response is built.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def etag_matches(request, etag: str) -> bool:
+    header = request.headers.get('If-None-Match', '')
+    if header.strip() == '*':
+        return True
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in candidates
+
+
+def not_modified(request, etag: str, last_modified=None):
+    """A 304 when the client's copy is current (If-None-Match, else If-Modified-Since), or None"""
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None
+    )
+
+
+def set_validators(response, etag: str, last_modified=None, cache_control: str = None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
+
+
+def parse_range(header: str, size: int):
+    """Return ``(start, end)`` for a single ``bytes=`` range.
+
+    Returns None when the header should be ignored (absent, malformed or
+    multi-range) and raises ValueError when the range is unsatisfiable.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('empty suffix range')
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('range not satisfiable')
+    return start, end
+
+
+def _read_range(path, start: int, length: int):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, etag: str, content_type: str, filename: str = None,
+                  as_attachment: bool = False, cache_control: str = None):
+    """Serve ``path`` with an ETag, honouring If-None-Match and single byte ranges.
+
+    Full responses use FileResponse so the server can send the file without
+    reading it into memory.
+    """
+    etag = f'"{etag}"'
+    size = os.path.getsize(path)
+
+    if etag_matches(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if not if_range or if_range == etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+
+        if byte_range is None:
+            response = FileResponse(
+                open(path, 'rb'),
+                content_type=content_type,
+                as_attachment=as_attachment,
+                filename=filename or os.path.basename(path),
+            )
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_read_range(path, start, length), status=206, content_type=content_type)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Disposition'] = content_disposition_header(
+                as_attachment, filename or os.path.basename(path)
+            )
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
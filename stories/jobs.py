@@ -0,0 +1,294 @@
+"""
+Background story generation.
+
+Story requests are persisted with a ``'generating'`` GeneratedStory and a
+StoryJob row. The StoryJob table is the durable queue: any app node (or a
+dedicated ``run_story_worker`` process) can claim a job with a conditional
+UPDATE, so two workers never generate the same story. Web nodes run a small
+bounded thread pool that is woken whenever a job is enqueued.
+
+A running job holds a lease that its worker renews while generating. A job
+whose worker died on its last allowed attempt can't be claimed again, so
+``claim_next_job`` fails it (and its story) once the lease runs out.
+"""
+import logging
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import GeneratedStory, StoryJob, StoryRequest
+from .ratelimit import UpstreamUnavailable
+from .services import get_story_generator
+from .stats import count_bulk_created
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """``host:pid:thread``, so each worker thread owns its claims and leases"""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _run_eagerly(job: StoryJob) -> StoryJob:
+    """Claim and run a job in this thread, unless another worker already holds it"""
+    claimed = claim_job(job.pk, default_worker_id())
+    if claimed is None:
+        return job
+    return run_job(claimed)
+
+
+def enqueue_story(story_request: StoryRequest) -> StoryJob:
+    """Create the placeholder story and its queued job, then wake a worker"""
+    with transaction.atomic():
+        story = GeneratedStory.objects.create(
+            request=story_request,
+            title='',
+            content='',
+            status='generating'
+        )
+        job = StoryJob.objects.create(story=story)
+
+    if settings.STORY_JOBS_EAGER:
+        job = _run_eagerly(job)
+    else:
+        transaction.on_commit(get_worker_pool().wake)
+
+    return job
+
+
+def enqueue_story_batch(story_requests: list) -> list:
+    """Save unsaved requests with their placeholder stories and jobs in one
+    transaction (three INSERTs), then wake enough workers to run them.
+
+    Generation concurrency stays bounded by ``STORY_JOB_WORKERS`` per process
+    however large the batch is; the rest wait in the job table.
+    """
+    with transaction.atomic():
+        story_requests = StoryRequest.objects.bulk_create(story_requests)
+        stories = GeneratedStory.objects.bulk_create([
+            GeneratedStory(request=story_request, title='', content='', status='generating')
+            for story_request in story_requests
+        ])
+        jobs = StoryJob.objects.bulk_create([StoryJob(story=story) for story in stories])
+        count_bulk_created(story_requests + stories)
+
+    if settings.STORY_JOBS_EAGER:
+        jobs = [_run_eagerly(job) for job in jobs]
+    else:
+        transaction.on_commit(lambda: get_worker_pool().wake(len(jobs)))
+
+    return jobs
+
+
+def _claimable():
+    """Queued jobs that are due, plus running jobs whose worker lease has expired"""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.STORY_JOB_LEASE_SECONDS)
+    due = Q(run_after__isnull=True) | Q(run_after__lte=now)
+    return (Q(status='queued') & due) | Q(status='running', locked_at__lt=stale_before)
+
+
+def claim_job(job_id: int, worker_id: str):
+    """Atomically claim one job. Returns the job, or None if another worker won."""
+    claimed = StoryJob.objects.filter(
+        _claimable(), pk=job_id, attempts__lt=settings.STORY_JOB_MAX_ATTEMPTS
+    ).update(
+        status='running',
+        locked_by=worker_id,
+        locked_at=timezone.now(),
+        attempts=F('attempts') + 1,
+        updated_at=timezone.now()
+    )
+    if not claimed:
+        return None
+    return StoryJob.objects.select_related('story__request').get(pk=job_id)
+
+
+def fail_abandoned_jobs(batch: int = 10) -> int:
+    """Fail running jobs whose lease expired on their last allowed attempt; returns how many.
+
+    Nothing may claim such a job again, so without this its story would
+    stay ``'generating'`` and its poller would never stop.
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.STORY_JOB_LEASE_SECONDS)
+    abandoned = Q(status='running', locked_at__lt=stale_before, attempts__gte=settings.STORY_JOB_MAX_ATTEMPTS)
+    failed = 0
+    for job_id in list(StoryJob.objects.filter(abandoned).values_list('id', flat=True)[:batch]):
+        with transaction.atomic():
+            # Conditional, like a claim: another worker may be failing it too
+            if not StoryJob.objects.filter(abandoned, pk=job_id).update(
+                status='failed',
+                last_error=f"Worker lease expired on attempt {settings.STORY_JOB_MAX_ATTEMPTS}",
+                updated_at=timezone.now()
+            ):
+                continue
+            story = GeneratedStory.objects.get(job__pk=job_id)
+            if story.status == 'generating':
+                story.status = 'failed'
+                story.save(update_fields=['status', 'updated_at'])  # save() keeps the stats counters in step
+        logger.warning("Story job %s failed: its worker lease expired on the last attempt", job_id)
+        failed += 1
+    return failed
+
+
+def claim_next_job(worker_id: str, batch: int = 10):
+    """Claim the oldest available job, skipping ones other workers grab first"""
+    fail_abandoned_jobs(batch)
+    candidates = StoryJob.objects.filter(
+        _claimable(), attempts__lt=settings.STORY_JOB_MAX_ATTEMPTS
+    ).order_by('id').values_list('id', flat=True)[:batch]
+
+    for job_id in list(candidates):
+        job = claim_job(job_id, worker_id)
+        if job is not None:
+            return job
+    return None
+
+
+class LeaseHeartbeat:
+    """Renews a claimed job's lease from a side thread while the job runs.
+
+    A generation that waits out rate-limit retries can outlast
+    ``STORY_JOB_LEASE_SECONDS``; without renewal another worker would
+    reclaim the job and generate the story a second time.
+    """
+
+    def __init__(self, job: StoryJob, interval: float = None):
+        self.job = job
+        self.interval = interval or settings.STORY_JOB_LEASE_SECONDS / 3
+        self._stop = threading.Event()
+        self._thread = None
+
+    def renew(self) -> bool:
+        """Push the lease forward; False if this worker no longer holds the job"""
+        return bool(StoryJob.objects.filter(
+            pk=self.job.pk, status='running', locked_by=self.job.locked_by
+        ).update(locked_at=timezone.now()))
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    if not self.renew():
+                        logger.warning("Story job %s lease was lost by %s", self.job.pk, self.job.locked_by)
+                        return
+                except Exception:
+                    logger.exception("Could not renew the lease of story job %s", self.job.pk)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name=f'lease-{self.job.pk}', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_job(job: StoryJob) -> StoryJob:
+    """Generate the story for a claimed job and record the outcome"""
+    story = job.story
+    try:
+        with LeaseHeartbeat(job):
+            get_story_generator().generate_story(story.request, generated_story=story)
+        job.status = 'done' if story.status == 'completed' else 'failed'
+        if job.status == 'failed':
+            job.last_error = story.content
+    except UpstreamUnavailable as e:
+        return requeue_job(job, e)
+    except Exception as e:
+        logger.exception("Story job %s crashed", job.pk)
+        job.status = 'failed'
+        job.last_error = str(e)
+        story.status = 'failed'
+        story.save(update_fields=['status', 'updated_at'])  # save() keeps the stats counters in step
+
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return job
+
+
+def requeue_job(job: StoryJob, error: UpstreamUnavailable) -> StoryJob:
+    """Put a job back in the queue until the upstream is expected to accept it.
+
+    A rate limit is not the job's fault, so the attempt is not counted.
+    """
+    delay = error.retry_after or settings.STORY_JOB_RETRY_DELAY
+    job.status = 'queued'
+    job.attempts = max(job.attempts - 1, 0)
+    job.locked_by = ''
+    job.locked_at = None
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    job.last_error = str(error)
+    job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'run_after', 'last_error', 'updated_at'])
+    logger.info("Story job %s requeued for %.1fs: %s", job.pk, delay, error)
+
+    if not settings.STORY_JOBS_EAGER:
+        timer = threading.Timer(delay, get_worker_pool().wake)
+        timer.daemon = True
+        timer.start()
+    return job
+
+
+class StoryWorkerPool:
+    """Bounded in-process pool that drains the job table on demand"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='story-worker')
+        self._lock = threading.Lock()
+        self._active = 0
+        self._pending = False
+
+    def wake(self, jobs: int = 1):
+        """Start a drainer per new job up to the pool size; flag the rest as pending"""
+        for _ in range(jobs):
+            with self._lock:
+                if self._active >= self.max_workers:
+                    self._pending = True
+                    return
+                self._active += 1
+            self._executor.submit(self._drain)
+
+    def _drain(self):
+        worker_id = default_worker_id()
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job(worker_id)
+                if job is not None:
+                    run_job(job)
+                    continue
+                with self._lock:
+                    if self._pending:
+                        self._pending = False
+                        continue
+                    self._active -= 1
+                    return
+        except Exception:
+            logger.exception("Story worker crashed")
+            with self._lock:
+                self._active -= 1
+        finally:
+            close_old_connections()
+
+
+_worker_pool = None
+_worker_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> StoryWorkerPool:
+    global _worker_pool
+    if _worker_pool is None:
+        with _worker_pool_lock:
+            if _worker_pool is None:
+                _worker_pool = StoryWorkerPool(settings.STORY_JOB_WORKERS)
+    return _worker_pool
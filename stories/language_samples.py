@@ -0,0 +1,80 @@
+"""
+Labeled story ideas for measuring language detection accuracy.
+
+None of these sentences appear in the detector's training text.
+"""
+
+LABELED_SAMPLES = [
+    ('en', "A penguin who wants to visit the desert"),
+    ('en', "Can you make a story about my dog Max and a spaceship?"),
+    ('en', "The kids found a secret door in the library"),
+    ('en', "I want a funny tale where a pizza comes to life"),
+    ('en', "Two best friends build a treehouse and meet an owl"),
+    ('en', "A mermaid who is learning to count"),
+    ('en', "Please tell me about a dinosaur that loves to dance"),
+    ('en', "My sister is scared of thunder, write something to help her sleep"),
+    ('es', "Un pingüino que quiere visitar el desierto"),
+    ('es', "¿Puedes hacer un cuento sobre mi perro Max y una nave espacial?"),
+    ('es', "Los niños encontraron una puerta secreta en la biblioteca"),
+    ('es', "Quiero una historia divertida donde una pizza cobra vida"),
+    ('es', "Dos mejores amigos construyen una casa en el árbol y conocen a un búho"),
+    ('es', "Una sirena que está aprendiendo a contar"),
+    ('es', "Por favor cuéntame de un dinosaurio al que le encanta bailar"),
+    ('es', "Mi hermana tiene miedo de los truenos, escribe algo para ayudarla a dormir"),
+    ('fr', "Un pingouin qui veut visiter le désert"),
+    ('fr', "Peux-tu faire une histoire sur mon chien Max et un vaisseau spatial?"),
+    ('fr', "Les enfants ont trouvé une porte secrète dans la bibliothèque"),
+    ('fr', "Je veux un conte drôle où une pizza prend vie"),
+    ('fr', "Deux meilleurs amis construisent une cabane dans un arbre et rencontrent un hibou"),
+    ('fr', "Une sirène qui apprend à compter"),
+    ('fr', "S'il te plaît raconte-moi un dinosaure qui adore danser"),
+    ('fr', "Ma sœur a peur du tonnerre, écris quelque chose pour l'aider à dormir"),
+    ('de', "Ein Pinguin, der die Wüste besuchen möchte"),
+    ('de', "Kannst du eine Geschichte über meinen Hund Max und ein Raumschiff machen?"),
+    ('de', "Die Kinder fanden eine geheime Tür in der Bibliothek"),
+    ('de', "Ich will ein lustiges Märchen, in dem eine Pizza lebendig wird"),
+    ('de', "Zwei beste Freunde bauen ein Baumhaus und treffen eine Eule"),
+    ('de', "Eine Meerjungfrau, die zählen lernt"),
+    ('de', "Bitte erzähl von einem Dinosaurier, der gerne tanzt"),
+    ('de', "Meine Schwester hat Angst vor Donner, schreib etwas zum Einschlafen"),
+    ('it', "Un pinguino che vuole visitare il deserto"),
+    ('it', "Puoi fare una storia sul mio cane Max e una navicella spaziale?"),
+    ('it', "I bambini hanno trovato una porta segreta nella biblioteca"),
+    ('it', "Voglio una fiaba divertente dove una pizza prende vita"),
+    ('it', "Due migliori amici costruiscono una casa sull'albero e incontrano un gufo"),
+    ('it', "Una sirena che sta imparando a contare"),
+    ('it', "Per favore raccontami di un dinosauro che ama ballare"),
+    ('it', "Mia sorella ha paura dei tuoni, scrivi qualcosa per aiutarla a dormire"),
+    ('pt', "Um pinguim que quer visitar o deserto"),
+    ('pt', "Você pode fazer uma história sobre o meu cachorro Max e uma nave espacial?"),
+    ('pt', "As crianças encontraram uma porta secreta na biblioteca"),
+    ('pt', "Eu quero um conto engraçado onde uma pizza ganha vida"),
+    ('pt', "Dois melhores amigos constroem uma casa na árvore e conhecem uma coruja"),
+    ('pt', "Uma sereia que está aprendendo a contar"),
+    ('pt', "Por favor me conte sobre um dinossauro que adora dançar"),
+    ('pt', "Minha irmã tem medo de trovão, escreva algo para ajudá-la a dormir"),
+    ('hi', "एक पेंगुइन जो रेगिस्तान जाना चाहता है"),
+    ('hi', "मेरे कुत्ते मैक्स और अंतरिक्ष यान के बारे में कहानी सुनाओ"),
+    ('hi', "बच्चों को पुस्तकालय में एक गुप्त दरवाज़ा मिला"),
+    ('hi', "नमस्ते, मुझे एक मज़ेदार कहानी चाहिए"),
+    ('zh', "一只想去沙漠的企鹅"),
+    ('zh', "你能讲一个关于我的狗和宇宙飞船的故事吗"),
+    ('zh', "孩子们在图书馆里发现了一扇秘密的门"),
+    ('zh', "我想听一个会跳舞的恐龙的故事"),
+    ('ja', "砂漠に行きたいペンギンのお話"),
+    ('ja', "犬のマックスと宇宙船の物語を作ってください"),
+    ('ja', "子どもたちは図書館で秘密のドアを見つけました"),
+    ('ja', "踊るのが大好きな恐竜のお話をして"),
+    ('ko', "사막에 가고 싶은 펭귄"),
+    ('ko', "내 강아지 맥스와 우주선에 대한 이야기를 만들어 줄래요?"),
+    ('ko', "아이들이 도서관에서 비밀의 문을 찾았어요"),
+    ('ko', "춤추는 것을 좋아하는 공룡 이야기"),
+    ('ar', "بطريق يريد زيارة الصحراء"),
+    ('ar', "هل يمكنك أن تحكي قصة عن كلبي ماكس وسفينة فضاء؟"),
+    ('ar', "وجد الأطفال بابا سريا في المكتبة"),
+    ('ar', "أريد قصة مضحكة عن ديناصور يحب الرقص"),
+    ('ru', "Пингвин, который хочет побывать в пустыне"),
+    ('ru', "Расскажи историю о моей собаке Максе и космическом корабле"),
+    ('ru', "Дети нашли секретную дверь в библиотеке"),
+    ('ru', "Хочу смешную сказку про динозавра, который любит танцевать"),
+]
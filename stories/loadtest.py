@@ -0,0 +1,474 @@
+"""
+Offline load testing and micro-benchmarks (used by ``bench_load``).
+
+``FakeGroqServer`` answers Groq's chat-completions API on localhost with
+configurable latency and jitter, so the real GroqProvider (HTTP client,
+connection pool, error translation) is exercised without leaving the
+machine; narration uses the fake TTS engine. ``run_scenario`` drives one
+endpoint through Django's test client from a pool of threads and reports
+throughput, latency percentiles, queries per request and memory, as plain
+dicts that serialize to JSON for comparison between releases.
+
+``BenchServer`` serves the project over real sockets, either as a threaded
+WSGI server or under uvicorn, and ``run_http_scenario`` drives it with many
+concurrent connections while sampling in-flight requests, threads and
+memory (used by ``bench_asgi``).
+"""
+import asyncio
+import gc
+import json
+import random
+import resource
+import socket
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import uvicorn
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .providers import FakeProvider
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (which need not be sorted)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil without floats
+    return ordered[int(rank) - 1]
+
+
+def summarize_latencies(seconds: list) -> dict:
+    return {
+        'p50_ms': round(percentile(seconds, 50) * 1000, 2),
+        'p95_ms': round(percentile(seconds, 95) * 1000, 2),
+        'p99_ms': round(percentile(seconds, 99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(seconds) * 1000, 2) if seconds else 0.0,
+        'max_ms': round(max(seconds) * 1000, 2) if seconds else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def current_rss_mb() -> float:
+    """Resident set size right now (Linux); elsewhere the peak so far"""
+    try:
+        with open('/proc/self/statm') as fh:
+            pages = int(fh.read().split()[1])
+    except OSError:
+        return peak_rss_mb()
+    return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+
+
+class _FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        server = self.server
+        time.sleep(server.latency + (random.uniform(0, server.jitter) if server.jitter else 0))
+        with server.lock:
+            server.calls += 1
+        story = server.story
+        for stop in body.get('stop') or ():
+            story = story.split(stop, 1)[0]
+
+        prompt_chars = sum(len(message.get('content') or '') for message in body.get('messages', []))
+        usage = {
+            'prompt_tokens': prompt_chars // 4,
+            'completion_tokens': len(story) // 4,
+            'total_tokens': prompt_chars // 4 + len(story) // 4,
+        }
+        completion = {
+            'id': f'chatcmpl-fake-{server.calls}',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+        }
+
+        if body.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for index, word in enumerate(story.split(' ')):
+                chunk = {**completion, 'object': 'chat.completion.chunk', 'choices': [{
+                    'index': 0, 'delta': {'content': word if index == 0 else f' {word}'}, 'finish_reason': None,
+                }]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            last = {**completion, 'object': 'chat.completion.chunk', 'x_groq': {'id': 'fake', 'usage': usage},
+                    'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+            self.wfile.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode())
+            self.close_connection = True
+            return
+
+        payload = json.dumps({**completion, 'object': 'chat.completion', 'usage': usage, 'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': story},
+            'finish_reason': 'stop',
+        }]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeGroqServer:
+    """Groq-compatible chat completions on 127.0.0.1 with latency and jitter.
+
+    Use as a context manager; ``base_url`` goes in the groq provider's options.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, story: str = None):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _FakeGroqHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.story = story or FakeProvider.STORY
+        self.httpd.calls = 0
+        self.httpd.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-groq', daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def calls(self) -> int:
+        return self.httpd.calls
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class InFlight:
+    """Requests currently inside the application, and the most seen at once"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def exit(self):
+        with self._lock:
+            self.current -= 1
+
+    def reset(self):
+        with self._lock:
+            self.peak = self.current
+
+
+class _QuietWSGIRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _BoundedWSGIServer(ThreadedWSGIServer):
+    """Django's threaded server with at most ``max_threads`` requests being handled,
+    like a gthread worker; further connections wait in the listen backlog"""
+    request_queue_size = 2048
+
+    def __init__(self, *args, max_threads=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._slots = threading.BoundedSemaphore(max_threads) if max_threads else None
+
+    def process_request(self, request, client_address):
+        if self._slots is not None:
+            self._slots.acquire()
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+
+class BenchServer:
+    """This project served on 127.0.0.1 from a background thread.
+
+    ``'wsgi'`` is Django's threaded WSGI server (a thread per request, capped
+    at ``max_threads`` when given); ``'asgi'`` is uvicorn on one event loop.
+    Both count requests in flight in ``in_flight``.
+    """
+
+    def __init__(self, interface: str, max_threads: int = None):
+        if interface not in ('wsgi', 'asgi'):
+            raise ValueError(f"Unknown interface: {interface!r}")
+        self.interface = interface
+        self.max_threads = max_threads
+        self.in_flight = InFlight()
+        self._thread = None
+
+    def _wsgi_app(self):
+        app = WSGIHandler()
+
+        def counted(environ, start_response):
+            self.in_flight.enter()
+            result = None
+            try:
+                result = app(environ, start_response)
+                yield from result
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+                self.in_flight.exit()
+        return counted
+
+    def _asgi_app(self):
+        app = ASGIHandler()
+
+        async def counted(scope, receive, send):
+            if scope['type'] != 'http':
+                return await app(scope, receive, send)
+            self.in_flight.enter()
+            try:
+                await app(scope, receive, send)
+            finally:
+                self.in_flight.exit()
+        return counted
+
+    @property
+    def base_url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        if self.interface == 'wsgi':
+            self._httpd = _BoundedWSGIServer(('127.0.0.1', 0), _QuietWSGIRequestHandler, max_threads=self.max_threads)
+            self._httpd.set_app(self._wsgi_app())
+            self.port = self._httpd.server_address[1]
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name='bench-wsgi', daemon=True)
+            self._thread.start()
+            return self
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('127.0.0.1', 0))
+        self.port = sock.getsockname()[1]
+        self._uvicorn = uvicorn.Server(uvicorn.Config(
+            self._asgi_app(), lifespan='off', log_level='warning', access_log=False, timeout_graceful_shutdown=5,
+        ))
+        self._thread = threading.Thread(target=self._uvicorn.run, kwargs={'sockets': [sock]},
+                                        name='bench-asgi', daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._uvicorn.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError('uvicorn did not start')
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.interface == 'wsgi':
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        else:
+            self._uvicorn.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def run_http_scenario(name: str, server: BenchServer, request_for, requests: int, concurrency: int,
+                      failed=None) -> dict:
+    """Send ``requests`` requests to ``server`` over ``concurrency`` connections at once.
+
+    ``request_for(index)`` returns ``(method, path, json_body)``; a non-2xx
+    status, or ``failed(body)`` returning true, counts as an error. While
+    the load runs, in-flight requests, threads and resident memory are sampled
+    to estimate what each concurrent request costs.
+    """
+    latencies, errors = [], []
+    samples = {'threads': threading.active_count(), 'rss_mb': current_rss_mb()}
+    baseline = dict(samples)
+    server.in_flight.reset()
+
+    async def one(client, gate, index):
+        method, path, body = request_for(index)
+        async with gate:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                error = not 200 <= response.status_code < 300 or bool(failed and failed(response.content))
+            except httpx.HTTPError as e:
+                error = e
+            latencies.append(time.perf_counter() - started)
+            if error:
+                errors.append(error)
+
+    async def sample(stop):
+        while not stop.is_set():
+            samples['threads'] = max(samples['threads'], threading.active_count())
+            samples['rss_mb'] = max(samples['rss_mb'], current_rss_mb())
+            try:
+                await asyncio.wait_for(stop.wait(), 0.02)
+            except asyncio.TimeoutError:
+                pass
+
+    async def main():
+        gate = asyncio.Semaphore(concurrency)
+        stop = asyncio.Event()
+        # One request per connection, so a capped WSGI server can't be starved by idle keep-alives
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0)
+        async with httpx.AsyncClient(base_url=server.base_url, limits=limits, timeout=600) as client:
+            sampler = asyncio.create_task(sample(stop))
+            started = time.perf_counter()
+            await asyncio.gather(*(one(client, gate, index) for index in range(requests)))
+            duration = time.perf_counter() - started
+            stop.set()
+            await sampler
+        return duration
+
+    gc.collect()
+    duration = asyncio.run(main())
+    peak = server.in_flight.peak
+    growth = max(samples['rss_mb'] - baseline['rss_mb'], 0.0)
+    return {
+        'scenario': name,
+        'interface': server.interface,
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(requests / duration, 2) if duration else 0.0,
+        **summarize_latencies(latencies),
+        'peak_in_flight': peak,
+        'baseline_threads': baseline['threads'],
+        'peak_threads': samples['threads'],
+        'rss_growth_mb': round(growth, 1),
+        'kb_per_in_flight': round(growth * 1024 / peak, 1) if peak else None,
+    }
+
+
+def run_scenario(name: str, send, requests: int, concurrency: int, trace_memory: bool = False) -> dict:
+    """Call ``send(client, index)`` ``requests`` times from ``concurrency`` threads.
+
+    ``send`` returns a response; anything but a 2xx counts as an error. Each
+    thread has its own test client and database connection.
+    """
+    latencies, queries, errors = [], [], []
+    lock = threading.Lock()
+    indexes = iter(range(requests))
+
+    def worker():
+        client = Client()
+        try:
+            while True:
+                with lock:
+                    index = next(indexes, None)
+                if index is None:
+                    return
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    try:
+                        response = send(client, index)
+                        failed = not 200 <= response.status_code < 300
+                    except Exception as e:
+                        failed = e
+                    elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(captured))
+                    if failed:
+                        errors.append(failed)
+        finally:
+            connection.close()
+
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, name=f'bench-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    traced_peak = None
+    if trace_memory:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+
+    return {
+        'scenario': name,
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(requests / duration, 2) if duration else 0.0,
+        **summarize_latencies(latencies),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else 0.0,
+        'max_queries': max(queries, default=0),
+        'peak_rss_mb': peak_rss_mb(),
+        'traced_peak_mb': traced_peak,
+    }
+
+
+def benchmark(func, rounds: int = 200, warmup: int = 5) -> dict:
+    """pytest-benchmark style timing of one callable: min/median/mean per call and ops/sec"""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    median = statistics.median(timings)
+    return {
+        'rounds': rounds,
+        'min_us': round(min(timings) * 1e6, 2),
+        'median_us': round(median * 1e6, 2),
+        'mean_us': round(statistics.fmean(timings) * 1e6, 2),
+        'stddev_us': round(statistics.pstdev(timings) * 1e6, 2),
+        'ops_per_sec': round(1 / median, 1) if median else None,
+    }
+
+
+def compare(results: dict, baseline: dict) -> list:
+    """``(scenario, metric, baseline, current, change %)`` for the headline numbers"""
+    rows = []
+    previous = {run['scenario']: run for run in baseline.get('scenarios', [])}
+    for run in results.get('scenarios', []):
+        before = previous.get(run['scenario'])
+        if before is None:
+            continue
+        for metric in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+            old, new = before.get(metric), run.get(metric)
+            if old is None or new is None:
+                continue
+            change = round((new - old) / old * 100, 1) if old else None
+            rows.append((run['scenario'], metric, old, new, change))
+    previous_micro = baseline.get('micro', {})
+    for name, run in results.get('micro', {}).items():
+        if name in previous_micro:
+            old, new = previous_micro[name]['median_us'], run['median_us']
+            rows.append((name, 'median_us', old, new, round((new - old) / old * 100, 1) if old else None))
+    return rows
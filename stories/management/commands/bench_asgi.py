@@ -0,0 +1,167 @@
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from stories.caching import get_story_cache
+from stories.loadtest import BenchServer, run_http_scenario
+from stories.models import GeneratedStory, StoryRequest
+from stories.providers import FakeProvider
+
+INTERFACES = ('wsgi', 'asgi')
+SCENARIOS = ('narrate', 'stream', 'detail')
+IDEAS = (
+    'a dragon who is afraid of the dark', 'a robot learning to paint', 'two foxes building a boat',
+    'a girl who talks to the moon', 'a turtle racing the wind', 'a lost star finding its way home',
+)
+CHILD_OPTIONS = ('requests', 'concurrency', 'wsgi_threads', 'llm_latency', 'tts_latency', 'tts_workers')
+
+
+class Command(BaseCommand):
+    help = ('Compare the WSGI and ASGI deployments under many concurrent slow requests: throughput, '
+            'requests in flight, threads and memory per in-flight request, against fake LLM and TTS backends')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interfaces', default=','.join(INTERFACES),
+                            help=f"Comma-separated subset of: {', '.join(INTERFACES)}")
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+        parser.add_argument('--requests', type=int, default=400, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=200, help='Connections open at once')
+        parser.add_argument('--wsgi-threads', type=int, default=32,
+                            help='Request threads of the WSGI server, as in a gthread worker (0: one per connection)')
+        parser.add_argument('--llm-latency', type=float, default=1.0, help='Fake LLM seconds per streamed story')
+        parser.add_argument('--tts-latency', type=float, default=0.2, help='Fake TTS seconds per chunk')
+        parser.add_argument('--tts-workers', type=int, default=16, help='NARRATION_TTS_WORKERS for the run')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--child', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        interfaces = self.choices(options['interfaces'], INTERFACES)
+        scenarios = self.choices(options['scenarios'], SCENARIOS)
+
+        if options['child']:
+            results = self.run_interface(interfaces[0], scenarios, options)
+            Path(options['child']).write_text(json.dumps(results))
+            return
+
+        results = {
+            'meta': {key: options[key] for key in CHILD_OPTIONS},
+            'scenarios': [],
+        }
+        # A fresh process per run, so memory freed by one run can't hide the next one's growth
+        for scenario in scenarios:
+            for interface in interfaces:
+                self.stdout.write(f"running {scenario} over {interface} ...")
+                results['scenarios'] += self.spawn(interface, scenario, options)
+
+        self.report(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def choices(self, value, allowed):
+        chosen = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(chosen) - set(allowed)
+        if unknown:
+            raise CommandError(f"Unknown choices: {', '.join(sorted(unknown))}")
+        return chosen
+
+    def spawn(self, interface, scenario, options):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as fh:
+            output = Path(fh.name)
+        command = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'bench_asgi',
+                   '--interfaces', interface, '--scenarios', scenario, '--child', str(output)]
+        for key in CHILD_OPTIONS:
+            command += [f"--{key.replace('_', '-')}", str(options[key])]
+        try:
+            finished = subprocess.run(command, capture_output=True, text=True)
+            if finished.returncode:
+                raise CommandError(f"{scenario} over {interface} failed:\n{finished.stderr[-2000:]}")
+            return json.loads(output.read_text())
+        finally:
+            output.unlink(missing_ok=True)
+
+    def run_interface(self, interface, scenarios, options):
+        workdir = tempfile.mkdtemp(prefix='vocaltales-asgi-bench-')
+        # A throwaway database file shared by the server threads
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = str(Path(workdir) / 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(**self.bench_settings(options, workdir)):
+                get_story_cache().clear()
+                story_id = self.seed_story()
+                connection.close()
+                with BenchServer(interface, max_threads=options['wsgi_threads'] or None) as server:
+                    return [self.run_one(name, server, options, story_id) for name in scenarios]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def bench_settings(self, options, workdir):
+        return {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, '127.0.0.1'],
+            'STORY_LLM_PROVIDER': 'bench',
+            'STORY_LLM_PROVIDERS': {'bench': {'backend': 'fake', 'model': 'bench-model',
+                                              'latency': options['llm_latency']}},
+            'NARRATION_ENGINE': 'bench',
+            'NARRATION_ENGINES': {'bench': {'backend': 'fake', 'latency': options['tts_latency']}},
+            'NARRATION_TTS_WORKERS': options['tts_workers'],
+            'NARRATION_CACHE_DIR': Path(workdir) / 'narration',
+            'MEDIA_ROOT': Path(workdir) / 'media',
+            'NARRATION_PRERENDER': False,
+            'STORY_JOBS_EAGER': False,
+        }
+
+    def seed_story(self):
+        user, _ = User.objects.get_or_create(username='demo_user')
+        story_request = StoryRequest.objects.create(user=user, transcription='seed story', language='en')
+        return GeneratedStory.objects.create(request=story_request, title='Seed Story',
+                                             content=FakeProvider.STORY * 20, status='completed').pk
+
+    def run_one(self, name, server, options, story_id):
+        if name == 'narrate':
+            # Distinct one-chunk texts: every request waits on the TTS engine
+            def request_for(index):
+                return 'POST', reverse('stories:gtts_audio'), {
+                    'text': f"The little fox looked up at the stars, night {index}.", 'language': 'en',
+                }
+            failed = None
+        elif name == 'stream':
+            def request_for(index):
+                return 'POST', reverse('stories:stream_story'), {
+                    'transcription': f"{IDEAS[index % len(IDEAS)]} (#{index})", 'language': 'en',
+                }
+
+            def failed(body):
+                return b'event: error' in body
+        else:
+            url = reverse('stories:story_detail', args=[story_id])
+
+            def request_for(index):
+                return 'GET', url, None
+            failed = None
+
+        return run_http_scenario(name, server, request_for, options['requests'], options['concurrency'], failed)
+
+    def report(self, results):
+        self.stdout.write('')
+        self.stdout.write(f"{'scenario':<9}{'server':<6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'in flight':>11}"
+                          f"{'threads':>9}{'RSS +MB':>9}{'KB/req':>8}{'errors':>8}")
+        for run in results['scenarios']:
+            self.stdout.write(
+                f"{run['scenario']:<9}{run['interface']:<6}{run['throughput_rps']:>9}{run['p50_ms']:>10}"
+                f"{run['p95_ms']:>10}{run['peak_in_flight']:>11}{run['peak_threads']:>9}"
+                f"{run['rss_growth_mb']:>9}{str(run['kb_per_in_flight']):>8}{run['errors']:>8}"
+            )
@@ -0,0 +1,120 @@
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+from django.db.utils import OperationalError
+from django.test import override_settings
+
+from stories.loadtest import summarize_latencies
+from stories.models import GeneratedStory, StoryRequest
+
+# The settings this project shipped with: rollback journal, a connection per
+# request and deferred transactions
+LEGACY = {'pragmas': {}, 'conn_max_age': 0, 'options': {}}
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent story-creation write throughput on SQLite with the legacy settings '
+            'and the configured database profile (WAL, pragmas, persistent connections)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writers')
+        parser.add_argument('--writes', type=int, default=100, help='Story creations per writer')
+        parser.add_argument('--read-ratio', type=int, default=1,
+                            help='Reads of the story list per write, as in a browsing workload')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark compares SQLite profiles; DATABASE_URL is not SQLite')
+
+        tuned = {
+            'pragmas': settings.SQLITE_PRAGMAS,
+            'conn_max_age': settings.DATABASES['default']['CONN_MAX_AGE'],
+            'options': settings.DATABASES['default']['OPTIONS'],
+        }
+        results = {}
+        for name, profile in (('legacy', LEGACY), ('tuned', tuned)):
+            results[name] = self.run_profile(profile, options)
+            run = results[name]
+            self.stdout.write(
+                f"{name:<7} {run['writes_per_s']:>8} writes/s  p50 {run['p50_ms']} ms  p95 {run['p95_ms']} ms  "
+                f"p99 {run['p99_ms']} ms  errors {run['errors']}"
+            )
+
+        speedup = results['tuned']['writes_per_s'] / results['legacy']['writes_per_s']
+        self.stdout.write(self.style.SUCCESS(f"tuned profile: {speedup:.2f}x write throughput"))
+
+    def run_profile(self, profile, options):
+        workdir = tempfile.mkdtemp(prefix='vocaltales-dbbench-')
+        try:
+            return self.run_in(workdir, profile, options)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run_in(self, workdir, profile, options):
+        database = connection.settings_dict
+        saved = {key: database[key] for key in ('CONN_MAX_AGE', 'OPTIONS')}
+        database['TEST']['NAME'] = str(Path(workdir) / 'bench.sqlite3')
+        database['CONN_MAX_AGE'] = profile['conn_max_age']
+        database['OPTIONS'] = dict(profile['options'])
+        try:
+            # Pre-rendering narration would put TTS, not the database, on the critical path
+            with override_settings(SQLITE_PRAGMAS=profile['pragmas'], NARRATION_PRERENDER=False):
+                connection.close()
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    return self.drive(options)
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            database.update(saved)
+
+    def drive(self, options):
+        user = User.objects.create(username='demo_user')
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def writer(index):
+            for n in range(options['writes']):
+                # Request boundaries: Django closes connections older than CONN_MAX_AGE here
+                close_old_connections()
+                started = time.perf_counter()
+                try:
+                    with transaction.atomic():
+                        story_request = StoryRequest.objects.create(
+                            user=user, transcription=f"writer {index} story {n}", language='en'
+                        )
+                        GeneratedStory.objects.create(
+                            request=story_request, title='Benchmark', content='Once upon a time.',
+                            status='completed'
+                        )
+                    for _ in range(options['read_ratio']):
+                        list(GeneratedStory.objects.filter(status='completed').order_by('-created_at')[:20])
+                except OperationalError as e:
+                    with lock:
+                        errors.append(e)
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                close_old_connections()
+            connection.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+
+        writes = options['threads'] * options['writes'] - len(errors)
+        return {
+            'writes_per_s': round(writes / duration, 1),
+            'errors': len(errors),
+            **summarize_latencies(latencies),
+        }
@@ -0,0 +1,64 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from stories.language import detect
+from stories.language_samples import LABELED_SAMPLES
+
+# The substring scan detect_language used before the script/n-gram detector
+LEGACY_PATTERNS = {
+    'es': ['hola', 'gracias', 'por favor', 'sí', 'no', 'que', 'el', 'la', 'de', 'en', 'un', 'una'],
+    'fr': ['bonjour', 'merci', 'oui', 'non', 'le', 'la', 'de', 'et', 'un', 'une', 'je', 'tu'],
+    'de': ['hallo', 'danke', 'ja', 'nein', 'der', 'die', 'das', 'und', 'ich', 'du', 'ist'],
+    'it': ['ciao', 'grazie', 'sì', 'no', 'il', 'la', 'di', 'e', 'un', 'una', 'io', 'tu'],
+    'pt': ['olá', 'obrigado', 'sim', 'não', 'o', 'a', 'de', 'e', 'um', 'uma', 'eu', 'você'],
+    'hi': ['नमस्ते', 'धन्यवाद', 'हाँ', 'नहीं', 'क्या', 'कैसे', 'कहाँ', 'कब'],
+    'zh': ['你好', '谢谢', '是', '不', '什么', '怎么', '哪里', '什么时候'],
+    'ja': ['こんにちは', 'ありがとう', 'はい', 'いいえ', '何', 'どう', 'どこ', 'いつ'],
+    'ko': ['안녕하세요', '감사합니다', '네', '아니요', '무엇', '어떻게', '어디', '언제'],
+    'ar': ['مرحبا', 'شكرا', 'نعم', 'لا', 'ما', 'كيف', 'أين', 'متى'],
+    'ru': ['привет', 'спасибо', 'да', 'нет', 'что', 'как', 'где', 'когда'],
+}
+
+
+def legacy_detect(text):
+    text_lower = text.lower()
+    scores = {}
+    for lang, words in LEGACY_PATTERNS.items():
+        score = sum(1 for word in words if word in text_lower)
+        if score > 0:
+            scores[lang] = score
+    return max(scores, key=scores.get) if scores else 'en'
+
+
+class Command(BaseCommand):
+    help = 'Report language detection accuracy per language and throughput in texts/sec'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200,
+                            help='Passes over the labeled set when timing')
+
+    def evaluate(self, name, detector, iterations):
+        correct, total = Counter(), Counter()
+        for lang, text in LABELED_SAMPLES:
+            total[lang] += 1
+            correct[lang] += detector(text) == lang
+
+        texts = [text for _, text in LABELED_SAMPLES]
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for text in texts:
+                detector(text)
+        rate = len(texts) * iterations / (time.perf_counter() - start)
+
+        accuracy = sum(correct.values()) / sum(total.values())
+        self.stdout.write(f"{name}: accuracy {accuracy:.1%}, {rate:,.0f} texts/sec")
+        self.stdout.write('  ' + '  '.join(
+            f"{lang} {correct[lang] / total[lang]:.0%}" for lang in total
+        ))
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{len(LABELED_SAMPLES)} labeled samples")
+        self.evaluate('legacy substring scan', legacy_detect, options['iterations'])
+        self.evaluate('script + n-gram detector', lambda text: detect(text).language, options['iterations'])
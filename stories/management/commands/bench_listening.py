@@ -0,0 +1,137 @@
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from stories.loadtest import summarize_latencies
+from stories.models import GeneratedStory, StoryRequest, StorySession
+from stories.progress import get_progress_buffer, remember_session
+
+WRITE_PREFIXES = ('UPDATE', 'INSERT', 'DELETE')
+
+
+class WriteCounter:
+    """execute_wrapper counting write statements and the rows they touched"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if sql.lstrip().upper().startswith(WRITE_PREFIXES):
+            with self.lock:
+                self.statements += 1
+                self.rows += max(context['cursor'].rowcount, 0)
+        return result
+
+
+class Command(BaseCommand):
+    help = ('Replay player heartbeats from many concurrent listeners through the listening-progress API '
+            'and compare database writes per minute with and without write-behind buffering')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listeners', type=int, default=1000, help='Concurrent listening sessions')
+        parser.add_argument('--minutes', type=float, default=5, help='Listening time replayed per session')
+        parser.add_argument('--heartbeat', type=float, default=15, help='Seconds between heartbeats (the player sends one every 15 s)')
+        parser.add_argument('--flush-interval', type=float, default=settings.LISTENING_FLUSH_INTERVAL,
+                            help='Seconds between write-behind flushes')
+        parser.add_argument('--threads', type=int, default=16, help='Request threads replaying heartbeats')
+
+    def handle(self, *args, **options):
+        if options['heartbeat'] <= 0 or options['flush_interval'] <= 0:
+            raise CommandError('--heartbeat and --flush-interval must be positive')
+
+        results = {}
+        for name, write_behind in (('write-through', False), ('write-behind', True)):
+            self.stdout.write(f"replaying {options['listeners']} listeners, {name} ...")
+            results[name] = self.run_mode(write_behind, options)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'':<15}{'writes/min':>12}{'rows/min':>10}{'heartbeats/s':>14}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, run in results.items():
+            self.stdout.write(f"{name:<15}{run['writes_per_minute']:>12}{run['rows_per_minute']:>10}"
+                              f"{run['heartbeats_per_s']:>14}{run['p50_ms']:>9}{run['p95_ms']:>9}")
+        ratio = results['write-through']['writes_per_minute'] / max(results['write-behind']['writes_per_minute'], 1)
+        self.stdout.write(self.style.SUCCESS(
+            f"write-behind: {ratio:.0f}x fewer write statements at {options['listeners']} listeners"
+        ))
+
+    def run_mode(self, write_behind, options):
+        workdir = tempfile.mkdtemp(prefix='vocaltales-listening-bench-')
+        connection.settings_dict['TEST']['NAME'] = str(Path(workdir) / 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Flushes follow the replayed clock rather than a wall-clock timer
+            with override_settings(LISTENING_WRITE_BEHIND=write_behind, LISTENING_FLUSH_INTERVAL=3600,
+                                   NARRATION_PRERENDER=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                return self.replay(self.seed(options['listeners']), write_behind, options)
+        finally:
+            get_progress_buffer().discard()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def seed(self, listeners):
+        user = User.objects.create(username='demo_user')
+        story_request = StoryRequest.objects.create(user=user, language='en')
+        story = GeneratedStory.objects.create(request=story_request, title='Benchmark', content='Once upon a time.',
+                                              status='completed')
+        sessions = StorySession.objects.bulk_create([StorySession(user=user, story=story) for _ in range(listeners)])
+        for session in sessions:
+            remember_session(session.pk)
+        return [reverse('stories:listening_progress', args=[session.pk]) for session in sessions]
+
+    def replay(self, urls, write_behind, options):
+        counter = WriteCounter()
+        local = threading.local()
+        latencies, lock = [], threading.Lock()
+
+        def send(url, position, completed):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = local.client.post(url, {'position': position, 'completed': completed},
+                                             content_type='application/json')
+            with lock:
+                latencies.append(time.perf_counter() - started)
+            if response.status_code != 202:
+                raise CommandError(f"heartbeat failed with {response.status_code}: {response.content[:200]}")
+
+        heartbeat, flush_interval = options['heartbeat'], options['flush_interval']
+        rounds = max(1, round(options['minutes'] * 60 / heartbeat))
+        clock = next_flush = 0.0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            for index in range(1, rounds + 1):
+                clock = index * heartbeat
+                final = index == rounds
+                list(executor.map(lambda url: send(url, clock, final), urls))
+                if write_behind:
+                    while next_flush + flush_interval <= clock:
+                        next_flush += flush_interval
+                        with connection.execute_wrapper(counter):
+                            get_progress_buffer().flush()
+        duration = time.perf_counter() - started
+
+        stored = sorted(set(StorySession.objects.values_list('duration_listened', flat=True)))
+        if stored != [int(clock)]:
+            raise CommandError(f"sessions ended at {stored}, expected {int(clock)}")
+
+        minutes = clock / 60
+        return {
+            'writes_per_minute': round(counter.statements / minutes),
+            'rows_per_minute': round(counter.rows / minutes),
+            'heartbeats_per_s': round(len(latencies) / duration),
+            **summarize_latencies(latencies),
+        }
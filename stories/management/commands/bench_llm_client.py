@@ -0,0 +1,52 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from groq import APIConnectionError, APIStatusError, Groq
+
+from stories.providers import get_provider
+
+
+class Command(BaseCommand):
+    help = 'Measure per-request connection setup saved by the shared, pooled Groq client'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Requests to time for each client strategy')
+
+    def timed_call(self, client):
+        start = time.perf_counter()
+        try:
+            # Cheapest authenticated endpoint; a 401 still pays for the full connection
+            client.models.list()
+        except APIStatusError:
+            pass
+        except APIConnectionError as e:
+            raise CommandError(f"Could not reach Groq: {e}")
+        return time.perf_counter() - start
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        provider = get_provider('groq')
+
+        # Old behaviour: a brand-new client (and connection pool) per story
+        fresh = []
+        for _ in range(count):
+            start = time.perf_counter()
+            client = Groq(api_key=settings.GROQ_API_KEY or 'benchmark', max_retries=0)
+            self.timed_call(client)
+            client.close()
+            fresh.append(time.perf_counter() - start)
+
+        # New behaviour: the process-wide client; warm the pool once first
+        self.timed_call(provider.client)
+        pooled = [self.timed_call(provider.client) for _ in range(count)]
+
+        fresh_ms = statistics.median(fresh) * 1000
+        pooled_ms = statistics.median(pooled) * 1000
+        self.stdout.write(f"fresh client per request:  p50 {fresh_ms:.1f} ms")
+        self.stdout.write(f"shared pooled client:      p50 {pooled_ms:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"connection setup saved per request: {fresh_ms - pooled_ms:.1f} ms"
+        ))
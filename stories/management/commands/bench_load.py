@@ -0,0 +1,269 @@
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from stories.caching import get_story_cache, reset_counters, story_cache_key
+from stories.jobs import get_worker_pool
+from stories.language import detect_language
+from stories.loadtest import FakeGroqServer, benchmark, compare, peak_rss_mb, run_scenario
+from stories.metrics import histograms
+from stories.models import GeneratedStory, StoryJob, StoryRequest
+from stories.providers import FakeProvider
+from stories.serializers import StoryListSerializer
+from stories.services import GroqStoryGenerator, StreamingStoryParser
+from stories.stats import STATS_CACHE_KEY, count_bulk_created, stats_snapshot
+
+SCENARIOS = ('create', 'list', 'stats', 'tts')
+IDEAS = (
+    'a dragon who is afraid of the dark', 'a robot learning to paint', 'two foxes building a boat',
+    'a girl who talks to the moon', 'a turtle racing the wind', 'a lost star finding its way home',
+)
+
+
+class Command(BaseCommand):
+    help = ('Load-test the story API offline against a local fake Groq server and fake TTS, '
+            'then write throughput, latency percentiles, query counts and memory as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads per scenario')
+        parser.add_argument('--llm', choices=('http', 'inprocess'), default='http',
+                            help='http: real Groq client against a local fake server; inprocess: FakeProvider')
+        parser.add_argument('--llm-latency', type=float, default=0.2, help='Fake LLM seconds per call')
+        parser.add_argument('--llm-jitter', type=float, default=0.1, help='Up to this many extra seconds per call')
+        parser.add_argument('--tts-latency', type=float, default=0.05, help='Fake TTS seconds per chunk')
+        parser.add_argument('--tts-jitter', type=float, default=0.02)
+        parser.add_argument('--tts-distinct', type=int, default=20,
+                            help='Distinct narration texts; the rest are cache hits')
+        parser.add_argument('--seed-stories', type=int, default=200,
+                            help='Completed stories inserted before the read scenarios')
+        parser.add_argument('--micro-rounds', type=int, default=200,
+                            help='Rounds per micro-benchmark (0 to skip them)')
+        parser.add_argument('--trace-memory', action='store_true',
+                            help='Also report the tracemalloc peak per scenario (slower)')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--baseline', help='Earlier JSON results to compare against')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read baseline: {e}")
+
+        workdir = tempfile.mkdtemp(prefix='vocaltales-bench-')
+        try:
+            results = self.run(scenarios, options, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.report(results, baseline)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run(self, scenarios, options, workdir):
+        # A throwaway database (a file, so worker threads share it) keeps real data untouched
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = str(Path(workdir) / 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with FakeGroqServer(options['llm_latency'], options['llm_jitter']) as server:
+                with override_settings(**self.bench_settings(options, server, workdir)):
+                    get_story_cache().clear()
+                    reset_counters()
+                    results = {
+                        'meta': self.metadata(options),
+                        'scenarios': [self.run_one(name, options) for name in scenarios],
+                    }
+                    if options['micro_rounds']:
+                        results['micro'] = self.micro_benchmarks(options['micro_rounds'])
+                    results['stages'] = {
+                        stage: {
+                            'count': histogram['count'],
+                            'mean_ms': round(histogram['sum'] / histogram['count'] * 1000, 2),
+                        }
+                        for stage, histogram in histograms().items() if histogram['count']
+                    }
+                    results['meta']['llm_calls'] = server.calls if options['llm'] == 'http' else None
+                    results['meta']['peak_rss_mb'] = peak_rss_mb()
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def bench_settings(self, options, server, workdir):
+        if options['llm'] == 'http':
+            llm = {'backend': 'groq', 'model': 'bench-model', 'api_key': 'bench', 'base_url': server.base_url,
+                   'max_connections': options['concurrency'] * 2}
+        else:
+            llm = {'backend': 'fake', 'model': 'bench-model',
+                   'latency': options['llm_latency'], 'jitter': options['llm_jitter']}
+        return {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'STORY_LLM_PROVIDER': 'bench',
+            'STORY_LLM_PROVIDERS': {'bench': llm},
+            'NARRATION_ENGINE': 'bench',
+            'NARRATION_ENGINES': {'bench': {'backend': 'fake', 'latency': options['tts_latency'],
+                                            'jitter': options['tts_jitter']}},
+            'NARRATION_CACHE_DIR': Path(workdir) / 'narration',
+            'MEDIA_ROOT': Path(workdir) / 'media',
+            # Pre-rendering would compete with the measured requests for TTS workers
+            'NARRATION_PRERENDER': False,
+            'STORY_JOBS_EAGER': False,
+        }
+
+    def metadata(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                    cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'options': {key: options[key] for key in (
+                'requests', 'concurrency', 'llm', 'llm_latency', 'llm_jitter',
+                'tts_latency', 'tts_jitter', 'tts_distinct', 'seed_stories',
+            )},
+        }
+
+    def run_one(self, name, options):
+        self.stdout.write(f"running {name} ...")
+        requests, concurrency = options['requests'], options['concurrency']
+        trace = options['trace_memory']
+
+        if name == 'create':
+            def send(client, index):
+                # Distinct ideas so every story is a prompt-cache miss
+                return client.post(reverse('stories:create_story'), {
+                    'transcription': f"{IDEAS[index % len(IDEAS)]} (#{index})", 'language': 'en',
+                })
+            result = run_scenario(name, send, requests, concurrency, trace)
+            result.update(self.drain_jobs(started=time.perf_counter() - result['duration_s']))
+            return result
+
+        if name in ('list', 'stats'):
+            self.seed_stories(options['seed_stories'])
+            url = reverse('stories:story_list' if name == 'list' else 'stories:story_stats')
+            return run_scenario(name, lambda client, index: client.get(url), requests, concurrency, trace)
+
+        sentence = 'The little fox looked up at the bright stars and smiled. ' * 12
+
+        def send(client, index):
+            response = client.post(reverse('stories:gtts_audio'), {
+                'text': f"{sentence}Story number {index % options['tts_distinct']}.", 'language': 'en',
+            })
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+        return run_scenario(name, send, requests, concurrency, trace)
+
+    def drain_jobs(self, started, timeout=300):
+        """Wait for the worker pool to finish the queued stories"""
+        pool = get_worker_pool()
+        deadline = time.monotonic() + timeout
+        pending = StoryJob.objects.filter(status__in=['queued', 'running'])
+        while pending.exists():
+            if time.monotonic() > deadline:
+                raise CommandError('Timed out waiting for story jobs to finish')
+            pool.wake(pending.count())
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        done = StoryJob.objects.filter(status='done').count()
+        return {
+            'stories_generated': done,
+            'stories_failed': StoryJob.objects.filter(status='failed').count(),
+            'generation_s': round(elapsed, 3),
+            'generation_per_s': round(done / elapsed, 2) if elapsed else 0.0,
+        }
+
+    def seed_stories(self, count):
+        missing = count - GeneratedStory.objects.filter(status='completed').count()
+        if missing <= 0:
+            return
+        user, _ = User.objects.get_or_create(username='demo_user')
+        requests = StoryRequest.objects.bulk_create([
+            StoryRequest(user=user, transcription=f"seed story {i}", language='en') for i in range(missing)
+        ])
+        stories = GeneratedStory.objects.bulk_create([
+            GeneratedStory(request=request, title=f"Seed Story {request.pk}", content=FakeProvider.STORY * 20,
+                           status='completed', word_count=600)
+            for request in requests
+        ])
+        count_bulk_created(requests + stories)
+
+    def micro_benchmarks(self, rounds):
+        self.stdout.write('running micro-benchmarks ...')
+        generator = GroqStoryGenerator()
+        story_request = StoryRequest(transcription='a brave little dragon who learns to share', language='en',
+                                     characters='Ember', setting='a misty mountain', moral_lesson='sharing')
+        completion = FakeProvider.STORY * 10
+        deltas = completion.split(' ')
+        page = list(GeneratedStory.objects.filter(status='completed').select_related('request')[:20])
+        cache = get_story_cache()
+
+        def parse_stream():
+            parser = StreamingStoryParser()
+            for delta in deltas:
+                parser.feed(delta + ' ')
+            parser.finish()
+
+        def uncached_stats():
+            cache.delete(STATS_CACHE_KEY)
+            stats_snapshot()
+
+        cases = {
+            'build_prompt': lambda: generator._create_story_prompt(story_request),
+            'parse_response': lambda: generator._parse_story_response(completion),
+            'parse_stream': parse_stream,
+            'detect_language': lambda: detect_language('Había una vez un pequeño dragón que tenía miedo'),
+            'prompt_cache_key': lambda: story_cache_key(story_request, 'bench-model'),
+            'stats_snapshot_uncached': uncached_stats,
+            'serialize_story_page': lambda: StoryListSerializer(page, many=True).data,
+        }
+        return {name: benchmark(func, rounds) for name, func in cases.items()}
+
+    def report(self, results, baseline):
+        self.stdout.write('')
+        self.stdout.write(f"{'scenario':<10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+                          f"{'queries':>9}{'errors':>8}")
+        for run in results['scenarios']:
+            self.stdout.write(
+                f"{run['scenario']:<10}{run['throughput_rps']:>9}{run['p50_ms']:>10}{run['p95_ms']:>10}"
+                f"{run['p99_ms']:>10}{run['queries_per_request']:>9}{run['errors']:>8}"
+            )
+            if 'generation_per_s' in run:
+                self.stdout.write(f"  generated {run['stories_generated']} stories "
+                                  f"({run['generation_per_s']}/s, {run['stories_failed']} failed)")
+        for name, run in results.get('micro', {}).items():
+            self.stdout.write(f"  {name:<26} median {run['median_us']:>10} us  {run['ops_per_sec']:>10} ops/s")
+        self.stdout.write(f"peak RSS {results['meta']['peak_rss_mb']} MB")
+
+        if baseline:
+            self.stdout.write('')
+            self.stdout.write(f"compared with {baseline.get('meta', {}).get('commit') or 'baseline'}:")
+            for scenario, metric, old, new, change in compare(results, baseline):
+                delta = f"{change:+.1f}%" if change is not None else 'n/a'
+                self.stdout.write(f"  {scenario:<26}{metric:<22}{old:>10} -> {new:<10} {delta}")
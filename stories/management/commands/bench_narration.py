@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from stories.tts import get_tts_engine, split_into_chunks, synthesize_chunks, voice_options
+
+
+class Command(BaseCommand):
+    help = 'Compare single-blob and chunked parallel narration (time to first audio and total)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--engine', default='fake', help='TTS engine name from NARRATION_ENGINES')
+        parser.add_argument('--words', type=int, default=1000, help='Story length in words')
+        parser.add_argument('--latency', type=float, default=0.3,
+                            help='Fake engine: fixed seconds per synthesis call')
+        parser.add_argument('--seconds-per-char', type=float, default=0.0005,
+                            help='Fake engine: extra seconds per character')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--prefetch', type=int, default=4)
+        parser.add_argument('--runs', type=int, default=3)
+
+    def handle(self, *args, **options):
+        sentence = 'The little fox looked up at the bright stars and smiled. '
+        text = ' '.join((sentence * (options['words'] // 10 + 1)).split()[:options['words']])
+        engines = {
+            options['engine']: {
+                'latency': options['latency'],
+                'seconds_per_char': options['seconds_per_char'],
+            } if options['engine'] == 'fake' else {}
+        }
+
+        with override_settings(NARRATION_ENGINES=engines, NARRATION_TTS_WORKERS=options['workers'],
+                               NARRATION_TTS_PREFETCH=options['prefetch']):
+            engine = get_tts_engine(options['engine'])
+            voice = voice_options('en')
+
+            blob = []
+            chunked_first, chunked_total = [], []
+            for _ in range(options['runs']):
+                start = time.perf_counter()
+                engine.synthesize(text, voice)
+                blob.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                for index, _audio in enumerate(synthesize_chunks(text, voice, engine=engine)):
+                    if index == 0:
+                        chunked_first.append(time.perf_counter() - start)
+                chunked_total.append(time.perf_counter() - start)
+
+        chunks = len(split_into_chunks(text))
+        blob_s = statistics.median(blob)
+        self.stdout.write(f"{options['words']} words, {chunks} chunks, engine={options['engine']}")
+        self.stdout.write(f"single blob:      first audio {blob_s:.2f}s  total {blob_s:.2f}s")
+        self.stdout.write(
+            f"chunked parallel: first audio {statistics.median(chunked_first):.2f}s  "
+            f"total {statistics.median(chunked_total):.2f}s"
+        )
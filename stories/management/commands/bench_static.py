@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from stories.assets import ENCODING_SUFFIXES
+
+PAGE_ASSETS = ('css/style.css', 'js/app.js')
+
+
+class Command(BaseCommand):
+    help = ('Collect the static assets into a scratch STATIC_ROOT and report the bytes on the wire '
+            'for the home page and its assets: source files as before, minified and precompressed now')
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix='vocaltales-static-bench-')
+        try:
+            with override_settings(STATIC_ROOT=Path(workdir), ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                staticfiles_storage._setup()
+                call_command('collectstatic', interactive=False, verbosity=0)
+                staticfiles_storage._setup()
+                self.report()
+        finally:
+            staticfiles_storage._setup()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def report(self):
+        client = Client()
+        rows = [('index.html', len(client.get('/').content),
+                 len(client.get('/', HTTP_ACCEPT_ENCODING='gzip').content), None)]
+        for name in PAGE_ASSETS:
+            # Before: the source file, served as is
+            before = len((Path(settings.STATICFILES_DIRS[0]) / name).read_bytes())
+            hashed = staticfiles_storage.stored_name(name)
+            gz = self.wire_bytes(client, hashed, 'gzip')
+            br = None
+            if Path(staticfiles_storage.path(hashed) + ENCODING_SUFFIXES['br']).exists():
+                br = self.wire_bytes(client, hashed, 'br')
+            rows.append((name, before, gz, br))
+
+        self.stdout.write(f"{'file':<16}{'before':>10}{'gzip':>10}{'br':>10}{'saved':>8}")
+        total_before = total_after = 0
+        for name, before, gz, br in rows:
+            after = min(size for size in (gz, br) if size is not None)
+            total_before += before
+            total_after += after
+            self.stdout.write(f"{name:<16}{before:>10}{gz:>10}{br if br is not None else '-':>10}"
+                              f"{1 - after / before:>8.0%}")
+        self.stdout.write(self.style.SUCCESS(
+            f"first visit: {total_before} -> {total_after} bytes on the wire ({1 - total_after / total_before:.0%} less); "
+            f"repeat visits revalidate only the page, the hashed assets are cached as immutable"
+        ))
+
+    def wire_bytes(self, client, name, encoding):
+        response = client.get(staticfiles_storage.url(name), HTTP_ACCEPT_ENCODING=encoding)
+        return len(b''.join(response.streaming_content))
@@ -0,0 +1,146 @@
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+from stories.language import STOPWORDS
+from stories.language_samples import LABELED_SAMPLES
+from stories.models import GeneratedStory
+
+BEFORE = ('stories', '0010_generatedstory_llm_usage')  # last schema with plain-text bodies
+WORDS = sorted(
+    set(STOPWORDS['en'].split())
+    | {word.strip('?,.!').lower() for language, text in LABELED_SAMPLES if language == 'en' for word in text.split()}
+    | set('little big brave gentle sleepy curious happy dragon fox owl rabbit moon star forest river castle '
+          'garden ocean friend friends mother father laughed smiled whispered looked found walked flew '
+          'together never always again night morning sky tree home light dark wind bright soft warm'.split())
+)
+
+
+class Command(BaseCommand):
+    help = ('Fill a scratch SQLite database with synthetic stories in the old plain-text schema, convert it '
+            'with the compressed-body migrations, and compare database size and list-query memory')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stories', type=int, default=1_000_000, help='Synthetic stories to create')
+        parser.add_argument('--words', type=int, default=450, help='Words per story (a medium-length story)')
+        parser.add_argument('--rows', type=int, default=10_000, help='Rows loaded by the list-query measurement')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark measures an SQLite file; DATABASE_URL is not SQLite')
+
+        workdir = tempfile.mkdtemp(prefix='vocaltales-storage-bench-')
+        database = connection.settings_dict
+        saved_name = database['NAME']
+        connection.close()
+        database['NAME'] = str(Path(workdir) / 'bench.sqlite3')
+        try:
+            self.run(options)
+        finally:
+            connection.close()
+            database['NAME'] = saved_name
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run(self, options):
+        call_command('migrate', 'auth', verbosity=0)
+        call_command('migrate', *BEFORE, verbosity=0)
+        apps = MigrationExecutor(connection).loader.project_state(BEFORE).apps
+        self.stdout.write(f"creating {options['stories']} stories of {options['words']} words ...")
+        started = time.perf_counter()
+        self.fill(apps, options)
+        self.stdout.write(f"  {time.perf_counter() - started:.0f} s")
+        before = self.measure(apps.get_model('stories', 'GeneratedStory'), 'content', options['rows'])
+
+        self.stdout.write('migrating to compressed bodies ...')
+        started = time.perf_counter()
+        call_command('migrate', 'stories', verbosity=0)
+        migration_seconds = time.perf_counter() - started
+        after = self.measure(GeneratedStory, 'body', options['rows'], deferred=('body',))
+
+        self.stdout.write('')
+        self.stdout.write(f"{'':<28}{'before':>14}{'after':>14}{'change':>9}")
+        for label, key, unit in (
+            ('database file', 'file_mb', 'MB'),
+            ('stories_generatedstory', 'table_mb', 'MB'),
+            ('story bodies', 'body_mb', 'MB'),
+            (f"list query, {options['rows']} rows", 'list_mb', 'MB peak'),
+            ('list query time', 'list_ms', 'ms'),
+        ):
+            change = after[key] / before[key] - 1 if before[key] else 0
+            self.stdout.write(f"{label:<28}{before[key]:>10} {unit:<3}{after[key]:>10} {unit:<3}{change:>+9.0%}")
+        self.stdout.write(self.style.SUCCESS(f"migration converted {options['stories']} rows in {migration_seconds:.0f} s"))
+
+    def fill(self, apps, options, batch_size=5000):
+        StoryRequest = apps.get_model('stories', 'StoryRequest')
+        Story = apps.get_model('stories', 'GeneratedStory')
+        rng = random.Random(options['seed'])
+        sentences = [self.sentence(rng) for _ in range(5000)]
+        words_per_sentence = sum(len(sentence.split()) for sentence in sentences) / len(sentences)
+        per_story = max(1, round(options['words'] / words_per_sentence))
+        user = User.objects.create(username='demo_user')
+
+        for offset in range(0, options['stories'], batch_size):
+            count = min(batch_size, options['stories'] - offset)
+            with transaction.atomic():
+                requests = StoryRequest.objects.bulk_create(
+                    [StoryRequest(user_id=user.pk, transcription='a bedtime story', genre='bedtime')
+                     for _ in range(count)]
+                )
+                stories = []
+                for story_request in requests:
+                    content = ' '.join(rng.choices(sentences, k=per_story))
+                    word_count = len(content.split())
+                    stories.append(Story(
+                        request_id=story_request.pk, title='The Sleepy Owl', content=content, status='completed',
+                        word_count=word_count, estimated_duration=int(word_count / 150 * 60),
+                    ))
+                Story.objects.bulk_create(stories)
+
+    def sentence(self, rng):
+        words = rng.choices(WORDS, k=rng.randint(6, 16))
+        return ' '.join(words).capitalize() + rng.choice('...!?')
+
+    def measure(self, model, body_column, rows, deferred=()):
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM')
+            page_size = cursor.execute('PRAGMA page_size').fetchone()[0]
+            page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+            table_bytes = cursor.execute(
+                "SELECT SUM(pgsize) FROM dbstat WHERE name = %s", [model._meta.db_table]
+            ).fetchone()[0]
+            body_bytes = cursor.execute(
+                f"SELECT SUM(LENGTH(CAST({body_column} AS BLOB))) FROM {model._meta.db_table}"
+            ).fetchone()[0]
+
+        # What any title/count query pays: every column the default manager
+        # loads, newest first. Rows rather than instances, since historical
+        # models don't run this project's post_init receivers.
+        columns = [field.attname for field in model._meta.concrete_fields if field.attname not in deferred]
+        queryset = model.objects.order_by('-id').values_list(*columns)[:rows]
+        started = time.perf_counter()
+        list(queryset.all())
+        list_seconds = time.perf_counter() - started
+        tracemalloc.start()
+        loaded = list(queryset.all())
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del loaded
+
+        megabytes = 1024 * 1024
+        return {
+            'file_mb': round(page_size * page_count / megabytes, 1),
+            'table_mb': round(table_bytes / megabytes, 1),
+            'body_mb': round(body_bytes / megabytes, 1),
+            'list_mb': round(peak / megabytes, 1),
+            'list_ms': round(list_seconds * 1000),
+        }
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from stories.tts import prune_narration_cache
+
+
+class Command(BaseCommand):
+    help = 'Evict least recently used narration audio from the on-disk cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-bytes', type=int, default=settings.NARRATION_CACHE_MAX_BYTES,
+                            help='Shrink the cache to at most this many bytes')
+        parser.add_argument('--max-age-days', type=float, default=None,
+                            help='Also remove files not played for this many days')
+        parser.add_argument('--clear', action='store_true',
+                            help='Remove every cached narration')
+
+    def handle(self, *args, **options):
+        max_bytes = 0 if options['clear'] else options['max_bytes']
+        max_age = options['max_age_days'] * 86400 if options['max_age_days'] else None
+
+        result = prune_narration_cache(max_bytes, max_age_seconds=max_age)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {result['removed']} files ({result['freed_bytes']} bytes); "
+            f"{result['remaining_bytes']} bytes remain in {settings.NARRATION_CACHE_DIR}"
+        ))
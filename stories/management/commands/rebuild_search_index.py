@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from stories.search import get_search_backend, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-index every completed story for full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Stories loaded per query while indexing')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        if backend is None:
+            self.stdout.write(self.style.WARNING('This database has no full-text search backend'))
+            return
+
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} stories in {backend.table}"))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stories.stats import counter_drift, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recount the stats counters from the story tables, or report how far they have drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Only compare the counters with a fresh count; exit non-zero on drift')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = counter_drift()
+            for (dimension, value), (stored, actual) in sorted(drift.items()):
+                self.stdout.write(
+                    f"{dimension}:{value or '-'} stored={stored[0]} ({stored[1]:.1f}s) "
+                    f"actual={actual[0]} ({actual[1]:.1f}s)"
+                )
+            if drift:
+                raise CommandError(f"{len(drift)} counters have drifted; run rebuild_story_stats to fix")
+            self.stdout.write(self.style.SUCCESS('Stats counters match the story tables'))
+            return
+
+        rows = rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} stats counters"))
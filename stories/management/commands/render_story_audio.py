@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from stories.models import GeneratedStory
+from stories.tts import ensure_story_audio
+
+
+class Command(BaseCommand):
+    help = 'Pre-render narration for completed stories that have no audio yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('story_ids', nargs='*', type=int, help='Only render these stories')
+
+    def handle(self, *args, **options):
+        stories = GeneratedStory.objects.filter(status='completed', audio_file='').select_related('request')
+        if options['story_ids']:
+            stories = stories.filter(pk__in=options['story_ids'])
+
+        for story in stories.iterator():
+            try:
+                ensure_story_audio(story)
+                self.stdout.write(f"Story {story.pk}: {story.audio_size} bytes")
+            except Exception as e:
+                self.stderr.write(f"Story {story.pk}: failed ({e})")
@@ -0,0 +1,42 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from stories.jobs import claim_next_job, default_worker_id, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run a dedicated worker that claims and generates queued stories'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.STORY_JOB_WORKERS,
+                            help='Number of concurrent generations')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+
+        def work():
+            worker_id = f"{default_worker_id()}:cli"
+            while True:
+                close_old_connections()
+                job = claim_next_job(worker_id)
+                if job is None:
+                    if options['once']:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                run_job(job)
+                self.stdout.write(f"Job {job.pk}: {job.status}")
+
+        self.stdout.write(f"Story worker running with {options['workers']} threads")
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [executor.submit(work) for _ in range(options['workers'])]
+            for future in futures:
+                future.result()
@@ -0,0 +1,189 @@
+"""
+Per-stage latency histograms and usage counters, exported at ``/metrics``.
+
+Hot paths wrap each stage in ``timed(stage)``; the observation lands in a
+fixed-bucket histogram kept as counters in process memory (beside the
+prompt-cache and rate-limit counters), as in ``prometheus_client``'s
+default registry. Each worker process reports its own traffic at
+``/metrics``, so Prometheus scrapes every worker and aggregates across them;
+a restarted process starts from zero, which Prometheus handles as a counter
+reset. ``render_prometheus`` turns the counters, plus token usage, cache hit
+rates and per-backend routing stats, into the Prometheus text exposition
+format.
+"""
+import time
+
+from .caching import cache_stats, increment_counter, read_counters
+from .ratelimit import rate_limit_stats
+from .routing import routing_stats
+
+STAGES = (
+    'create_story',       # CreateStoryView end to end
+    'admission',          # rate-limit admission check
+    'request_write',      # StoryRequest insert
+    'enqueue',            # job insert (and generation, in eager mode)
+    'prompt',             # _create_story_prompt
+    'llm',                # provider call, or the whole stream
+    'llm_first_token',    # time to first streamed token
+    'parse',              # _parse_story_response
+    'story_write',        # GeneratedStory insert/update (and its signals)
+    'narration_lookup',   # narration cache check in GTTSAudioView
+    'tts_chunk',          # one TTS engine call
+    'tts_first_chunk',    # time to the first narration bytes
+    'tts_total',          # full narration, as streamed to the client
+)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+TOKEN_KINDS = ('prompt', 'completion')
+NARRATION_EVENTS = ('hits', 'misses')
+
+
+def _bucket_label(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def observe(stage: str, seconds: float):
+    """Add one latency observation to ``stage``'s histogram"""
+    bound = next(bound for bound in BUCKETS if seconds <= bound)
+    increment_counter(f"metrics:{stage}:le:{_bucket_label(bound)}")
+    increment_counter(f"metrics:{stage}:count")
+    increment_counter(f"metrics:{stage}:sum", seconds)
+
+
+async def aobserve(stage: str, seconds: float):
+    # Counters live in memory: recording one never blocks the event loop
+    observe(stage, seconds)
+
+
+class timed:
+    """Context manager timing a block into a stage histogram; ``seconds`` is set on exit.
+
+    Async views can use ``async with`` as well.
+    """
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.seconds = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._started
+        observe(self.stage, self.seconds)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info):
+        self.seconds = time.perf_counter() - self._started
+        await aobserve(self.stage, self.seconds)
+
+
+def record_tokens(usage):
+    """Count ``(prompt_tokens, completion_tokens)`` reported by a provider"""
+    if not usage:
+        return
+    for kind, tokens in zip(TOKEN_KINDS, usage):
+        if tokens:
+            increment_counter(f"metrics:tokens:{kind}", tokens)
+
+
+def record_narration_event(name: str):
+    increment_counter(f"metrics:narration:{name}")
+
+
+async def arecord_narration_event(name: str):
+    record_narration_event(name)
+
+
+def histograms() -> dict:
+    """``{stage: {'buckets': [(le, cumulative count)], 'count': n, 'sum': seconds}}``"""
+    keys = []
+    for stage in STAGES:
+        keys += [f"metrics:{stage}:le:{_bucket_label(bound)}" for bound in BUCKETS]
+        keys += [f"metrics:{stage}:count", f"metrics:{stage}:sum"]
+    values = read_counters(keys)
+
+    result = {}
+    for stage in STAGES:
+        cumulative, buckets = 0, []
+        for bound in BUCKETS:
+            label = _bucket_label(bound)
+            cumulative += values[f"metrics:{stage}:le:{label}"]
+            buckets.append((label, cumulative))
+        result[stage] = {
+            'buckets': buckets,
+            'count': values[f"metrics:{stage}:count"],
+            'sum': values[f"metrics:{stage}:sum"],
+        }
+    return result
+
+
+def token_stats() -> dict:
+    values = read_counters([f"metrics:tokens:{kind}" for kind in TOKEN_KINDS])
+    return {kind: values[f"metrics:tokens:{kind}"] for kind in TOKEN_KINDS}
+
+
+def narration_stats() -> dict:
+    values = read_counters([f"metrics:narration:{name}" for name in NARRATION_EVENTS])
+    return {name: values[f"metrics:narration:{name}"] for name in NARRATION_EVENTS}
+
+
+def _family(lines: list, name: str, kind: str, help_text: str, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+
+def render_prometheus() -> str:
+    """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    stage_histograms = histograms()
+    lines.append('# HELP vocaltales_stage_seconds Time spent in each stage of story generation and narration')
+    lines.append('# TYPE vocaltales_stage_seconds histogram')
+    for stage, histogram in stage_histograms.items():
+        for label, count in histogram['buckets']:
+            lines.append(f'vocaltales_stage_seconds_bucket{{stage="{stage}",le="{label}"}} {count}')
+        lines.append(f'vocaltales_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+        lines.append(f'vocaltales_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+    _family(lines, 'vocaltales_llm_tokens_total', 'counter', 'LLM tokens reported by the provider',
+            [({'kind': kind}, count) for kind, count in token_stats().items()])
+
+    prompt_cache = cache_stats()
+    _family(lines, 'vocaltales_prompt_cache_events_total', 'counter', 'Prompt-result cache lookups by outcome',
+            [({'event': event}, count) for event, count in prompt_cache.items() if event != 'hit_rate'])
+    _family(lines, 'vocaltales_prompt_cache_hit_ratio', 'gauge', 'Share of prompt-cache lookups served from cache',
+            [({}, prompt_cache['hit_rate'] / 100)])
+
+    narration = narration_stats()
+    lookups = sum(narration.values())
+    _family(lines, 'vocaltales_narration_cache_events_total', 'counter', 'Narration cache lookups by outcome',
+            [({'event': event}, count) for event, count in narration.items()])
+    _family(lines, 'vocaltales_narration_cache_hit_ratio', 'gauge', 'Share of narrations served from cache',
+            [({}, round(narration['hits'] / lookups, 4) if lookups else 0)])
+
+    _family(lines, 'vocaltales_llm_rate_limit_events_total', 'counter', 'LLM admission-control and retry events',
+            [({'event': event}, count) for event, count in rate_limit_stats().items()])
+
+    backends = [
+        (router, backend) for router, stats in routing_stats().items() for backend in stats
+    ]
+    _family(lines, 'vocaltales_llm_backend_latency_seconds', 'gauge', 'Rolling LLM backend latency by quantile', [
+        ({'router': router, 'backend': backend['model'], 'kind': kind, 'quantile': quantile}, backend[prefix + key])
+        for router, backend in backends
+        for kind, prefix in (('completion', ''), ('first_token', 'first_token_'))
+        for quantile, key in (('0.5', 'p50_seconds'), ('0.95', 'p95_seconds'))
+        if backend[prefix + key] is not None
+    ])
+    _family(lines, 'vocaltales_llm_backend_error_ratio', 'gauge', 'Rolling LLM backend error rate', [
+        ({'router': router, 'backend': backend['model']}, backend['error_rate']) for router, backend in backends
+    ])
+    _family(lines, 'vocaltales_llm_backend_circuit_open', 'gauge', '1 while the backend circuit breaker is open', [
+        ({'router': router, 'backend': backend['model']}, int(backend['state'] == 'open'))
+        for router, backend in backends
+    ])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0003_storyjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyrequest',
+            name='always_fresh',
+            field=models.BooleanField(default=False),
+        ),
+    ]
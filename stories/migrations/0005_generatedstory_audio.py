@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0004_storyrequest_always_fresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedstory',
+            name='audio_duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generatedstory',
+            name='audio_file',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='generatedstory',
+            name='audio_size',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:32
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0005_generatedstory_audio'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoritestory',
+            index=models.Index(fields=['user', '-saved_at'], name='favorite_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='generatedstory',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['-created_at', '-id'], name='story_completed_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storyjob',
+            index=models.Index(fields=['status', 'locked_at'], name='job_claim_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storyrequest',
+            index=models.Index(fields=['user', '-created_at'], name='request_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storysession',
+            index=models.Index(fields=['user', 'story'], name='session_user_story_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storysession',
+            index=models.Index(fields=['user', '-started_at'], name='session_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:34
+
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+
+REQUEST_DIMENSIONS = ('genre', 'length', 'language')
+
+
+def seed_counters(apps, schema_editor):
+    """Count the existing rows (a frozen copy of ``stories.stats.count_from_tables`` as of this migration)"""
+    StoryRequest = apps.get_model('stories', 'StoryRequest')
+    GeneratedStory = apps.get_model('stories', 'GeneratedStory')
+    StoryCounter = apps.get_model('stories', 'StoryCounter')
+    using = schema_editor.connection.alias
+
+    totals = {('requests', ''): (StoryRequest.objects.using(using).count(), 0.0)}
+    for dimension in REQUEST_DIMENSIONS:
+        for row in StoryRequest.objects.using(using).values(dimension).annotate(n=Count('id')).order_by():
+            totals[(dimension, row[dimension])] = (row['n'], 0.0)
+
+    elapsed = ExpressionWrapper(F('updated_at') - F('created_at'), output_field=DurationField())
+    rows = GeneratedStory.objects.using(using).values('status').annotate(n=Count('id'), elapsed=Sum(elapsed)).order_by()
+    for row in rows:
+        seconds = row['elapsed'].total_seconds() if row['status'] == 'completed' and row['elapsed'] else 0.0
+        totals[('status', row['status'])] = (row['n'], seconds)
+
+    StoryCounter.objects.using(using).bulk_create([
+        StoryCounter(dimension=dimension, value=value, count=count, total_seconds=seconds)
+        for (dimension, value), (count, seconds) in totals.items()
+    ])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0006_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(blank=True, max_length=20)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'unique_together': {('dimension', 'value')},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.db import migrations
+
+# The index tables as this migration creates them (a frozen copy of the
+# statements in stories.search, which may change after this migration)
+CREATE_SQL = {
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS stories_story_fts USING fts5("
+        "title, content, genre UNINDEXED, language UNINDEXED, created_at UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2')",
+    ),
+    'postgresql': (
+        "CREATE TABLE IF NOT EXISTS stories_story_search ("
+        "story_id bigint PRIMARY KEY REFERENCES stories_generatedstory (id) "
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "title varchar(200) NOT NULL, genre varchar(20) NOT NULL, language varchar(5) NOT NULL, "
+        "created_at timestamp with time zone NOT NULL, document tsvector NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS stories_story_search_document_idx ON stories_story_search USING GIN (document)",
+    ),
+}
+DROP_SQL = {
+    'sqlite': ("DROP TABLE IF EXISTS stories_story_fts",),
+    'postgresql': ("DROP TABLE IF EXISTS stories_story_search",),
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    """Full-text index beside stories_generatedstory (FTS5 or tsvector + GIN).
+
+    Existing stories are indexed by ``manage.py rebuild_search_index``.
+    """
+
+    dependencies = [
+        ('stories', '0007_storycounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0008_story_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storyjob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
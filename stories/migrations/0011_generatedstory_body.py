@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0010_generatedstory_llm_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedstory',
+            name='body',
+            field=models.BinaryField(default=b'', editable=False),
+        ),
+        migrations.AddField(
+            model_name='generatedstory',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+    ]
@@ -0,0 +1,61 @@
+import zlib
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+EXCERPT_LENGTH = 150
+
+
+# Frozen copies of the helpers in stories.models as of this migration
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), 9) if text else b''
+
+
+def decompress_text(data) -> str:
+    return zlib.decompress(data).decode('utf-8') if data else ''
+
+
+def convert(apps, schema_editor, source, assignments, transform):
+    """Rewrite every story in primary-key batches, one transaction per batch"""
+    GeneratedStory = apps.get_model('stories', 'GeneratedStory')
+    using = schema_editor.connection.alias
+    table = schema_editor.quote_name(GeneratedStory._meta.db_table)
+    columns = ', '.join(f"{schema_editor.quote_name(column)} = %s" for column in assignments)
+    sql = f"UPDATE {table} SET {columns} WHERE {schema_editor.quote_name(GeneratedStory._meta.pk.column)} = %s"
+    last = 0
+    while True:
+        with transaction.atomic(using=using):
+            batch = list(
+                GeneratedStory.objects.using(using).filter(pk__gt=last).order_by('pk').values_list('pk', source)[:BATCH_SIZE]
+            )
+            if not batch:
+                return
+            with schema_editor.connection.cursor() as cursor:
+                cursor.executemany(sql, [(*transform(value), pk) for pk, value in batch])
+        last = batch[-1][0]
+
+
+def compress_bodies(apps, schema_editor):
+    convert(apps, schema_editor, 'content', ('body', 'excerpt'),
+            lambda text: (compress_text(text), text[:EXCERPT_LENGTH]))
+
+
+def decompress_bodies(apps, schema_editor):
+    convert(apps, schema_editor, 'body', ('content',), lambda body: (decompress_text(body),))
+
+
+class Migration(migrations.Migration):
+    """Move story bodies into the compressed ``body`` column.
+
+    Not atomic: each batch commits on its own, so a large table is converted
+    without one huge transaction, and an interrupted run can simply be rerun.
+    """
+    atomic = False
+
+    dependencies = [
+        ('stories', '0011_generatedstory_body'),
+    ]
+
+    operations = [
+        migrations.RunPython(compress_bodies, decompress_bodies),
+    ]
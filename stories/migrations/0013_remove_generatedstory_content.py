@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 23:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0012_compress_story_bodies'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='generatedstory',
+            name='content',
+        ),
+    ]
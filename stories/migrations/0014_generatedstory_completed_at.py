@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:22
+
+from django.db import migrations, models
+from django.db.models import DurationField, ExpressionWrapper, F, Sum
+
+
+def backfill_completed_at(apps, schema_editor):
+    """Existing stories only have ``updated_at``, the closest record of when they completed.
+
+    The completed-story counter is recomputed from the backfilled column so
+    the stored generation time matches what ``stories.stats`` now counts.
+    """
+    GeneratedStory = apps.get_model('stories', 'GeneratedStory')
+    StoryCounter = apps.get_model('stories', 'StoryCounter')
+    using = schema_editor.connection.alias
+
+    completed = GeneratedStory.objects.using(using).filter(status='completed')
+    completed.update(completed_at=F('updated_at'))
+    elapsed = ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
+    total = completed.aggregate(elapsed=Sum(elapsed))['elapsed']
+    StoryCounter.objects.using(using).filter(dimension='status', value='completed').update(
+        total_seconds=total.total_seconds() if total else 0.0
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0013_remove_generatedstory_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedstory',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 22:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stories', '0014_generatedstory_completed_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedstory',
+            name='audio_rendered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
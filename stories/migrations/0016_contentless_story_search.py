@@ -0,0 +1,84 @@
+import re
+import zlib
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+# The SQLite index as of this migration: contentless, plus the story -> FTS
+# rowid map (a frozen copy of the statements in stories.search)
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS stories_story_fts USING fts5("
+    "title, content, content = '', tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TABLE IF NOT EXISTS stories_story_fts_docs ("
+    "doc_id integer PRIMARY KEY AUTOINCREMENT, story_id integer NOT NULL UNIQUE)",
+)
+DROP_SQL = ("DROP TABLE IF EXISTS stories_story_fts", "DROP TABLE IF EXISTS stories_story_fts_docs")
+
+# The table 0008 created, which kept a full copy of every story's text
+OLD_CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS stories_story_fts USING fts5("
+    "title, content, genre UNINDEXED, language UNINDEXED, created_at UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+)
+
+# Frozen copies of the helpers in stories.models and stories.search as of this migration
+CJK = r'\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f'
+CJK_CHAR_RE = re.compile(f'([{CJK}])')
+
+
+def segment(text: str) -> str:
+    return ' '.join(CJK_CHAR_RE.sub(r' \1 ', text or '').split())
+
+
+def decompress_text(data) -> str:
+    return zlib.decompress(data).decode('utf-8') if data else ''
+
+
+def completed_stories(apps, schema_editor):
+    GeneratedStory = apps.get_model('stories', 'GeneratedStory')
+    return (
+        GeneratedStory.objects.using(schema_editor.connection.alias).filter(status='completed')
+        .order_by('pk').values_list('pk', 'title', 'body', 'created_at', 'request__genre', 'request__language')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def make_contentless(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL + CREATE_SQL:
+        schema_editor.execute(sql)
+    with schema_editor.connection.cursor() as cursor:
+        for pk, title, body, created_at, genre, language in completed_stories(apps, schema_editor):
+            cursor.execute("INSERT INTO stories_story_fts_docs (story_id) VALUES (%s)", [pk])
+            cursor.execute(
+                "INSERT INTO stories_story_fts (rowid, title, content) VALUES (%s, %s, %s)",
+                [cursor.lastrowid, segment(title), segment(decompress_text(body))],
+            )
+
+
+def restore_stored_content(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL + OLD_CREATE_SQL:
+        schema_editor.execute(sql)
+    with schema_editor.connection.cursor() as cursor:
+        for pk, title, body, created_at, genre, language in completed_stories(apps, schema_editor):
+            cursor.execute(
+                "INSERT INTO stories_story_fts (rowid, title, content, genre, language, created_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                [pk, segment(title), segment(decompress_text(body)), genre, language, created_at.isoformat()],
+            )
+
+
+class Migration(migrations.Migration):
+    """Rebuild the SQLite index contentless, so it no longer stores every story uncompressed"""
+
+    dependencies = [
+        ('stories', '0015_generatedstory_audio_rendered_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_contentless, restore_stored_content),
+    ]
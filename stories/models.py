@@ -1,7 +1,36 @@
-from django.db import models
+import zlib
+
+from django.db import models, router, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+EXCERPT_LENGTH = 150
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), 9) if text else b''
+
+
+def decompress_text(data) -> str:
+    return zlib.decompress(data).decode('utf-8') if data else ''
+
+class CountedModel(models.Model):
+    """Saves in a transaction, so the stats counters that post_save handlers
+    update (see stories.stats) commit or roll back together with the row.
+
+    Deletes need nothing extra: Django already sends post_delete inside the
+    delete's transaction.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
 class ChildProfile(models.Model):
     AGE_CHOICES = [
         (4, '4 years'),
@@ -24,7 +53,7 @@ class ChildProfile(models.Model):
     def __str__(self):
         return f"{self.name} ({self.age} years)"
 
-class StoryRequest(models.Model):
+class StoryRequest(CountedModel):
     GENRE_CHOICES = [
         ('adventure', 'Adventure'),
         ('fairy_tale', 'Fairy Tale'),
@@ -65,12 +94,31 @@ class StoryRequest(models.Model):
     characters = models.CharField(max_length=200, blank=True)
     setting = models.CharField(max_length=200, blank=True)
     moral_lesson = models.CharField(max_length=200, blank=True)
+    always_fresh = models.BooleanField(default=False)  # skip the prompt-result cache
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            # A user's requests by date
+            models.Index(fields=['user', '-created_at'], name='request_user_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"Story request by {self.user.username} - {self.genre}"
 
-class GeneratedStory(models.Model):
+class GeneratedStoryQuerySet(models.QuerySet):
+    def with_content(self):
+        """Load the story body with the row instead of on first access"""
+        return self.defer(None)
+
+
+class GeneratedStoryManager(models.Manager.from_queryset(GeneratedStoryQuerySet)):
+    def get_queryset(self):
+        # Bodies are loaded lazily, on first access to ``content``
+        return super().get_queryset().defer('body')
+
+
+class GeneratedStory(CountedModel):
     STATUS_CHOICES = [
         ('generating', 'Generating'),
         ('completed', 'Completed'),
@@ -79,20 +127,50 @@ class GeneratedStory(models.Model):
     
     request = models.OneToOneField(StoryRequest, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
-    content = models.TextField()
+    body = models.BinaryField(default=b'', editable=False)  # zlib-compressed UTF-8 story text
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default='')
     ai_model_used = models.CharField(max_length=50, default='groq-llama')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='generating')
     word_count = models.IntegerField(default=0)
     estimated_duration = models.IntegerField(default=0)  # in seconds
+    audio_file = models.CharField(max_length=255, blank=True)  # pre-rendered narration, relative to MEDIA_ROOT
+    audio_size = models.IntegerField(default=0)  # in bytes
+    audio_duration = models.FloatField(null=True, blank=True)  # in seconds
+    audio_rendered_at = models.DateTimeField(null=True, blank=True)  # part of the detail response's version
+    # Measured on the LLM call that produced the content; null when it came from the prompt cache
+    llm_seconds = models.FloatField(null=True, blank=True)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by the generator when the story completes; later writes (narration) leave it alone
+    completed_at = models.DateTimeField(null=True, blank=True)
     
-    def save(self, *args, **kwargs):
-        if self.content:
-            self.word_count = len(self.content.split())
-            # Estimate 150 words per minute reading speed
-            self.estimated_duration = int((self.word_count / 150) * 60)
-        super().save(*args, **kwargs)
+    objects = GeneratedStoryManager()
+    
+    class Meta:
+        indexes = [
+            # Story library and stats only ever read completed stories, newest first
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='completed'),
+                name='story_completed_recent_idx',
+            ),
+        ]
+    
+    @property
+    def content(self) -> str:
+        return decompress_text(self.body)
+    
+    @content.setter
+    def content(self, text: str):
+        """Store the text compressed, with the figures derived from it, once"""
+        text = text or ''
+        self.body = compress_text(text)
+        self.excerpt = text[:EXCERPT_LENGTH]
+        self.word_count = len(text.split())
+        # Estimate 150 words per minute reading speed
+        self.estimated_duration = int((self.word_count / 150) * 60)
     
     def __str__(self):
         return f"{self.title} - {self.status}"
@@ -105,6 +183,12 @@ class StorySession(models.Model):
     duration_listened = models.IntegerField(default=0)  # in seconds
     rating = models.IntegerField(null=True, blank=True, choices=[(i, i) for i in range(1, 6)])
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'story'], name='session_user_story_idx'),
+            models.Index(fields=['user', '-started_at'], name='session_user_recent_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.user.username} - {self.story.title}"
 
@@ -115,6 +199,51 @@ class FavoriteStory(models.Model):
     
     class Meta:
         unique_together = ('user', 'story')
+        indexes = [
+            # A user's favorites, most recently saved first
+            models.Index(fields=['user', '-saved_at'], name='favorite_user_recent_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.story.title}"
+
+class StoryJob(models.Model):
+    """Durable queue entry for generating a story in the background"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    story = models.OneToOneField(GeneratedStory, on_delete=models.CASCADE, related_name='job')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    run_after = models.DateTimeField(null=True, blank=True)  # held back after an upstream rate limit
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            # Workers claim queued jobs and jobs with expired leases
+            models.Index(fields=['status', 'locked_at'], name='job_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Job {self.pk} for story {self.story_id} - {self.status}"
+
+class StoryCounter(models.Model):
+    """Running total behind /api/stats/, kept in step with story and request writes"""
+    dimension = models.CharField(max_length=20)  # requests, genre, length, language or status
+    value = models.CharField(max_length=20, blank=True)
+    count = models.BigIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)  # generation time, for completed stories
+    
+    class Meta:
+        unique_together = ('dimension', 'value')
+    
+    def __str__(self):
+        return f"{self.dimension}:{self.value} = {self.count}"
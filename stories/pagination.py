@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class StoryCursorPagination(CursorPagination):
+    """Newest stories first; cursors stay stable while new stories are added"""
+    ordering = ('-created_at', '-id')  # id breaks ties between same-instant stories
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -0,0 +1,211 @@
+"""
+Write-behind ingestion of listening progress.
+
+The player reports its position every few seconds while a story plays.
+Writing each heartbeat to ``StorySession`` would cost one UPDATE per
+listener per heartbeat, so heartbeats are merged in memory instead and
+written in ``bulk_update`` batches every ``LISTENING_FLUSH_INTERVAL``
+seconds, and at once when a session completes.
+
+Merging is idempotent: the furthest position wins, completion is sticky
+and the latest rating is kept. The buffer merges that way, and so does the
+UPDATE itself (``GREATEST``/``COALESCE`` against the stored values, with no
+read first), so retried, reordered or duplicated heartbeats, and several
+processes each flushing their own buffer, can never move progress
+backwards. A failed flush puts its entries back to be retried with the
+next one.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import get_story_cache
+from .models import StorySession
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('duration_listened', 'completed_at', 'rating')
+
+
+class Progress:
+    """What the buffer knows about one session since its last flush"""
+    __slots__ = ('position', 'completed_at', 'rating')
+
+    def __init__(self, position=0, completed_at=None, rating=None):
+        self.position = position
+        self.completed_at = completed_at
+        self.rating = rating
+
+    def merge(self, other: 'Progress'):
+        self.position = max(self.position, other.position)
+        self.completed_at = self.completed_at or other.completed_at
+        if other.rating is not None:
+            self.rating = other.rating
+
+    def as_update(self, session_id: int) -> StorySession:
+        """An unsaved session whose fields merge this progress into the stored row"""
+        completed_at = F('completed_at')
+        if self.completed_at:
+            completed_at = Coalesce(completed_at, Value(self.completed_at, output_field=DateTimeField()))
+        return StorySession(
+            pk=session_id,
+            duration_listened=Greatest(F('duration_listened'), Value(self.position)),
+            completed_at=completed_at,
+            rating=F('rating') if self.rating is None else Value(self.rating),
+        )
+
+
+class ProgressBuffer:
+    """Per-process buffer of heartbeats, flushed by a timer started on demand"""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+
+    def record(self, session_id: int, position: int, completed: bool = False, rating: int = None) -> int:
+        """Buffer one heartbeat; returns the furthest position known for the session"""
+        progress = Progress(position, timezone.now() if completed else None, rating)
+        with self._lock:
+            pending = self._pending.setdefault(session_id, Progress())
+            pending.merge(progress)
+            position = pending.position
+            if not completed and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if completed:
+            # A finished session is written now: the next screen shows it
+            self.flush([session_id])
+        return position
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, session_ids=None) -> int:
+        """Write buffered progress (all of it, or just ``session_ids``); returns sessions written"""
+        with self._lock:
+            if session_ids is None:
+                batch, self._pending = self._pending, {}
+            else:
+                batch = {pk: self._pending.pop(pk) for pk in session_ids if pk in self._pending}
+        if not batch:
+            return 0
+
+        try:
+            # One UPDATE per batch_size sessions; sessions deleted meanwhile match no row
+            return StorySession.objects.bulk_update(
+                [progress.as_update(pk) for pk, progress in batch.items()], FIELDS, batch_size=self.batch_size
+            )
+        except Exception:
+            # Keep the heartbeats for the next flush; merging makes the retry safe
+            with self._lock:
+                for pk, progress in batch.items():
+                    self._pending.setdefault(pk, Progress()).merge(progress)
+            raise
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        try:
+            close_old_connections()
+            self.flush()
+        except Exception:
+            logger.exception("Listening progress flush failed")
+        finally:
+            close_old_connections()
+        with self._lock:
+            # Heartbeats that arrived during (or were put back by) the flush
+            if self._pending and self._timer is None:
+                self._timer = threading.Timer(self.interval, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def discard(self):
+        """Drop everything buffered and stop the timer (tests and benchmarks)"""
+        with self._lock:
+            self._pending = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+def write_through(session_id: int, position: int, completed: bool = False, rating: int = None) -> int:
+    """The unbuffered path: one UPDATE per heartbeat, with the same merge rules"""
+    changes = {'duration_listened': Greatest('duration_listened', position)}
+    if rating is not None:
+        changes['rating'] = rating
+    StorySession.objects.filter(pk=session_id).update(**changes)
+    if completed:
+        StorySession.objects.filter(pk=session_id, completed_at__isnull=True).update(completed_at=timezone.now())
+    return position
+
+
+def session_exists(session_id: int) -> bool:
+    """Whether the session exists, remembered in the cache so heartbeats don't read the table"""
+    cache = get_story_cache()
+    key = f"listening-session:{session_id}"
+    if cache.get(key):
+        return True
+    exists = StorySession.objects.filter(pk=session_id).exists()
+    if exists:
+        remember_session(session_id)
+    return exists
+
+
+def remember_session(session_id: int):
+    get_story_cache().set(f"listening-session:{session_id}", True, timeout=settings.LISTENING_SESSION_CACHE_TTL)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_progress_buffer() -> ProgressBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = ProgressBuffer(settings.LISTENING_FLUSH_INTERVAL, settings.LISTENING_FLUSH_BATCH_SIZE)
+                atexit.register(flush_on_exit, _buffer)
+    return _buffer
+
+
+def flush_on_exit(buffer: ProgressBuffer):
+    try:
+        buffer.flush()
+    except Exception:
+        logger.exception("Could not flush listening progress at exit")
+
+
+def reset_progress_buffer():
+    """Drop the shared buffer (and anything in it) so the next lookup rebuilds it from settings"""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is not None:
+            _buffer.discard()
+        _buffer = None
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(setting, **kwargs):
+    if setting.startswith('LISTENING_'):
+        reset_progress_buffer()
+
+
+def record_progress(session_id: int, position: int, completed: bool = False, rating: int = None) -> int:
+    """Record a heartbeat through the configured path"""
+    if not settings.LISTENING_WRITE_BEHIND:
+        return write_through(session_id, position, completed, rating)
+    return get_progress_buffer().record(session_id, position, completed, rating)
@@ -0,0 +1,115 @@
+"""
+Story prompt templates and output-token budgets.
+
+The static part of a prompt depends only on (genre, length, language), so
+each combination is rendered once into a template and cached; a request then
+only fills in its own fields (age, idea, characters...). The completion
+budget follows the requested length: the upper word count, times the
+language's typical tokens per word (non-Latin scripts cost more), plus some
+headroom, instead of a flat maximum. The model is asked to close with
+``STORY_END`` and the provider stops generating there.
+"""
+import functools
+import math
+
+from .models import StoryRequest
+
+LENGTH_WORDS = {
+    'short': (300, 500),
+    'medium': (500, 800),
+    'long': (800, 1200),
+}
+DEFAULT_LENGTH = 'medium'
+
+LANGUAGE_NAMES = dict(StoryRequest.LANGUAGE_CHOICES)
+GENRE_NAMES = dict(StoryRequest.GENRE_CHOICES)
+
+# Approximate Llama 3 tokens per story word; scripts outside its main
+# vocabulary split into many more tokens
+TOKENS_PER_WORD = {
+    'en': 1.35,
+    'es': 1.6, 'fr': 1.6, 'it': 1.6, 'pt': 1.6,
+    'de': 1.8,
+    'ru': 2.5,
+    'ar': 3.0,
+    'hi': 3.5,
+    'zh': 2.0, 'ja': 2.5, 'ko': 2.5,
+}
+DEFAULT_TOKENS_PER_WORD = 2.0
+BUDGET_HEADROOM = 1.2  # models overshoot word targets
+TITLE_TOKENS = 40
+MAX_STORY_TOKENS = 4096
+
+STORY_END = '[END]'
+
+
+def token_budget(length: str, language: str) -> int:
+    """``max_tokens`` for a story of this length in this language"""
+    _, max_words = LENGTH_WORDS.get(length, LENGTH_WORDS[DEFAULT_LENGTH])
+    density = TOKENS_PER_WORD.get(language, DEFAULT_TOKENS_PER_WORD)
+    return min(MAX_STORY_TOKENS, math.ceil(max_words * density * BUDGET_HEADROOM) + TITLE_TOKENS)
+
+
+def _escape(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+@functools.lru_cache(maxsize=512)
+def prompt_template(genre: str, length: str, language: str) -> str:
+    """The prompt for one (genre, length, language) with ``{age_group}``, ``{idea}`` and ``{details}`` slots"""
+    min_words, max_words = LENGTH_WORDS.get(length, LENGTH_WORDS[DEFAULT_LENGTH])
+    language_name = _escape(LANGUAGE_NAMES.get(language, 'English'))
+    genre_name = _escape(GENRE_NAMES.get(genre, genre))
+    return f"""
+Create a {_escape(genre)} story for a {{age_group}}-year-old child.
+
+Story Requirements:
+- Length: {min_words}-{max_words} words
+- Genre: {genre_name}
+- Language: Write the entire story in {language_name}
+- Age-appropriate for {{age_group}} years old
+
+User Input: "{{idea}}"
+{{details}}
+
+Please format your response as:
+TITLE: [Story Title in {language_name}]
+
+[Story content here in {language_name}...]
+
+{STORY_END}
+
+Make sure the story is:
+- Written entirely in {language_name}
+- Engaging and imaginative
+- Age-appropriate with positive messages
+- Educational and inspiring
+- Safe for children (no violence, scary content, or inappropriate themes)
+- Has a clear beginning, middle, and end
+- Includes dialogue and descriptive language
+- Uses simple vocabulary appropriate for the age group
+- Ends with {STORY_END} on its own line, with nothing after it
+"""
+
+
+def build_prompt(story_request: StoryRequest) -> str:
+    details = ''
+    if story_request.characters:
+        details += f"\n- Include these characters: {story_request.characters}"
+    if story_request.setting:
+        details += f"\n- Setting: {story_request.setting}"
+    if story_request.moral_lesson:
+        details += f"\n- Include this moral lesson: {story_request.moral_lesson}"
+
+    template = prompt_template(story_request.genre, story_request.length, story_request.language)
+    return template.format(
+        age_group=story_request.age_group,
+        idea=story_request.voice_input or story_request.transcription,
+        details=details,
+    )
+
+
+def strip_story_end(text: str) -> str:
+    """Drop the end marker if a provider returned it instead of stopping on it"""
+    head, marker, _ = text.rpartition(STORY_END)
+    return head.rstrip() if marker else text
@@ -0,0 +1,373 @@
+"""
+LLM providers used by the story generator.
+
+Providers are built once per process and shared across requests, so HTTP
+connection pools (and their TLS sessions) are reused instead of being
+re-established for every story. Select one with ``STORY_LLM_PROVIDER``;
+per-provider options live in ``STORY_LLM_PROVIDERS``. A provider with a
+``rate_limit`` option is wrapped in RateLimitedProvider for admission
+control and retries.
+"""
+import asyncio
+import contextlib
+import random
+import re
+import threading
+import time
+import weakref
+
+import groq
+import httpx
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from groq import AsyncGroq, Groq
+
+from .ratelimit import (
+    RateLimited, RateLimiter, Shed, UpstreamUnavailable, backoff_delay, estimate_tokens, record_rate_event,
+)
+
+
+class Completion(str):
+    """Completion text that remembers which model produced it (see routing.py)
+    and, when the provider reports it, ``usage`` as ``(prompt_tokens, completion_tokens)``
+    """
+
+    def __new__(cls, text: str, model: str = '', usage: tuple = None):
+        completion = super().__new__(cls, text)
+        completion.model = model
+        completion.usage = usage
+        return completion
+
+
+def _usage(usage) -> tuple:
+    return (usage.prompt_tokens, usage.completion_tokens) if usage is not None else None
+
+
+class LLMProvider:
+    """Interface every chat-completion backend implements"""
+    name = ''
+
+    def __init__(self, model: str = ''):
+        self.model = model
+
+    def complete(self, messages: list, max_tokens: int, temperature: float, stop: list = None) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, messages: list, max_tokens: int, temperature: float, stop: list = None) -> str:
+        parts = [delta async for delta in self.astream(messages, max_tokens, temperature, stop)]
+        usage = next((part.usage for part in parts if getattr(part, 'usage', None)), None)
+        return Completion(''.join(parts), self.model, usage)
+
+    async def astream(self, messages: list, max_tokens: int, temperature: float, stop: list = None):
+        """Yield completion text deltas as they arrive"""
+        raise NotImplementedError
+        yield
+
+    def admit(self, tokens: int):
+        """Raise RateLimited if a call of this size would be shed right now"""
+
+    def close(self):
+        pass
+
+
+_registry = {}
+
+
+def register_provider(name: str):
+    """Class decorator adding a provider backend to the registry"""
+    def decorator(cls):
+        cls.name = name
+        _registry[name] = cls
+        return cls
+    return decorator
+
+
+def _retry_after(response) -> float:
+    headers = response.headers if response is not None else {}
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000
+        return float(headers['retry-after']) if 'retry-after' in headers else None
+    except ValueError:
+        return None  # an HTTP date; fall back to backoff
+
+
+@contextlib.contextmanager
+def translate_groq_errors():
+    """Re-raise Groq's transient failures as RateLimited / UpstreamUnavailable"""
+    try:
+        yield
+    except groq.RateLimitError as e:
+        raise RateLimited(str(e), retry_after=_retry_after(e.response)) from e
+    except groq.InternalServerError as e:
+        raise UpstreamUnavailable(str(e), retry_after=_retry_after(e.response)) from e
+    except (groq.APITimeoutError, groq.APIConnectionError) as e:
+        raise UpstreamUnavailable(str(e)) from e
+
+
+@register_provider('groq')
+class GroqProvider(LLMProvider):
+    """Groq chat completions over long-lived keep-alive connection pools"""
+
+    def __init__(self, model='llama-3.1-8b-instant', api_key=None, timeout=30.0,
+                 connect_timeout=5.0, max_connections=20, keepalive_expiry=60.0, max_retries=0, base_url=None):
+        super().__init__(model)
+        self.api_key = api_key if api_key is not None else settings.GROQ_API_KEY
+        self.base_url = base_url  # None for api.groq.com; benchmarks point it at a local fake
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_retries = max_retries
+        # httpx.Client is thread-safe; one pool serves every worker thread
+        self.client = Groq(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=max_retries,
+            http_client=httpx.Client(timeout=self.timeout, limits=self.limits),
+        )
+        # Async connections belong to an event loop, so keep one client per loop
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _async_client(self) -> AsyncGroq:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = AsyncGroq(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=self.max_retries,
+                    http_client=httpx.AsyncClient(timeout=self.timeout, limits=self.limits),
+                )
+                self._async_clients[loop] = client
+        return client
+
+    def complete(self, messages, max_tokens, temperature, stop=None):
+        with translate_groq_errors():
+            response = self.client.chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=stop,
+            )
+        return Completion(response.choices[0].message.content, self.model, _usage(response.usage))
+
+    async def acomplete(self, messages, max_tokens, temperature, stop=None):
+        with translate_groq_errors():
+            response = await self._async_client().chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=stop,
+            )
+        return Completion(response.choices[0].message.content, self.model, _usage(response.usage))
+
+    async def astream(self, messages, max_tokens, temperature, stop=None):
+        with translate_groq_errors():
+            stream = await self._async_client().chat.completions.create(
+                messages=messages,
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=stop,
+                stream=True,
+            )
+            usage = None
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+                # Groq reports token usage on the final chunk
+                if chunk.x_groq is not None and chunk.x_groq.usage is not None:
+                    usage = _usage(chunk.x_groq.usage)
+            if usage:
+                yield Completion('', self.model, usage)
+
+    def close(self):
+        self.client.close()
+
+
+@register_provider('fake')
+class FakeProvider(LLMProvider):
+    """Deterministic local stand-in for tests and benchmarks - never leaves the process"""
+
+    STORY = (
+        "TITLE: The Little Test Story\n\n"
+        "Once upon a time, a curious child asked for a story. "
+        "The storyteller smiled and told a gentle tale about friendship. The end."
+    )
+
+    def __init__(self, model='fake-storyteller', latency=0.0, story=None, rate_limited_calls=0, retry_after=None,
+                 jitter=0.0):
+        super().__init__(model)
+        self.latency = latency
+        self.jitter = jitter  # up to this many extra seconds per call, uniformly
+        self.story = story or self.STORY
+        # The first ``rate_limited_calls`` calls fail like an upstream HTTP 429
+        self.rate_limited_calls = rate_limited_calls
+        self.retry_after = retry_after
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count_call(self):
+        with self._lock:
+            self.calls += 1
+            throttled = self.calls <= self.rate_limited_calls
+        if throttled:
+            raise RateLimited('429 Too Many Requests (fake)', retry_after=self.retry_after)
+
+    def _text(self, stop) -> str:
+        # Like a real model, stop before the first stop sequence
+        cut = min((self.story.find(seq) for seq in stop or () if seq in self.story), default=len(self.story))
+        return self.story[:cut]
+
+    def _usage(self, messages, text) -> tuple:
+        return estimate_tokens(messages, 0), len(text) // 4
+
+    def _latency(self) -> float:
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def complete(self, messages, max_tokens, temperature, stop=None):
+        self._count_call()
+        latency = self._latency()
+        if latency:
+            time.sleep(latency)
+        text = self._text(stop)
+        return Completion(text, self.model, self._usage(messages, text))
+
+    async def astream(self, messages, max_tokens, temperature, stop=None):
+        self._count_call()
+        text = self._text(stop)
+        tokens = re.findall(r'\S+\s*|\s+', text)
+        delay = self._latency() / len(tokens) if tokens else 0
+        for token in tokens:
+            await asyncio.sleep(delay)
+            yield token
+        yield Completion('', self.model, self._usage(messages, text))
+
+
+class RateLimitedProvider(LLMProvider):
+    """Wraps a provider with a shared rate limiter and transient-error retries"""
+
+    def __init__(self, provider: LLMProvider, requests_per_minute=None, tokens_per_minute=None,
+                 max_queue_seconds=10.0, max_retries=3, backoff_base=0.5, backoff_cap=8.0):
+        super().__init__(provider.model)
+        self.name = provider.name
+        self.provider = provider
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_queue_seconds = max_queue_seconds
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def admit(self, tokens):
+        wait = self.limiter.wait_time(tokens)
+        if wait > self.max_queue_seconds:
+            record_rate_event('shed')
+            raise Shed('Story generation is busy; please try again shortly', retry_after=wait)
+
+    def _retry_delay(self, error: UpstreamUnavailable, attempt: int):
+        """Seconds to wait before retrying, or None when out of retries"""
+        if attempt >= self.max_retries or (error.retry_after or 0) > self.max_queue_seconds:
+            return None
+        if isinstance(error, RateLimited):
+            record_rate_event('throttled')
+            if error.retry_after:
+                self.limiter.block(error.retry_after)
+        record_rate_event('retried')
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap, error.retry_after)
+
+    def complete(self, messages, max_tokens, temperature, stop=None):
+        tokens = estimate_tokens(messages, max_tokens)
+        attempt = 0
+        while True:
+            self.limiter.acquire(tokens, self.max_queue_seconds)
+            try:
+                return self.provider.complete(messages, max_tokens, temperature, stop)
+            except UpstreamUnavailable as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def acomplete(self, messages, max_tokens, temperature, stop=None):
+        tokens = estimate_tokens(messages, max_tokens)
+        attempt = 0
+        while True:
+            await self.limiter.aacquire(tokens, self.max_queue_seconds)
+            try:
+                return await self.provider.acomplete(messages, max_tokens, temperature, stop)
+            except UpstreamUnavailable as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def astream(self, messages, max_tokens, temperature, stop=None):
+        # Retry only until the first delta; after that the client has seen output
+        tokens = estimate_tokens(messages, max_tokens)
+        attempt = 0
+        while True:
+            await self.limiter.aacquire(tokens, self.max_queue_seconds)
+            started = False
+            try:
+                async for delta in self.provider.astream(messages, max_tokens, temperature, stop):
+                    started = True
+                    yield delta
+                return
+            except UpstreamUnavailable as e:
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.provider.close()
+
+
+_instances = {}
+_instances_lock = threading.RLock()  # a router resolves its backends while building
+
+
+def get_provider(name: str = None) -> LLMProvider:
+    """Return the shared provider instance for ``name`` (default: STORY_LLM_PROVIDER)"""
+    name = name or settings.STORY_LLM_PROVIDER
+    provider = _instances.get(name)
+    if provider is None:
+        with _instances_lock:
+            provider = _instances.get(name)
+            if provider is None:
+                options = dict(settings.STORY_LLM_PROVIDERS.get(name, {}))
+                backend = options.pop('backend', name)
+                rate_limit = options.pop('rate_limit', None)
+                provider = _registry[backend](**options)
+                if rate_limit:
+                    provider = RateLimitedProvider(provider, **rate_limit)
+                _instances[name] = provider
+    return provider
+
+
+def reset_providers():
+    """Drop shared providers so the next lookup rebuilds them from settings"""
+    with _instances_lock:
+        for provider in _instances.values():
+            provider.close()
+        _instances.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_settings_change(setting, **kwargs):
+    if setting.startswith('STORY_LLM_') or setting == 'GROQ_API_KEY':
+        reset_providers()
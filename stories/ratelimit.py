@@ -0,0 +1,150 @@
+"""
+Admission control and retries for rate-limited LLM APIs.
+
+Each provider gets a process-wide limiter holding two token buckets, one
+for requests per minute and one for tokens per minute (estimated from the
+prompt length plus ``max_tokens``). A call reserves from both buckets up
+front; if that reservation would not be usable within ``max_queue_seconds``
+the call is shed with ``Shed`` (a ``RateLimited``) instead of queueing,
+which views turn into a 503 with ``Retry-After``. Transient upstream errors
+are retried with full-jitter exponential backoff, never sooner than a
+``Retry-After`` header.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+
+from .caching import increment_counter, read_counters
+
+COUNTERS = ('queued', 'shed', 'retried', 'throttled')
+
+CHARS_PER_TOKEN = 4  # for estimating prompt size without a tokenizer
+
+
+class UpstreamUnavailable(Exception):
+    """Transient upstream failure (overload, timeout, 5xx) worth retrying later"""
+
+    def __init__(self, message: str = '', retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(UpstreamUnavailable):
+    """Over the rate limit, either locally (shed) or upstream (HTTP 429)"""
+
+
+class Shed(RateLimited):
+    """Refused by our own admission control; the upstream was never called"""
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds or 0)))
+
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    chars = sum(len(message.get('content') or '') for message in messages)
+    return chars // CHARS_PER_TOKEN + max_tokens
+
+
+def record_rate_event(name: str):
+    increment_counter(f"llm-rate-stats:{name}")
+
+
+def rate_limit_stats() -> dict:
+    values = read_counters([f"llm-rate-stats:{name}" for name in COUNTERS])
+    return {name: values[f"llm-rate-stats:{name}"] for name in COUNTERS}
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: float = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server asked for"""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after or 0)
+
+
+class TokenBucket:
+    """Refills continuously at ``per_minute / 60`` per second up to ``capacity``.
+
+    Reservations may drive the level negative; the debt is the queue that
+    later callers wait behind.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        self._refill(now)
+        # A single call larger than the bucket waits for a full bucket
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets for one upstream API"""
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        wait = self.blocked_until - now
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, now))
+        return max(wait, 0.0)
+
+    def wait_time(self, tokens: int) -> float:
+        """Seconds a call of this size would wait right now (nothing is reserved)"""
+        with self._lock:
+            return self._wait_time(tokens, time.monotonic())
+
+    def reserve(self, tokens: int, max_wait: float) -> float:
+        """Reserve budget for one call and return how long to wait before making it.
+
+        Raises RateLimited, reserving nothing, if the wait would exceed ``max_wait``.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._wait_time(tokens, now)
+            shed = wait > max_wait
+            if not shed:
+                if self.requests:
+                    self.requests.take(1, now)
+                if self.tokens:
+                    self.tokens.take(tokens, now)
+        # Counted outside the lock so callers never queue behind the counter
+        if shed:
+            record_rate_event('shed')
+            raise Shed('Story generation is busy; please try again shortly', retry_after=wait)
+        if wait > 0:
+            record_rate_event('queued')
+        return wait
+
+    def acquire(self, tokens: int, max_wait: float):
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int, max_wait: float):
+        wait = self.reserve(tokens, max_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def block(self, seconds: float):
+        """Hold every caller back after the upstream told us to slow down"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
@@ -0,0 +1,383 @@
+"""
+Latency-aware routing across several LLM backends.
+
+The ``'router'`` provider sends each call to the backend with the best
+recent latency. If the call has not finished (or, when streaming, produced
+its first token) by the backend's p95 latency for that kind of call, a
+hedged duplicate goes to the next backend; whichever answers first wins and
+the other is cancelled.
+A backend that keeps failing is skipped by its circuit breaker until a
+trial call after ``reset_seconds`` succeeds. Calls shed by our own rate
+limiter never reached the upstream, so they don't count as failures.
+
+A cancelled loser only tells us its latency was at least the time it ran,
+so it is kept as a censored sample rather than as a measured latency.
+
+Completions are returned as ``Completion`` strings carrying the winning
+backend's model, which the generator records as ``ai_model_used``.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+from . import providers
+from .providers import Completion, LLMProvider, get_provider, register_provider
+from .ratelimit import RateLimited, Shed, UpstreamUnavailable
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures; half-opens after ``reset_seconds``"""
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may go to this backend (one trial call when half-open)"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+    def release(self):
+        """A trial call was cancelled without an outcome"""
+        with self._lock:
+            self.trial_running = False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+
+CALL_KINDS = ('completion', 'first_token')
+
+
+class LatencyWindow:
+    """Rolling latencies of one kind of call, with censored lower bounds kept apart"""
+
+    def __init__(self, size: int):
+        self.latencies = deque(maxlen=size)
+        self.censored = deque(maxlen=size)  # lower bounds: calls cancelled after losing a hedge
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def record_censored(self, seconds: float):
+        with self._lock:
+            self.censored.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self.latencies) + len(self.censored)
+
+    def percentile(self, pct: float):
+        """Latency percentile; censored samples rank above every measured one.
+
+        A percentile that lands among them is only known to be at least the
+        longest time seen, so that is what it reports: cancelled losers
+        never pull a slow backend's percentiles down toward the winner's.
+        """
+        with self._lock:
+            samples = sorted(self.latencies)
+            censored = list(self.censored)
+        count = len(samples) + len(censored)
+        if not count:
+            return None
+        index = min(count - 1, int(count * pct / 100))
+        if index < len(samples):
+            return samples[index]
+        return max(samples[-1:] + censored)
+
+
+class Backend:
+    """One routed provider with rolling latency windows, error window and breaker.
+
+    Full completions and streams' time to first token are measured in
+    separate windows; mixing them would hedge completions far too early.
+    """
+
+    def __init__(self, provider: LLMProvider, window: int, breaker: CircuitBreaker):
+        self.provider = provider
+        self.windows = {kind: LatencyWindow(window) for kind in CALL_KINDS}
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.breaker = breaker
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> str:
+        return self.provider.model
+
+    def record(self, kind: str, seconds: float, ok: bool):
+        self.windows[kind].record(seconds)
+        with self._lock:
+            self.outcomes.append(ok)
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def record_censored(self, kind: str, seconds: float):
+        """A call cancelled after ``seconds``: its latency is known only to be longer"""
+        self.windows[kind].record_censored(seconds)
+        self.breaker.release()
+
+    def record_shed(self):
+        """Our own admission control refused the call; it says nothing about the upstream"""
+        self.breaker.release()
+
+    def sample_count(self, kind: str = 'completion') -> int:
+        return self.windows[kind].count()
+
+    def percentile(self, pct: float, kind: str = 'completion'):
+        return self.windows[kind].percentile(pct)
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def stats(self) -> dict:
+        stats = {'model': self.model, 'state': self.breaker.state}
+        for kind, prefix in (('completion', ''), ('first_token', 'first_token_')):
+            p50, p95 = self.percentile(50, kind), self.percentile(95, kind)
+            stats.update({
+                f'{prefix}samples': self.sample_count(kind),
+                f'{prefix}p50_seconds': round(p50, 3) if p50 is not None else None,
+                f'{prefix}p95_seconds': round(p95, 3) if p95 is not None else None,
+            })
+        stats['error_rate'] = round(self.error_rate(), 3)
+        return stats
+
+
+@register_provider('router')
+class RoutedProvider(LLMProvider):
+    """Routes to the fastest healthy backend and hedges slow calls onto the next one"""
+
+    def __init__(self, backends, model='router', hedge_percentile=95, hedge_min_seconds=2.0,
+                 min_samples=5, window=100, failure_threshold=5, reset_seconds=30.0):
+        super().__init__(model)
+        self.backends = [
+            Backend(
+                get_provider(backend) if isinstance(backend, str) else backend,
+                window,
+                CircuitBreaker(failure_threshold, reset_seconds),
+            )
+            for backend in backends
+        ]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_seconds = hedge_min_seconds
+        self.min_samples = min_samples
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def ranked(self, kind: str = 'completion') -> list:
+        """Backends by median latency, weighted by error rate; unmeasured ones keep config order first"""
+        def score(backend):
+            if backend.sample_count(kind) < self.min_samples:
+                return 0.0
+            return backend.percentile(50, kind) * (1 + 4 * backend.error_rate())
+        return sorted(self.backends, key=score)
+
+    def hedge_delay(self, backend: Backend, kind: str = 'completion') -> float:
+        threshold = backend.percentile(self.hedge_percentile, kind)
+        if threshold is None or backend.sample_count(kind) < self.min_samples:
+            return self.hedge_min_seconds
+        return max(threshold, self.hedge_min_seconds)
+
+    def _candidates(self, kind: str = 'completion'):
+        """Yield allowed backends in rank order (claiming half-open trial slots lazily)"""
+        for backend in self.ranked(kind):
+            if backend.breaker.allow():
+                yield backend
+
+    def _unavailable(self) -> UpstreamUnavailable:
+        retry_after = min(backend.breaker.retry_after() for backend in self.backends)
+        return UpstreamUnavailable('Every story model is unavailable', retry_after=retry_after or None)
+
+    def admit(self, tokens):
+        # Shed only when no healthy backend could take the call soon
+        shed = None
+        for backend in self.backends:
+            if backend.breaker.state == 'open':
+                continue
+            try:
+                return backend.provider.admit(tokens)
+            except RateLimited as e:
+                shed = e
+        raise shed or self._unavailable()
+
+    def backend_stats(self) -> list:
+        return [backend.stats() for backend in self.backends]
+
+    # Synchronous callers run the async race on the router's own event loop:
+    # a thread can't abort a request mid-flight, so a hedged sync call would
+    # pay for two full completions, while a cancelled task closes its request.
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='llm-router', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def complete(self, messages, max_tokens, temperature, stop=None):
+        race = self.acomplete(messages, max_tokens, temperature, stop)
+        return asyncio.run_coroutine_threadsafe(race, self._event_loop()).result()
+
+    async def _atimed_call(self, backend, messages, max_tokens, temperature, stop=None):
+        started = time.monotonic()
+        try:
+            text = await backend.provider.acomplete(messages, max_tokens, temperature, stop)
+        except asyncio.CancelledError:
+            # Lost the race: it would have taken at least this long
+            backend.record_censored('completion', time.monotonic() - started)
+            raise
+        except Shed:
+            backend.record_shed()
+            raise
+        except Exception:
+            backend.record('completion', time.monotonic() - started, ok=False)
+            raise
+        backend.record('completion', time.monotonic() - started, ok=True)
+        return Completion(text, backend.model, getattr(text, 'usage', None))
+
+    async def acomplete(self, messages, max_tokens, temperature, stop=None):
+        candidates = self._candidates()
+        first = next(candidates, None)
+        if first is None:
+            raise self._unavailable()
+
+        running = {asyncio.ensure_future(self._atimed_call(first, messages, max_tokens, temperature, stop))}
+        timeout = self.hedge_delay(first)
+        error = None
+        try:
+            while running:
+                done, running = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                backup = next(candidates, None)
+                if backup is not None:
+                    running.add(asyncio.ensure_future(self._atimed_call(backup, messages, max_tokens, temperature, stop)))
+                timeout = None
+        finally:
+            for task in running:
+                task.cancel()
+            # Let cancelled losers record their censored samples
+            await asyncio.gather(*running, return_exceptions=True)
+        raise error or self._unavailable()
+
+    async def _first_delta(self, backend, stream):
+        """Wait for a stream's first delta, recording time-to-first-token"""
+        started = time.monotonic()
+        try:
+            delta = await stream.__anext__()
+        except asyncio.CancelledError:
+            backend.record_censored('first_token', time.monotonic() - started)
+            raise
+        except StopAsyncIteration:
+            delta = ''
+        except Shed:
+            backend.record_shed()
+            raise
+        except Exception:
+            backend.record('first_token', time.monotonic() - started, ok=False)
+            raise
+        backend.record('first_token', time.monotonic() - started, ok=True)
+        return backend, stream, delta
+
+    async def astream(self, messages, max_tokens, temperature, stop=None):
+        # Streams are hedged on time to first token, then the winner streams alone
+        candidates = self._candidates('first_token')
+        first = next(candidates, None)
+        if first is None:
+            raise self._unavailable()
+
+        def start(backend):
+            stream = backend.provider.astream(messages, max_tokens, temperature, stop)
+            return asyncio.ensure_future(self._first_delta(backend, stream)), stream
+
+        task, stream = start(first)
+        running, streams = {task}, [stream]
+        timeout = self.hedge_delay(first, 'first_token')
+        winner, error = None, None
+        try:
+            while running and winner is None:
+                done, running = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task.result()
+                        break
+                    error = task.exception()
+                else:
+                    backup = next(candidates, None)
+                    if backup is not None:
+                        task, stream = start(backup)
+                        running.add(task)
+                        streams.append(stream)
+                    timeout = None
+        finally:
+            for task in running:
+                task.cancel()
+            # Let cancelled streams unwind before closing them
+            await asyncio.gather(*running, return_exceptions=True)
+
+        if winner is None:
+            raise error or self._unavailable()
+
+        backend, stream, delta = winner
+        for loser in streams:
+            if loser is not stream:
+                await loser.aclose()
+        yield Completion(delta, backend.model, getattr(delta, 'usage', None))
+        async for delta in stream:
+            yield Completion(delta, backend.model, getattr(delta, 'usage', None))
+
+    def close(self):
+        # Backends are shared registry instances; reset_providers closes them
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def routing_stats() -> dict:
+    """Per-backend latency, error rate and breaker state of every router built so far"""
+    return {
+        name: provider.backend_stats()
+        for name, provider in list(providers._instances.items())
+        if isinstance(provider, RoutedProvider)
+    }
@@ -0,0 +1,423 @@
+"""
+Full-text search over completed stories.
+
+Each database gets its own index kept beside ``stories_generatedstory``:
+a contentless FTS5 table on SQLite, and a tsvector table with a GIN index
+on PostgreSQL. Neither keeps a copy of the story text, which is stored
+compressed; snippets are cut from the decompressed bodies of the hits.
+Both are kept in sync by signal handlers on save/delete;
+``rebuild_search_index`` backfills them.
+
+Chinese and Japanese are written without spaces between words, so every
+CJK character is indexed as its own token and queried as a phrase. On
+PostgreSQL, Latin-script and Russian stories are also stemmed with their
+language's text search configuration.
+"""
+import html
+import re
+import unicodedata
+from collections import namedtuple
+
+from django.db import connections, transaction
+
+from .language import STOPWORDS
+from .models import GeneratedStory, decompress_text
+
+SearchHit = namedtuple('SearchHit', ['id', 'title', 'snippet', 'genre', 'language', 'created_at', 'rank'])
+
+# Ideographs and kana; Hangul is left alone because Korean separates words
+CJK = r'\u3040-\u30ff\u31f0-\u31ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f'
+CJK_CHAR_RE = re.compile(f'([{CJK}])')
+CJK_GAP_RE = re.compile(f'([{CJK}])([\x02\x03]?) ([\x02\x03]?)(?=[{CJK}])')
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+QUERY_STOPWORDS = frozenset(word for words in STOPWORDS.values() for word in words.split())
+
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_WORDS = 16
+
+
+def segment(text: str) -> str:
+    """Put spaces around CJK characters so each one is a token"""
+    return ' '.join(CJK_CHAR_RE.sub(r' \1 ', text or '').split())
+
+
+def query_terms(query: str) -> list:
+    """Search terms as lists of tokens: one token per word, one per CJK character.
+
+    Every term must match, so function words ("the", "une") are dropped
+    unless the query has nothing else.
+    """
+    terms = TERM_RE.findall((query or '').lower())
+    content_terms = [term for term in terms if term not in QUERY_STOPWORDS]
+    return [segment(term).split() for term in content_terms or terms]
+
+
+def unsegment(text: str) -> str:
+    return CJK_GAP_RE.sub(r'\1\2\3', text or '')
+
+
+def fold(token: str) -> str:
+    """Lowercase without diacritics, as the FTS5 ``unicode61`` tokenizer indexes words"""
+    return ''.join(c for c in unicodedata.normalize('NFKD', token.lower()) if not unicodedata.combining(c))
+
+
+def make_snippet(text: str, query: str, words: int = SNIPPET_WORDS) -> str:
+    """The ``words``-token stretch of ``text`` with the most query matches, matches marked.
+
+    Matches the way the index does: words by prefix, CJK runs as phrases.
+    The result is segmented like the index, ready for ``format_snippet``.
+    """
+    text = segment(text)
+    tokens = list(TERM_RE.finditer(text))
+    if not tokens:
+        return ''
+    folded = [fold(token.group()) for token in tokens]
+    matched = set()
+    for term in query_terms(query):
+        term = [fold(part) for part in term]
+        for i in range(len(folded) - len(term) + 1):
+            if folded[i:i + len(term)] == term or (len(term) == 1 and folded[i].startswith(term[0])):
+                matched.update(range(i, i + len(term)))
+
+    hits = [0]  # hits[i]: matches among the first i tokens
+    for i in range(len(tokens)):
+        hits.append(hits[-1] + (i in matched))
+    first = max(range(max(1, len(tokens) - words + 1)),
+                key=lambda start: hits[min(start + words, len(tokens))] - hits[start])
+    # Slide on so the first match has a little lead-in rather than sitting at an edge
+    first_match = min((i for i in matched if i >= first), default=first)
+    first = max(first, min(first_match - words // 4, len(tokens) - words))
+    last = min(first + words, len(tokens)) - 1
+
+    start = tokens[first].start() if first else 0
+    end = tokens[last].end() if last < len(tokens) - 1 else len(text)
+    parts, position, marking = ['…'] if first else [], start, False
+    for i in range(first, last + 1):
+        token = tokens[i]
+        if i in matched and not marking:
+            parts += [text[position:token.start()], MARK_START]
+            position, marking = token.start(), True
+        if marking and (i + 1 not in matched or i == last):
+            parts += [text[position:token.end()], MARK_END]
+            position, marking = token.end(), False
+    parts.append(text[position:end])
+    if end < len(text):
+        parts.append('…')
+    return ''.join(parts)
+
+
+def format_snippet(snippet: str) -> str:
+    """Undo CJK segmentation, escape the text and turn match markers into <mark> tags"""
+    return html.escape(unsegment(snippet)).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class SearchBackend:
+    """Search index living in the same database as the stories"""
+    vendor = ''
+    create_sql = ()
+    drop_sql = ()
+
+    def __init__(self, using: str = 'default'):
+        self.using = using
+
+    def cursor(self):
+        return connections[self.using].cursor()
+
+    def create(self):
+        with self.cursor() as cursor:
+            for sql in self.create_sql:
+                cursor.execute(sql)
+
+    def drop(self):
+        with self.cursor() as cursor:
+            for sql in self.drop_sql:
+                cursor.execute(sql)
+
+    def index(self, story):
+        raise NotImplementedError
+
+    def remove(self, story_id: int):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def match_sql(self, query: str):
+        """``(sql, params)`` selecting the ids of every matching story, or None for an empty query"""
+        raise NotImplementedError
+
+    def search(self, query: str, genre: str = None, language: str = None, since=None, limit: int = 20) -> list:
+        raise NotImplementedError
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Contentless FTS5 index, so the story text isn't stored a second time.
+
+    A contentless row can only be deleted by replaying the exact text it
+    was indexed with, which is gone once a story changes. So each indexing
+    gets a fresh FTS rowid (``doc_id``) and ``docs`` maps stories to their
+    current one; superseded rows stay in the index, unreachable, until
+    ``rebuild_search_index`` clears them out.
+    """
+    vendor = 'sqlite'
+    table = 'stories_story_fts'
+    docs = 'stories_story_fts_docs'
+    create_sql = (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        "title, content, content = '', tokenize = 'unicode61 remove_diacritics 2')",
+        f"CREATE TABLE IF NOT EXISTS {docs} ("
+        "doc_id integer PRIMARY KEY AUTOINCREMENT, story_id integer NOT NULL UNIQUE)",
+    )
+    drop_sql = (f"DROP TABLE IF EXISTS {table}", f"DROP TABLE IF EXISTS {docs}")
+
+    def index(self, story):
+        with self.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.docs} WHERE story_id = %s", [story.pk])
+            # AUTOINCREMENT never reuses a doc_id, so a stale FTS row can't be revived
+            cursor.execute(f"INSERT INTO {self.docs} (story_id) VALUES (%s)", [story.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)",
+                [cursor.lastrowid, segment(story.title), segment(story.content)],
+            )
+
+    def remove(self, story_id):
+        with self.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.docs} WHERE story_id = %s", [story_id])
+
+    def clear(self):
+        with self.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('delete-all')")
+            cursor.execute(f"DELETE FROM {self.docs}")
+
+    def fts_query(self, query: str) -> str:
+        # Every term must match: words as prefixes, CJK runs as phrases
+        phrases = []
+        for tokens in query_terms(query):
+            phrase = '"' + ' '.join(tokens) + '"'
+            phrases.append(phrase if len(tokens) > 1 else phrase + '*')
+        return ' '.join(phrases)
+
+    def match_sql(self, query):
+        fts_query = self.fts_query(query)
+        if not fts_query:
+            return None
+        return (
+            f"SELECT story_id FROM {self.docs} WHERE doc_id IN "
+            f"(SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s)",
+            [fts_query],
+        )
+
+    def search(self, query, genre=None, language=None, since=None, limit=20):
+        fts_query = self.fts_query(query)
+        if not fts_query:
+            return []
+
+        where, params = [f"{self.table} MATCH %s"], [fts_query]
+        if genre:
+            where.append("r.genre = %s")
+            params.append(genre)
+        if language:
+            where.append("r.language = %s")
+            params.append(language)
+        if since:
+            where.append("g.created_at >= %s")
+            params.append(connections[self.using].ops.adapt_datetimefield_value(since))
+
+        with self.cursor() as cursor:
+            # bm25() is lower for better matches; title hits count ten times as much
+            cursor.execute(
+                f"SELECT d.story_id, bm25({self.table}, 10.0, 1.0) AS rank FROM {self.table} "
+                f"JOIN {self.docs} d ON d.doc_id = {self.table}.rowid "
+                "JOIN stories_generatedstory g ON g.id = d.story_id "
+                "JOIN stories_storyrequest r ON r.id = g.request_id "
+                f"WHERE {' AND '.join(where)} ORDER BY rank LIMIT %s",
+                [*params, limit],
+            )
+            rows = cursor.fetchall()
+        # Titles and bodies come from the stories themselves; the index holds no text
+        stories = (
+            GeneratedStory.objects.using(self.using).select_related('request')
+            .only('id', 'title', 'body', 'created_at', 'request__genre', 'request__language')
+            .in_bulk([pk for pk, rank in rows])
+        )
+        hits = []
+        for pk, rank in rows:
+            story = stories[pk]
+            hits.append(SearchHit(
+                pk, story.title, format_snippet(make_snippet(story.content, query)), story.request.genre,
+                story.request.language, story.created_at.isoformat(), round(-rank, 4),
+            ))
+        return hits
+
+
+# Text search configurations shipped with PostgreSQL; everything else is 'simple'
+PG_SEARCH_CONFIGS = {
+    'en': 'english', 'es': 'spanish', 'fr': 'french', 'de': 'german',
+    'it': 'italian', 'pt': 'portuguese', 'ru': 'russian',
+}
+
+
+def pg_config(language: str) -> str:
+    return PG_SEARCH_CONFIGS.get(language, 'simple')
+
+
+class PostgresSearchBackend(SearchBackend):
+    vendor = 'postgresql'
+    table = 'stories_story_search'
+    create_sql = (
+        f"CREATE TABLE IF NOT EXISTS {table} ("
+        "story_id bigint PRIMARY KEY REFERENCES stories_generatedstory (id) "
+        "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "title varchar(200) NOT NULL, genre varchar(20) NOT NULL, language varchar(5) NOT NULL, "
+        "created_at timestamp with time zone NOT NULL, document tsvector NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS {table}_document_idx ON {table} USING GIN (document)",
+    )
+    drop_sql = (f"DROP TABLE IF EXISTS {table}",)
+
+    def index(self, story):
+        # Stemmed lexemes for the story's language plus unstemmed ones, so a
+        # query matches exact words in any language and stems in its own
+        config = pg_config(story.request.language)
+        title, content = segment(story.title), segment(story.content)
+        with self.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (story_id, title, genre, language, created_at, document) "
+                "VALUES (%s, %s, %s, %s, %s, "
+                "setweight(to_tsvector(%s::regconfig, %s) || to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s) || to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (story_id) DO UPDATE SET title = EXCLUDED.title, genre = EXCLUDED.genre, "
+                "language = EXCLUDED.language, created_at = EXCLUDED.created_at, document = EXCLUDED.document",
+                [story.pk, story.title, story.request.genre, story.request.language, story.created_at,
+                 config, title, title, config, content, content],
+            )
+
+    def remove(self, story_id):
+        with self.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE story_id = %s", [story_id])
+
+    def clear(self):
+        with self.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+
+    def ts_query(self, query: str) -> str:
+        def quote(token):
+            return "'" + token.replace('\\', '\\\\').replace("'", "''") + "'"
+
+        terms = []
+        for tokens in query_terms(query):
+            if len(tokens) > 1:
+                terms.append('(' + ' <-> '.join(map(quote, tokens)) + ')')
+            else:
+                terms.append(quote(tokens[0]) + ':*')
+        return ' & '.join(terms)
+
+    def match_sql(self, query):
+        ts_query = self.ts_query(query)
+        if not ts_query:
+            return None
+        return (
+            f"SELECT story_id FROM {self.table} WHERE document @@ to_tsquery('simple', %s)",
+            [ts_query],
+        )
+
+    def search(self, query, genre=None, language=None, since=None, limit=20):
+        ts_query = self.ts_query(query)
+        if not ts_query:
+            return []
+
+        where, params = ["s.document @@ q.query"], []
+        if genre:
+            where.append("s.genre = %s")
+            params.append(genre)
+        if language:
+            where.append("s.language = %s")
+            params.append(language)
+        if since:
+            where.append("s.created_at >= %s")
+            params.append(since)
+
+        # Unstemmed query words match the 'simple' half of every document;
+        # with a language filter they are also stemmed for that language
+        config = pg_config(language)
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=8"
+        query_sql = "to_tsquery(%s::regconfig, %s) || to_tsquery('simple', %s)"
+        with self.cursor() as cursor:
+            cursor.execute(
+                "SELECT s.story_id, s.title, s.genre, s.language, s.created_at, "
+                "ts_rank_cd(s.document, q.query) AS rank "
+                f"FROM {self.table} s, (SELECT {query_sql}) AS q(query) "
+                f"WHERE {' AND '.join(where)} ORDER BY rank DESC LIMIT %s",
+                [config, ts_query, ts_query, *params, limit],
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return []
+            # Bodies are stored compressed: decompress the hits' here and
+            # let PostgreSQL highlight them in one round trip
+            bodies = dict(
+                GeneratedStory.objects.using(self.using).filter(pk__in=[row[0] for row in rows])
+                .values_list('pk', 'body')
+            )
+            cursor.execute(
+                f"SELECT ts_headline(%s::regconfig, d.body, {query_sql}, %s) "
+                "FROM unnest(%s::text[]) WITH ORDINALITY AS d(body, n) ORDER BY d.n",
+                [config, config, ts_query, ts_query, options,
+                 [decompress_text(bodies.get(row[0])) for row in rows]],
+            )
+            snippets = [snippet for snippet, in cursor.fetchall()]
+        return [
+            SearchHit(pk, title, format_snippet(snippet), genre, language, created_at.isoformat(), round(rank, 4))
+            for (pk, title, genre, language, created_at, rank), snippet in zip(rows, snippets)
+        ]
+
+
+BACKENDS = {backend.vendor: backend for backend in (SQLiteSearchBackend, PostgresSearchBackend)}
+
+
+def get_search_backend(using: str = 'default'):
+    """Search backend for the database, or None when it has no full-text index"""
+    backend = BACKENDS.get(connections[using].vendor)
+    return backend(using) if backend else None
+
+
+def index_story(story):
+    """Add, refresh or drop the story's entry to match its current status"""
+    backend = get_search_backend()
+    if backend is None:
+        return
+    if story.status == 'completed':
+        backend.index(story)
+    else:
+        backend.remove(story.pk)
+
+
+def unindex_story(story_id: int):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove(story_id)
+
+
+def rebuild_search_index(batch_size: int = 500) -> int:
+    """Re-index every completed story; returns how many were indexed"""
+    backend = get_search_backend()
+    if backend is None:
+        return 0
+    stories = (
+        GeneratedStory.objects.filter(status='completed')
+        .select_related('request')
+        .only('id', 'title', 'body', 'created_at', 'request__genre', 'request__language')
+    )
+    indexed = 0
+    with transaction.atomic(using=backend.using):
+        backend.clear()
+        for story in stories.iterator(chunk_size=batch_size):
+            backend.index(story)
+            indexed += 1
+    return indexed
+
+
+def search_stories(query: str, **filters) -> list:
+    backend = get_search_backend()
+    if backend is None:
+        return []
+    return backend.search(query, **filters)
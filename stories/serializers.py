@@ -1,5 +1,6 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import StoryRequest, GeneratedStory, StorySession, FavoriteStory, ChildProfile
+from .models import StoryRequest, GeneratedStory, StorySession, FavoriteStory, ChildProfile, StoryJob
 
 class ChildProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -15,20 +16,65 @@ class StoryRequestSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'voice_input', 'transcription', 'genre', 'genre_display',
             'length', 'length_display', 'age_group', 'characters', 'setting',
-            'moral_lesson', 'created_at'
+            'moral_lesson', 'always_fresh', 'created_at'
         ]
 
+class StoryBatchItemSerializer(serializers.ModelSerializer):
+    """Validates one entry of a batch creation request"""
+    language = serializers.ChoiceField(
+        choices=StoryRequest.LANGUAGE_CHOICES + [('auto', 'Detect automatically')], default='auto'
+    )
+    
+    class Meta:
+        model = StoryRequest
+        fields = [
+            'voice_input', 'transcription', 'genre', 'length', 'language', 'age_group',
+            'characters', 'setting', 'moral_lesson', 'always_fresh'
+        ]
+    
+    def validate(self, attrs):
+        if not (attrs.get('voice_input', '').strip() or attrs.get('transcription', '').strip()):
+            raise serializers.ValidationError('Provide a story idea in voice_input or transcription')
+        return attrs
+
 class GeneratedStorySerializer(serializers.ModelSerializer):
     request = StoryRequestSerializer(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    audio_url = serializers.SerializerMethodField()
     
     class Meta:
         model = GeneratedStory
         fields = [
             'id', 'title', 'content', 'ai_model_used', 'status', 'status_display',
-            'word_count', 'estimated_duration', 'created_at', 'updated_at', 'request'
+            'word_count', 'estimated_duration', 'audio_url', 'audio_size', 'audio_duration',
+            'created_at', 'updated_at', 'request'
+        ]
+    
+    def get_audio_url(self, obj):
+        # Pre-rendered narration, once ready
+        if not obj.audio_file:
+            return None
+        return reverse('stories:story_audio', args=[obj.pk])
+
+class StoryListSerializer(serializers.ModelSerializer):
+    """Compact story card for the library; full content comes from the detail view"""
+    excerpt = serializers.CharField(read_only=True)
+    genre = serializers.CharField(source='request.genre', read_only=True)
+    language = serializers.CharField(source='request.language', read_only=True)
+    
+    class Meta:
+        model = GeneratedStory
+        fields = [
+            'id', 'title', 'excerpt', 'word_count', 'estimated_duration',
+            'genre', 'language', 'created_at'
         ]
 
+class ListeningProgressSerializer(serializers.Serializer):
+    """One player heartbeat: seconds listened so far, and whether the story finished"""
+    position = serializers.FloatField(min_value=0, max_value=24 * 3600)
+    completed = serializers.BooleanField(default=False)
+    rating = serializers.IntegerField(min_value=1, max_value=5, required=False, allow_null=True, default=None)
+
 class StorySessionSerializer(serializers.ModelSerializer):
     story = GeneratedStorySerializer(read_only=True)
     
@@ -44,4 +90,12 @@ class FavoriteStorySerializer(serializers.ModelSerializer):
     
     class Meta:
         model = FavoriteStory
-        fields = ['id', 'story', 'saved_at']
\ No newline at end of file
+        fields = ['id', 'story', 'saved_at']
+
+class StoryJobSerializer(serializers.ModelSerializer):
+    story = GeneratedStorySerializer(read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = StoryJob
+        fields = ['id', 'status', 'status_display', 'attempts', 'created_at', 'updated_at', 'story']
@@ -1,160 +1,159 @@
 import os
 import re
-from groq import Groq
 from django.conf import settings
+from django.utils import timezone
 from .models import StoryRequest, GeneratedStory
+from .providers import LLMProvider, get_provider
+from .ratelimit import UpstreamUnavailable
+from .caching import cached_completion, story_cache_key
+from .language import detect_language
+from .metrics import record_tokens, timed
+from .prompts import DEFAULT_LENGTH, MAX_STORY_TOKENS, STORY_END, build_prompt, strip_story_end, token_budget
+
+PROMPT_TOKEN_ESTIMATE = 500  # system message plus a typical story prompt
+
+SYSTEM_PROMPT = (
+    "You are a creative children's storyteller. Create engaging, age-appropriate stories with "
+    "positive messages and educational value. Always include a clear title and well-structured narrative."
+)
 
 class GroqStoryGenerator:
-    def __init__(self):
-        self.client = Groq(api_key=settings.GROQ_API_KEY)
-        self.model = "llama-3.1-8b-instant"
+    def __init__(self, provider: LLMProvider = None):
+        # Providers are process-wide, so constructing a generator is cheap
+        self.provider = provider or get_provider()
+        self.model = self.provider.model
     
     def detect_language(self, text: str) -> str:
-        """Simple language detection based on common words and patterns"""
-        text_lower = text.lower()
-        
-        # Language patterns
-        patterns = {
-            'es': ['hola', 'gracias', 'por favor', 'sí', 'no', 'que', 'el', 'la', 'de', 'en', 'un', 'una'],
-            'fr': ['bonjour', 'merci', 'oui', 'non', 'le', 'la', 'de', 'et', 'un', 'une', 'je', 'tu'],
-            'de': ['hallo', 'danke', 'ja', 'nein', 'der', 'die', 'das', 'und', 'ich', 'du', 'ist'],
-            'it': ['ciao', 'grazie', 'sì', 'no', 'il', 'la', 'di', 'e', 'un', 'una', 'io', 'tu'],
-            'pt': ['olá', 'obrigado', 'sim', 'não', 'o', 'a', 'de', 'e', 'um', 'uma', 'eu', 'você'],
-            'hi': ['नमस्ते', 'धन्यवाद', 'हाँ', 'नहीं', 'क्या', 'कैसे', 'कहाँ', 'कब'],
-            'zh': ['你好', '谢谢', '是', '不', '什么', '怎么', '哪里', '什么时候'],
-            'ja': ['こんにちは', 'ありがとう', 'はい', 'いいえ', '何', 'どう', 'どこ', 'いつ'],
-            'ko': ['안녕하세요', '감사합니다', '네', '아니요', '무엇', '어떻게', '어디', '언제'],
-            'ar': ['مرحبا', 'شكرا', 'نعم', 'لا', 'ما', 'كيف', 'أين', 'متى'],
-            'ru': ['привет', 'спасибо', 'да', 'нет', 'что', 'как', 'где', 'когда']
-        }
-        
-        # Count matches for each language
-        scores = {}
-        for lang, words in patterns.items():
-            score = sum(1 for word in words if word in text_lower)
-            if score > 0:
-                scores[lang] = score
-        
-        # Return language with highest score, default to English
-        return max(scores, key=scores.get) if scores else 'en'
+        """Detect the language of the story idea, falling back when unsure"""
+        return detect_language(
+            text,
+            default=settings.LANGUAGE_DETECTION_FALLBACK,
+            min_confidence=settings.LANGUAGE_DETECTION_MIN_CONFIDENCE
+        )
     
-    def generate_story(self, story_request: StoryRequest) -> GeneratedStory:
-        """Generate a story based on the story request"""
+    def generate_story(self, story_request: StoryRequest, generated_story: GeneratedStory = None) -> GeneratedStory:
+        """Generate a story based on the story request.
+
+        When ``generated_story`` is given (a placeholder created by the job
+        queue) it is filled in place instead of creating a new row.
+        """
         
         # Auto-detect language if not specified
-        if not story_request.language or story_request.language == 'auto':
-            detected_lang = self.detect_language(story_request.voice_input or story_request.transcription)
-            story_request.language = detected_lang
-            story_request.save()
+        self.resolve_language(story_request)
         
         # Create the prompt based on user input
-        prompt = self._create_story_prompt(story_request)
+        with timed('prompt'):
+            prompt = self._create_story_prompt(story_request)
+        
+        # Only set when this call reached the provider (not a cache hit)
+        llm = timed('llm')
+        usage = None
+        
+        budget = token_budget(story_request.length, story_request.language)
+        
+        def complete():
+            with llm:
+                return self._complete(prompt, budget)
         
         try:
-            # Generate story using Groq
-            response = self.client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a creative children's storyteller. Create engaging, age-appropriate stories with positive messages and educational value. Always include a clear title and well-structured narrative."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                model=self.model,
-                temperature=0.8,
-                max_tokens=2000,
+            story_content = cached_completion(
+                story_cache_key(story_request, self.model),
+                complete,
+                fresh=story_request.always_fresh
             )
             
-            story_content = response.choices[0].message.content
-            
             # Extract title and content
-            title, content = self._parse_story_response(story_content)
-            
-            # Create GeneratedStory object
-            generated_story = GeneratedStory.objects.create(
-                request=story_request,
-                title=title,
-                content=content,
-                ai_model_used=self.model,
-                status='completed'
-            )
-            
-            return generated_story
+            with timed('parse'):
+                title, content = self._parse_story_response(story_content)
+            status = 'completed'
+            completed_at = timezone.now()
+            # A routed provider reports which backend actually answered
+            model_used = getattr(story_content, 'model', None) or self.model
+            if llm.seconds is not None:
+                usage = getattr(story_content, 'usage', None)
             
+        except UpstreamUnavailable:
+            # Rate limited or overloaded: the caller retries later, the story isn't failed
+            raise
         except Exception as e:
-            # Create failed story record
-            generated_story = GeneratedStory.objects.create(
-                request=story_request,
-                title="Story Generation Failed",
-                content=f"Sorry, we couldn't generate your story right now. Please try again! Error: {str(e)}",
-                ai_model_used=self.model,
-                status='failed'
-            )
+            title = "Story Generation Failed"
+            content = f"Sorry, we couldn't generate your story right now. Please try again! Error: {str(e)}"
+            status = 'failed'
+            completed_at = None
+            model_used = self.model
+        
+        prompt_tokens, completion_tokens = usage or (None, None)
+        with timed('story_write'):
+            if generated_story is None:
+                return GeneratedStory.objects.create(
+                    request=story_request,
+                    title=title,
+                    content=content,
+                    ai_model_used=model_used,
+                    status=status,
+                    completed_at=completed_at,
+                    llm_seconds=llm.seconds,
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens
+                )
+            
+            generated_story.title = title
+            generated_story.content = content
+            generated_story.ai_model_used = model_used
+            generated_story.status = status
+            generated_story.completed_at = completed_at
+            generated_story.llm_seconds = llm.seconds
+            generated_story.prompt_tokens = prompt_tokens
+            generated_story.completion_tokens = completion_tokens
+            generated_story.save()
             return generated_story
     
+    def admit(self, length: str = DEFAULT_LENGTH, language: str = 'en'):
+        """Raise RateLimited now rather than accept a story the provider can't take soon"""
+        self.provider.admit(token_budget(length, language) + PROMPT_TOKEN_ESTIMATE)
+    
+    def token_budget(self, story_request: StoryRequest) -> int:
+        return token_budget(story_request.length, story_request.language)
+    
+    def resolve_language(self, story_request: StoryRequest) -> str:
+        """Replace an 'auto' language with the detected one and persist it"""
+        if not story_request.language or story_request.language == 'auto':
+            detected_lang = self.detect_language(story_request.voice_input or story_request.transcription)
+            story_request.language = detected_lang
+            story_request.save()
+        return story_request.language
+    
+    def _messages(self, prompt: str) -> list:
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def _complete(self, prompt: str, max_tokens: int = MAX_STORY_TOKENS) -> str:
+        """Send the prompt to the LLM provider and return the raw completion text"""
+        completion = self.provider.complete(
+            self._messages(prompt), max_tokens=max_tokens, temperature=0.8, stop=[STORY_END]
+        )
+        record_tokens(getattr(completion, 'usage', None))
+        return completion
+    
+    def astream(self, prompt: str, max_tokens: int = MAX_STORY_TOKENS):
+        """Stream the completion, yielding text deltas as they arrive"""
+        return self.provider.astream(self._messages(prompt), max_tokens=max_tokens, temperature=0.8, stop=[STORY_END])
+    
     def _create_story_prompt(self, story_request: StoryRequest) -> str:
-        """Create a detailed prompt for story generation"""
-        
-        length_mapping = {
-            'short': '300-500 words',
-            'medium': '500-800 words',
-            'long': '800-1200 words'
-        }
-        
-        language_names = {
-            'en': 'English', 'es': 'Spanish', 'fr': 'French', 'de': 'German',
-            'it': 'Italian', 'pt': 'Portuguese', 'hi': 'Hindi', 'zh': 'Chinese',
-            'ja': 'Japanese', 'ko': 'Korean', 'ar': 'Arabic', 'ru': 'Russian'
-        }
-        
-        language_name = language_names.get(story_request.language, 'English')
-        
-        prompt = f"""
-Create a {story_request.genre} story for a {story_request.age_group}-year-old child.
-
-Story Requirements:
-- Length: {length_mapping.get(story_request.length, '500-800 words')}
-- Genre: {story_request.get_genre_display()}
-- Language: Write the entire story in {language_name}
-- Age-appropriate for {story_request.age_group} years old
-
-User Input: "{story_request.voice_input or story_request.transcription}"
-"""
-        
-        if story_request.characters:
-            prompt += f"\n- Include these characters: {story_request.characters}"
-        
-        if story_request.setting:
-            prompt += f"\n- Setting: {story_request.setting}"
-        
-        if story_request.moral_lesson:
-            prompt += f"\n- Include this moral lesson: {story_request.moral_lesson}"
-        
-        prompt += """
-
-Please format your response as:
-TITLE: [Story Title in {language_name}]
-
-[Story content here in {language_name}...]
-
-Make sure the story is:
-- Written entirely in {language_name}
-- Engaging and imaginative
-- Age-appropriate with positive messages
-- Educational and inspiring
-- Safe for children (no violence, scary content, or inappropriate themes)
-- Has a clear beginning, middle, and end
-- Includes dialogue and descriptive language
-- Uses simple vocabulary appropriate for the age group
-"""
-        
-        return prompt
+        """Create a detailed prompt for story generation from the precompiled template"""
+        return build_prompt(story_request)
     
     def _parse_story_response(self, story_content: str) -> tuple:
         """Parse the AI response to extract title and content"""
+        story_content = strip_story_end(story_content)
         lines = story_content.strip().split('\n')
         
         title = "A Magical Story"
@@ -174,6 +173,80 @@ Make sure the story is:
         
         return title, content
 
+class StreamingStoryParser:
+    """Incremental counterpart of ``_parse_story_response`` for streamed completions.
+
+    ``feed`` returns ``(event, text)`` pairs: a single ``'title'`` event as soon
+    as the title line is complete, then ``'content'`` deltas.
+    """
+    DEFAULT_TITLE = "A Magical Story"
+    TITLE_SEARCH_LIMIT = 300  # characters to wait for a TITLE line before giving up
+    
+    def __init__(self):
+        self.title = None
+        self._buffer = ''
+        self._preamble = []
+        self._content = []
+    
+    @property
+    def content(self) -> str:
+        return ''.join(self._content).strip()
+    
+    @staticmethod
+    def _title_from_line(line: str):
+        if line.startswith('TITLE:'):
+            return line.replace('TITLE:', '').strip()
+        if line.startswith('#'):
+            return line.replace('#', '').strip()
+        return None
+    
+    def feed(self, delta: str) -> list:
+        events = []
+        if self.title is None:
+            self._buffer += delta
+            while self.title is None and '\n' in self._buffer:
+                line, self._buffer = self._buffer.split('\n', 1)
+                title = self._title_from_line(line.strip())
+                if title is None:
+                    self._preamble.append(line)
+                else:
+                    self.title = title
+                    events.append(('title', title))
+            
+            if self.title is None:
+                if sum(len(line) + 1 for line in self._preamble) + len(self._buffer) <= self.TITLE_SEARCH_LIMIT:
+                    return events
+                # No title line up front: treat everything as story content
+                self.title = self.DEFAULT_TITLE
+                events.append(('title', self.title))
+                self._buffer = '\n'.join(self._preamble + [self._buffer])
+            
+            delta, self._buffer = self._buffer, ''
+        
+        if not self._content:
+            delta = delta.lstrip()
+        if delta:
+            self._content.append(delta)
+            events.append(('content', delta))
+        return events
+    
+    def finish(self) -> list:
+        """Flush whatever is buffered once the stream has ended"""
+        if self.title is not None:
+            return []
+        title = self._title_from_line(self._buffer.strip())
+        if title is not None:
+            self.title = title
+            return [('title', title)]
+        self.title = self.DEFAULT_TITLE
+        remainder = '\n'.join(self._preamble + [self._buffer])
+        self._buffer = ''
+        return [('title', self.title)] + self.feed(remainder)
+
+def get_story_generator() -> GroqStoryGenerator:
+    """Story generator backed by the configured, shared LLM provider"""
+    return GroqStoryGenerator()
+
 class VoiceTranscriptionService:
     """Service for handling voice transcription - browser-based only"""
     
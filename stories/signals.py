@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .caching import forget_story_response
+from .models import GeneratedStory, StoryRequest
+from .search import index_story, unindex_story
+from .stats import apply_deltas, current_facts, diff_facts
+from .tts import schedule_story_audio
+
+
+@receiver(post_save, sender=GeneratedStory)
+def prerender_completed_story(sender, instance, **kwargs):
+    """Render narration as soon as a story is completed so playback never waits on TTS"""
+    if settings.NARRATION_PRERENDER and instance.status == 'completed' and not instance.audio_file:
+        transaction.on_commit(lambda: schedule_story_audio(instance.pk))
+
+
+@receiver(post_init, sender=StoryRequest)
+@receiver(post_init, sender=GeneratedStory)
+def remember_counted_facts(sender, instance, **kwargs):
+    """Note what a loaded row already contributes to the stats counters"""
+    instance._counted_facts = current_facts(instance)
+
+
+@receiver(post_save, sender=StoryRequest)
+@receiver(post_save, sender=GeneratedStory)
+def count_saved(sender, instance, created, **kwargs):
+    old = {} if created else instance._counted_facts
+    new = current_facts(instance)
+    if old is None or new is None:
+        # Loaded with deferred fields; such saves never change the counted ones
+        return
+    apply_deltas(diff_facts(old, new))
+    instance._counted_facts = new
+
+
+@receiver(post_delete, sender=StoryRequest)
+@receiver(post_delete, sender=GeneratedStory)
+def count_deleted(sender, instance, **kwargs):
+    if instance._counted_facts:
+        apply_deltas(diff_facts(instance._counted_facts, {}))
+
+
+@receiver(post_save, sender=GeneratedStory)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'body', 'status'} & set(update_fields):
+        return
+    index_story(instance)
+
+
+@receiver(post_delete, sender=GeneratedStory)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_story(instance.pk)
+
+
+@receiver(post_save, sender=GeneratedStory)
+@receiver(post_delete, sender=GeneratedStory)
+def forget_rendered_story(sender, instance, **kwargs):
+    """Drop the cached detail response; its ETag no longer matches anyway"""
+    forget_story_response(instance.pk)
@@ -0,0 +1,184 @@
+"""
+Incrementally maintained counters behind the stats endpoint.
+
+Every StoryRequest and GeneratedStory contributes a few facts (its genre,
+length and language; its status). Signal handlers apply the difference
+between an instance's facts when it was loaded and after it is saved or
+deleted, so ``/api/stats/`` reads a few dozen counter rows instead of
+counting whole tables. Both models save inside a transaction
+(``CountedModel``) and Django sends post_delete inside the delete's, so
+the counters commit or roll back with the write. Writes that bypass
+signals (``QuerySet.update``, ``bulk_create``) must call ``apply_deltas``
+themselves; ``rebuild_story_stats`` recomputes everything from scratch.
+
+The counter rows are shared, so writes that change a fact (creates, status
+changes, deletes) serialize on them until they commit. Saves that change
+no fact, like progress and narration updates, don't touch them.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+
+from .caching import get_story_cache
+from .models import GeneratedStory, StoryCounter, StoryRequest
+
+REQUEST_DIMENSIONS = ('genre', 'length', 'language')
+STATS_CACHE_KEY = 'story-stats:snapshot'
+
+
+def generation_seconds(story) -> float:
+    """Request to completion; ``updated_at`` would also count later writes such as narration"""
+    if story.completed_at is None:
+        return 0.0
+    return (story.completed_at - story.created_at).total_seconds()
+
+
+def request_facts(story_request) -> dict:
+    """``{(dimension, value): (count, seconds)}`` contributed by one request"""
+    facts = {('requests', ''): (1, 0.0)}
+    for dimension in REQUEST_DIMENSIONS:
+        facts[(dimension, getattr(story_request, dimension))] = (1, 0.0)
+    return facts
+
+
+def story_facts(story) -> dict:
+    seconds = generation_seconds(story) if story.status == 'completed' else 0.0
+    return {('status', story.status): (1, seconds)}
+
+
+FACTS = {
+    StoryRequest: (request_facts, REQUEST_DIMENSIONS),
+    GeneratedStory: (story_facts, ('status', 'created_at', 'completed_at')),
+}
+
+
+def current_facts(instance):
+    """Facts for a saved instance, or None if the fields they need were deferred"""
+    facts, fields = FACTS[type(instance)]
+    if instance.pk is None or any(field not in instance.__dict__ for field in fields):
+        return None
+    return facts(instance)
+
+
+def diff_facts(old: dict, new: dict) -> dict:
+    deltas = {}
+    for key in old.keys() | new.keys():
+        old_count, old_seconds = old.get(key, (0, 0.0))
+        new_count, new_seconds = new.get(key, (0, 0.0))
+        if new_count != old_count or new_seconds != old_seconds:
+            deltas[key] = (new_count - old_count, new_seconds - old_seconds)
+    return deltas
+
+
+def apply_deltas(deltas: dict):
+    """Add ``{(dimension, value): (count, seconds)}`` to the stored counters"""
+    if not deltas:
+        return
+    with transaction.atomic():
+        for (dimension, value), (count, seconds) in sorted(deltas.items()):
+            counter = StoryCounter.objects.filter(dimension=dimension, value=value)
+            changes = {'count': F('count') + count, 'total_seconds': F('total_seconds') + seconds}
+            if counter.update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    StoryCounter.objects.create(
+                        dimension=dimension, value=value, count=count, total_seconds=seconds
+                    )
+            except IntegrityError:
+                # Another writer created the row first
+                counter.update(**changes)
+
+
+def count_bulk_created(instances):
+    """Count rows inserted with ``bulk_create``, which sends no signals"""
+    deltas = {}
+    for instance in instances:
+        instance._counted_facts = current_facts(instance)
+        for key, (count, seconds) in instance._counted_facts.items():
+            total_count, total_seconds = deltas.get(key, (0, 0.0))
+            deltas[key] = (total_count + count, total_seconds + seconds)
+    apply_deltas(deltas)
+
+
+def count_from_tables(request_model=StoryRequest, story_model=GeneratedStory) -> dict:
+    """Recompute every counter with full-table aggregates (slow; for rebuilds and checks)"""
+    totals = defaultdict(lambda: (0, 0.0))
+    totals[('requests', '')] = (request_model.objects.count(), 0.0)
+    for dimension in REQUEST_DIMENSIONS:
+        for row in request_model.objects.values(dimension).annotate(n=Count('id')).order_by():
+            totals[(dimension, row[dimension])] = (row['n'], 0.0)
+
+    elapsed = ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField())
+    rows = story_model.objects.values('status').annotate(n=Count('id'), elapsed=Sum(elapsed)).order_by()
+    for row in rows:
+        seconds = row['elapsed'].total_seconds() if row['status'] == 'completed' and row['elapsed'] else 0.0
+        totals[('status', row['status'])] = (row['n'], seconds)
+    return dict(totals)
+
+
+def stored_counters(counter_model=StoryCounter) -> dict:
+    return {
+        (dimension, value): (count, seconds)
+        for dimension, value, count, seconds in counter_model.objects.values_list(
+            'dimension', 'value', 'count', 'total_seconds'
+        )
+    }
+
+
+def counter_drift(tolerance_seconds: float = 1.0) -> dict:
+    """Counters whose stored value differs from a fresh count: ``{key: (stored, actual)}``"""
+    stored = stored_counters()
+    actual = count_from_tables()
+    drift = {}
+    for key in stored.keys() | actual.keys():
+        stored_count, stored_seconds = stored.get(key, (0, 0.0))
+        actual_count, actual_seconds = actual.get(key, (0, 0.0))
+        if stored_count != actual_count or abs(stored_seconds - actual_seconds) > tolerance_seconds:
+            drift[key] = (stored.get(key, (0, 0.0)), actual.get(key, (0, 0.0)))
+    return drift
+
+
+def rebuild_counters(request_model=StoryRequest, story_model=GeneratedStory, counter_model=StoryCounter) -> int:
+    """Replace the stored counters with a fresh count; returns the number of rows"""
+    totals = count_from_tables(request_model, story_model)
+    with transaction.atomic():
+        counter_model.objects.all().delete()
+        counter_model.objects.bulk_create([
+            counter_model(dimension=dimension, value=value, count=count, total_seconds=seconds)
+            for (dimension, value), (count, seconds) in totals.items()
+        ])
+    get_story_cache().delete(STATS_CACHE_KEY)
+    return len(totals)
+
+
+def stats_snapshot() -> dict:
+    """Stats snapshot built from the counters, cached for ``STORY_STATS_CACHE_TTL`` seconds"""
+    cache = get_story_cache()
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is not None:
+        return stats
+
+    breakdowns = {dimension: {} for dimension in ('status',) + REQUEST_DIMENSIONS}
+    total_requests = 0
+    generation_total = 0.0
+    for (dimension, value), (count, seconds) in stored_counters().items():
+        if dimension == 'requests':
+            total_requests = count
+        elif dimension in breakdowns and count:
+            breakdowns[dimension][value] = count
+        if (dimension, value) == ('status', 'completed'):
+            generation_total = seconds
+
+    total_stories = breakdowns['status'].get('completed', 0)
+    stats = {
+        'total_stories': total_stories,
+        'total_requests': total_requests,
+        'success_rate': round((total_stories / total_requests * 100) if total_requests > 0 else 0, 2),
+        'average_generation_seconds': round(generation_total / total_stories, 2) if total_stories else None,
+        **{f"by_{dimension}": counts for dimension, counts in breakdowns.items()},
+    }
+    cache.set(STATS_CACHE_KEY, stats, timeout=settings.STORY_STATS_CACHE_TTL)
+    return stats
@@ -0,0 +1,114 @@
+"""
+Server-Sent Events streaming of story generation.
+
+Served through the ASGI entry point: tokens are forwarded to the browser as
+they arrive from the LLM, and the GeneratedStory is persisted once the
+stream completes.
+"""
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .caching import get_cached_completion, record_cache_event, store_completion, story_cache_key
+from .models import GeneratedStory, StoryRequest
+from .metrics import observe, record_tokens
+from .providers import Completion
+from .ratelimit import UpstreamUnavailable, retry_after_header
+from .serializers import GeneratedStorySerializer
+from .services import StreamingStoryParser
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_story_events(generator, story_request: StoryRequest, story: GeneratedStory):
+    """Yield SSE frames for ``story`` while ``generator`` streams its completion.
+
+    If the stream is closed early (the client went away, so the response is
+    cancelled or the generator closed), the story is saved as failed rather
+    than left ``'generating'`` with partial content.
+    """
+    saved = False
+    try:
+        yield sse_event('story', {'id': story.pk})
+
+        await sync_to_async(generator.resolve_language)(story_request)
+        started = time.perf_counter()
+        prompt = generator._create_story_prompt(story_request)
+        await sync_to_async(observe)('prompt', time.perf_counter() - started)
+        parser = StreamingStoryParser()
+        cache_key = story_cache_key(story_request, generator.model)
+        model_used = None
+
+        try:
+            cached = None
+            if story_request.always_fresh:
+                await sync_to_async(record_cache_event)('bypassed')
+            else:
+                cached = await sync_to_async(get_cached_completion)(cache_key)
+
+            if cached is not None:
+                model_used = getattr(cached, 'model', None)
+                events = parser.feed(cached) + parser.finish()
+                for event, text in events:
+                    yield sse_event(event, {'text': text})
+            else:
+                parts = []
+                usage = None
+                started = time.perf_counter()
+                async for delta in generator.astream(prompt, generator.token_budget(story_request)):
+                    if not parts:
+                        await sync_to_async(observe)('llm_first_token', time.perf_counter() - started)
+                    parts.append(delta)
+                    usage = getattr(delta, 'usage', None) or usage
+                    for event, text in parser.feed(delta):
+                        yield sse_event(event, {'text': text})
+                story.llm_seconds = time.perf_counter() - started
+                await sync_to_async(observe)('llm', story.llm_seconds)
+                for event, text in parser.finish():
+                    yield sse_event(event, {'text': text})
+                model_used = getattr(parts[0], 'model', None) if parts else None
+                if usage:
+                    story.prompt_tokens, story.completion_tokens = usage
+                    await sync_to_async(record_tokens)(usage)
+                # Like cached_completion(fresh=True): an always-fresh story never fills the cache
+                if not story_request.always_fresh:
+                    await sync_to_async(store_completion)(
+                        cache_key, Completion(''.join(parts), model_used or generator.model, usage)
+                    )
+                    await sync_to_async(record_cache_event)('misses')
+
+            story.title = parser.title
+            story.content = parser.content
+            story.status = 'completed'
+            story.completed_at = timezone.now()
+
+        except Exception as e:
+            story.title = "Story Generation Failed"
+            story.content = f"Sorry, we couldn't generate your story right now. Please try again! Error: {str(e)}"
+            story.status = 'failed'
+            error = {'error': str(e)}
+            if isinstance(e, UpstreamUnavailable):
+                error['retry_after'] = retry_after_header(e.retry_after)
+            yield sse_event('error', error)
+
+        story.ai_model_used = model_used or generator.model
+        started = time.perf_counter()
+        await sync_to_async(story.save)()
+        saved = True
+        await sync_to_async(observe)('story_write', time.perf_counter() - started)
+
+        data = await sync_to_async(lambda: GeneratedStorySerializer(story).data)()
+        yield sse_event('done', {'story': data})
+    finally:
+        if not saved:
+            story.title = "Story Generation Failed"
+            story.content = "Sorry, the story stopped before it was finished. Please try again!"
+            story.status = 'failed'
+            story.completed_at = None
+            # Shielded so a second cancellation can't drop the write
+            await asyncio.shield(sync_to_async(story.save)())
@@ -0,0 +1,500 @@
+"""
+Narration audio rendering with a content-addressed on-disk cache.
+
+Story text is split into sentence-aligned chunks that are synthesized in
+parallel on a bounded thread pool and emitted in order, so playback can
+begin as soon as the first chunk is ready (``astream_narration`` awaits the
+same pool from async views). The TTS backend is pluggable
+(``NARRATION_ENGINE``); ``'fake'`` is a local stand-in for tests.
+
+Rendered MP3s live under ``NARRATION_CACHE_DIR`` named by a hash of the text
+and voice options, so any replay of the same narration is a file read. The
+directory is kept under ``NARRATION_CACHE_MAX_BYTES`` by evicting the least
+recently used files (hits refresh a file's mtime). Each process keeps a running
+estimate of the directory's size and only scans it to prune once the estimate
+crosses the limit; ``prune_narration_cache`` also runs as a management command.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .caching import SingleFlight, forget_story_response
+from .metrics import aobserve, observe, timed
+from .models import GeneratedStory
+
+logger = logging.getLogger(__name__)
+
+# Language mapping for gTTS
+GTTS_LANG_MAP = {
+    'hi': 'hi', 'en': 'en', 'es': 'es', 'fr': 'fr',
+    'de': 'de', 'it': 'it', 'pt': 'pt', 'zh': 'zh',
+    'ja': 'ja', 'ko': 'ko', 'ar': 'ar', 'ru': 'ru'
+}
+
+# Form-encoded requests send booleans as strings
+BOOLEAN_STRINGS = {'true': True, '1': True, 'false': False, '0': False}
+
+_evict_lock = threading.Lock()
+_cache_bytes = {}  # cache dir -> approximate size, as of its last scan plus this process's writes since
+
+
+def voice_options(language: str, slow=False, tld: str = 'com') -> dict:
+    """Validated voice options; raises ValueError for anything a client should not choose.
+
+    gTTS requests ``https://translate.google.<tld>``, so the accent ``tld``
+    must come from ``NARRATION_TLDS`` rather than straight from a request.
+    """
+    if isinstance(slow, str):
+        slow = BOOLEAN_STRINGS.get(slow.strip().lower(), slow)
+    if not isinstance(slow, bool):
+        raise ValueError("'slow' must be true or false")
+    tld = tld or 'com'
+    if tld not in settings.NARRATION_TLDS:
+        raise ValueError(f"Unsupported accent tld {tld!r}")
+    return {'lang': GTTS_LANG_MAP.get(language, 'en'), 'slow': slow, 'tld': tld}
+
+
+def narration_key(text: str, options: dict) -> str:
+    payload = json.dumps({'text': text, **options}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def narration_path(key: str) -> Path:
+    return Path(settings.NARRATION_CACHE_DIR) / key[:2] / f"{key}.mp3"
+
+
+class TTSEngine:
+    """Interface for speech synthesis backends producing MP3 bytes"""
+    name = ''
+
+    def synthesize(self, text: str, options: dict) -> bytes:
+        raise NotImplementedError
+
+
+_engines = {}
+
+
+def register_engine(name: str):
+    """Class decorator adding a TTS engine to the registry"""
+    def decorator(cls):
+        cls.name = name
+        _engines[name] = cls
+        return cls
+    return decorator
+
+
+@register_engine('gtts')
+class GTTSEngine(TTSEngine):
+    """Google Translate text-to-speech"""
+
+    def synthesize(self, text, options):
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=options['lang'], slow=options['slow'], tld=options['tld']).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+@register_engine('fake')
+class FakeTTSEngine(TTSEngine):
+    """Local stand-in for tests and benchmarks: fixed latency plus per-character cost"""
+
+    def __init__(self, latency=0.0, seconds_per_char=0.0, jitter=0.0):
+        self.latency = latency
+        self.seconds_per_char = seconds_per_char
+        self.jitter = jitter  # up to this many extra seconds per call, uniformly
+
+    def synthesize(self, text, options):
+        delay = self.latency + self.seconds_per_char * len(text)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        return b'ID3' + text.encode('utf-8')
+
+
+def get_tts_engine(name: str = None) -> TTSEngine:
+    name = name or settings.NARRATION_ENGINE
+    options = dict(settings.NARRATION_ENGINES.get(name, {}))
+    return _engines[options.pop('backend', name)](**options)
+
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?。！？।])\s+|(?<=[。！？])')
+
+
+def split_into_chunks(text: str, max_chars: int = 400, first_chars: int = 120) -> list:
+    """Split narration text into sentence-aligned chunks for parallel synthesis.
+
+    The first chunk is kept short so playback can start as soon as possible.
+    Chunks never span paragraphs; over-long sentences are split on whitespace.
+    """
+    pieces = []
+    for paragraph in re.split(r'\n\s*\n', text):
+        for sentence in SENTENCE_END_RE.split(paragraph):
+            sentence = ' '.join(sentence.split())
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+        pieces.append(None)  # paragraph break
+
+    chunks = []
+    current = ''
+    for piece in pieces:
+        limit = max_chars if chunks else first_chars
+        if piece is None or (current and len(current) + 1 + len(piece) > limit):
+            if current:
+                chunks.append(current)
+            current = ''
+        if piece:
+            current = f"{current} {piece}" if current else piece
+    return chunks
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_tts_executor() -> ThreadPoolExecutor:
+    """Process-wide pool bounding concurrent synthesis calls"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.NARRATION_TTS_WORKERS, thread_name_prefix='tts'
+                )
+    return _executor
+
+
+def _timed_synthesize(engine: TTSEngine, chunk: str, options: dict) -> bytes:
+    with timed('tts_chunk'):
+        return engine.synthesize(chunk, options)
+
+
+def synthesize_chunks(text: str, options: dict, engine: TTSEngine = None):
+    """Yield MP3 bytes for each chunk, in order, synthesizing ahead in parallel.
+
+    At most ``NARRATION_TTS_PREFETCH`` chunks per narration are in flight so
+    one long story cannot monopolize the shared pool.
+    """
+    engine = engine or get_tts_engine()
+    executor = get_tts_executor()
+    chunks = iter(split_into_chunks(text))
+    pending = deque()
+
+    def fill():
+        while len(pending) < settings.NARRATION_TTS_PREFETCH:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            pending.append(executor.submit(_timed_synthesize, engine, chunk, options))
+
+    try:
+        fill()
+        while pending:
+            audio = pending.popleft().result()
+            fill()
+            yield audio
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def asynthesize_chunks(text: str, options: dict, engine: TTSEngine = None):
+    """Async counterpart of ``synthesize_chunks`` on the same bounded pool.
+
+    The caller awaits the pool's futures instead of blocking a thread on each
+    chunk, so an ASGI worker can hold many narrations in flight.
+    """
+    engine = engine or get_tts_engine()
+    executor = get_tts_executor()
+    chunks = iter(split_into_chunks(text))
+    pending = deque()
+
+    def fill():
+        while len(pending) < settings.NARRATION_TTS_PREFETCH:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return
+            pending.append(asyncio.wrap_future(executor.submit(_timed_synthesize, engine, chunk, options)))
+
+    try:
+        fill()
+        while pending:
+            audio = await pending.popleft()
+            fill()
+            yield audio
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def cached_narration(key: str):
+    """Return the cached file for ``key`` (marking it recently used), or None"""
+    path = narration_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def stream_narration(text: str, options: dict, key: str = None):
+    """Yield MP3 bytes as chunks finish, storing the full file in the cache at the end"""
+    key = key or narration_key(text, options)
+    path = narration_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temp file and rename so readers never see a partial MP3
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    completed = False
+    started = time.perf_counter()
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for index, audio in enumerate(synthesize_chunks(text, options)):
+                if index == 0:
+                    observe('tts_first_chunk', time.perf_counter() - started)
+                fh.write(audio)
+                yield audio
+            size = fh.tell()
+        os.replace(tmp_name, path)
+        completed = True
+        observe('tts_total', time.perf_counter() - started)
+    finally:
+        if not completed and os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+    note_cached_narration(size)
+
+
+async def astream_narration(text: str, options: dict, key: str = None):
+    """Async counterpart of ``stream_narration`` for responses served over ASGI"""
+    key = key or narration_key(text, options)
+    path = narration_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    completed = False
+    started = time.perf_counter()
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            first = True
+            async for audio in asynthesize_chunks(text, options):
+                if first:
+                    await aobserve('tts_first_chunk', time.perf_counter() - started)
+                    first = False
+                fh.write(audio)
+                yield audio
+            size = fh.tell()
+        os.replace(tmp_name, path)
+        completed = True
+        await aobserve('tts_total', time.perf_counter() - started)
+    finally:
+        if not completed and os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+    await sync_to_async(note_cached_narration, thread_sensitive=False)(size)
+
+
+def render_narration(text: str, options: dict):
+    """Return ``(key, path)`` for the narration, synthesizing it on a cache miss"""
+    key = narration_key(text, options)
+    path = cached_narration(key)
+    if path is None:
+        for _ in stream_narration(text, options, key):
+            pass
+        path = narration_path(key)
+    return key, path
+
+
+def note_cached_narration(size: int):
+    """Count a newly cached file, pruning only once the cache may have outgrown its limit.
+
+    The first file a process caches triggers a scan to learn the size.
+    """
+    root = str(settings.NARRATION_CACHE_DIR)
+    with _evict_lock:
+        if root in _cache_bytes:
+            _cache_bytes[root] += size
+            if _cache_bytes[root] <= settings.NARRATION_CACHE_MAX_BYTES:
+                return
+    prune_narration_cache(settings.NARRATION_CACHE_MAX_BYTES)
+
+
+def prune_narration_cache(max_bytes: int, max_age_seconds: float = None, now: float = None) -> dict:
+    """Evict least recently used files until the cache fits in ``max_bytes``"""
+    root = Path(settings.NARRATION_CACHE_DIR)
+    removed = freed = 0
+    with _evict_lock:
+        entries = []
+        for path in root.glob('*/*.mp3'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        cutoff = (now or time.time()) - max_age_seconds if max_age_seconds else None
+        for mtime, size, path in entries:
+            if total <= max_bytes and (cutoff is None or mtime >= cutoff):
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            total -= size
+            removed += 1
+            freed += size
+        _cache_bytes[str(root)] = total
+
+    return {'removed': removed, 'freed_bytes': freed, 'remaining_bytes': total}
+
+
+# MPEG audio layer III bitrates in kbps, indexed by the header's bitrate bits
+MP3_BITRATES = {
+    'mpeg1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    'mpeg2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+
+def mp3_duration(path) -> float:
+    """Estimate a constant-bitrate MP3's duration from its first frame header"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as fh:
+        head = fh.read(64 * 1024)
+
+    offset = 0
+    if head[:3] == b'ID3' and len(head) >= 10:
+        tag_size = (head[6] & 0x7f) << 21 | (head[7] & 0x7f) << 14 | (head[8] & 0x7f) << 7 | (head[9] & 0x7f)
+        offset = 10 + tag_size
+
+    for i in range(offset, len(head) - 3):
+        if head[i] != 0xFF or head[i + 1] & 0xE0 != 0xE0:
+            continue
+        version = (head[i + 1] >> 3) & 0x3  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        layer = (head[i + 1] >> 1) & 0x3  # 1 = layer III
+        bitrate_index = head[i + 2] >> 4
+        if layer != 1 or version == 1 or bitrate_index in (0, 15):
+            continue
+        kbps = MP3_BITRATES['mpeg1' if version == 3 else 'mpeg2'][bitrate_index]
+        return round((size - i) * 8 / (kbps * 1000), 2)
+    return None
+
+
+def story_narration_text(story) -> str:
+    return f"{story.title}.\n\n{story.content}"
+
+
+def render_story_audio(story) -> Path:
+    """Render the story's narration to MEDIA_ROOT and record it on the story.
+
+    Story audio is kept outside the LRU narration cache so it is never evicted.
+    """
+    relative = Path(settings.STORY_AUDIO_DIR) / f"story_{story.pk}.mp3"
+    path = Path(settings.MEDIA_ROOT) / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    options = voice_options(story.request.language)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            for audio in synthesize_chunks(story_narration_text(story), options):
+                fh.write(audio)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+    story.audio_file = relative.as_posix()
+    story.audio_size = path.stat().st_size
+    story.audio_duration = mp3_duration(path)
+    story.audio_rendered_at = timezone.now()
+    # update() rather than save(): no signals, and the body is untouched.
+    # audio_rendered_at versions the detail response's new audio_url;
+    # updated_at is left alone since nothing else about the story changed.
+    GeneratedStory.objects.filter(pk=story.pk).update(
+        audio_file=story.audio_file,
+        audio_size=story.audio_size,
+        audio_duration=story.audio_duration,
+        audio_rendered_at=story.audio_rendered_at,
+    )
+    forget_story_response(story.pk)
+    return path
+
+
+AUDIO_FIELDS = ['audio_file', 'audio_size', 'audio_duration', 'audio_rendered_at']
+_audio_flight = SingleFlight()
+
+
+def ensure_story_audio(story):
+    """Render the story's narration unless it already exists.
+
+    Concurrent callers for one story (a download racing the background
+    pre-render) wait for a single render instead of each synthesizing it.
+    """
+    def render():
+        story.refresh_from_db(fields=AUDIO_FIELDS)
+        if not story.audio_file:
+            render_story_audio(story)
+
+    _, shared = _audio_flight.do(f"story-audio:{story.pk}", render)
+    if shared:
+        story.refresh_from_db(fields=AUDIO_FIELDS)
+
+
+_prerender_executor = None
+_prerendering = set()
+_prerender_lock = threading.Lock()
+
+
+def _prerender(story_id: int):
+    try:
+        close_old_connections()
+        story = GeneratedStory.objects.select_related('request').with_content().get(pk=story_id)
+        if story.status == 'completed' and not story.audio_file:
+            ensure_story_audio(story)
+    except Exception:
+        logger.exception("Narration pre-render failed for story %s", story_id)
+    finally:
+        with _prerender_lock:
+            _prerendering.discard(story_id)
+        close_old_connections()
+
+
+def schedule_story_audio(story_id: int):
+    """Pre-render narration for a completed story in the background (once at a time)"""
+    global _prerender_executor
+    with _prerender_lock:
+        if story_id in _prerendering:
+            return
+        _prerendering.add(story_id)
+        if _prerender_executor is None:
+            _prerender_executor = ThreadPoolExecutor(
+                max_workers=settings.NARRATION_PRERENDER_WORKERS, thread_name_prefix='narration'
+            )
+
+    if settings.STORY_JOBS_EAGER:
+        _prerender(story_id)
+    else:
+        _prerender_executor.submit(_prerender, story_id)
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'stories'
@@ -9,10 +9,20 @@ urlpatterns = [
     
     # API endpoints
     path('api/stories/create/', views.CreateStoryView.as_view(), name='create_story'),
+    path('api/stories/batch/', views.BatchCreateStoryView.as_view(), name='batch_create_stories'),
+    path('api/stories/stream/', views.stream_story, name='stream_story'),
     path('api/stories/', views.StoryListView.as_view(), name='story_list'),
+    path('api/stories/search/', views.StorySearchView.as_view(), name='story_search'),
     path('api/stories/<int:pk>/', views.StoryDetailView.as_view(), name='story_detail'),
+    path('api/stories/<int:pk>/audio/', views.StoryAudioView.as_view(), name='story_audio'),
+    path('api/jobs/<int:pk>/', views.StoryJobView.as_view(), name='story_job'),
     path('api/stories/<int:story_id>/favorite/', views.FavoriteStoryView.as_view(), name='favorite_story'),
+    path('api/stories/<int:story_id>/sessions/', views.StartListeningView.as_view(), name='start_listening'),
+    path('api/sessions/<int:pk>/progress/', views.ListeningProgressView.as_view(), name='listening_progress'),
     path('api/voice/upload/', views.VoiceUploadView.as_view(), name='voice_upload'),
     path('api/stats/', views.story_stats, name='story_stats'),
+    path('metrics', views.metrics, name='metrics'),
     path('api/tts/gtts/', views.GTTSAudioView.as_view(), name='gtts_audio'),
+    path('api/tts/download/<int:story_id>/', views.StoryAudioDownloadView.as_view(), name='download_audio'),
+    re_path(r'^api/tts/gtts/(?P<key>[0-9a-f]{64})\.mp3$', views.GTTSAudioFileView.as_view(), name='gtts_audio_file'),
 ]
\ No newline at end of file
@@ -1,84 +1,470 @@
 from django.shortcuts import render
 from rest_framework import status, generics
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login
-from django.http import HttpResponse
-from .models import StoryRequest, GeneratedStory, StorySession, FavoriteStory, ChildProfile
+from django.core.exceptions import BadRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.urls import reverse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST, require_safe
+from django.contrib.staticfiles.views import serve as serve_uncollected
+from django.http import Http404
+from asgiref.sync import sync_to_async
+from .models import StoryRequest, GeneratedStory, StorySession, FavoriteStory, ChildProfile, StoryJob
 from .serializers import (
     StoryRequestSerializer, GeneratedStorySerializer, 
     StorySessionSerializer, FavoriteStorySerializer,
-    ChildProfileSerializer
+    ChildProfileSerializer, StoryJobSerializer, StoryListSerializer,
+    StoryBatchItemSerializer, ListeningProgressSerializer
 )
-from .services import GroqStoryGenerator, VoiceTranscriptionService
+from .pagination import StoryCursorPagination
+from .services import VoiceTranscriptionService, get_story_generator
+from .jobs import enqueue_story, enqueue_story_batch
+from .caching import (
+    cache_stats, get_rendered, list_response_key, store_rendered, story_response_key
+)
+from .stats import stats_snapshot
+from .search import search_stories
+from .ratelimit import RateLimited, rate_limit_stats, retry_after_header
+from .routing import routing_stats
+from .metrics import arecord_narration_event, render_prometheus, timed
+from .http import file_response, not_modified, set_validators
+from .assets import asset_response, find_asset
+from .tts import (
+    astream_narration, cached_narration, ensure_story_audio, narration_key, stream_narration, voice_options
+)
+from .streaming import stream_story_events
+from .progress import record_progress, remember_session, session_exists
+import hashlib
 import json
+import os
+from datetime import timedelta
+
+# A finished story with its narration in place no longer changes; anything
+# else (still generating, or narration about to appear) is revalidated
+SETTLED_STORY_CACHE_CONTROL = 'public, max-age=3600'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
 
+@method_decorator(gzip_page, name='dispatch')
 class HomeView(APIView):
     """Home page view"""
     def get(self, request):
         return render(request, 'stories/index.html')
 
-class CreateStoryView(APIView):
+def create_story_request(data) -> StoryRequest:
+    """Persist a StoryRequest for the demo user from submitted story options"""
+    # Get or create anonymous user for demo
+    user, created = User.objects.get_or_create(
+        username='demo_user',
+        defaults={'email': 'demo@vocaltales.com'}
+    )
+    
+    return StoryRequest.objects.create(
+        user=user,
+        voice_input=data.get('voice_input', ''),
+        transcription=data.get('transcription', ''),
+        genre=data.get('genre', 'adventure'),
+        length=data.get('length', 'medium'),
+        language=data.get('language', 'auto'),
+        age_group=int(data.get('age_group', 6)),
+        characters=data.get('characters', ''),
+        setting=data.get('setting', ''),
+        moral_lesson=data.get('moral_lesson', ''),
+        always_fresh=str(data.get('always_fresh', '')).lower() in ('1', 'true', 'yes')
+    )
+
+def request_data(request):
+    """Submitted fields of a plain Django request, JSON or form-encoded (like DRF's ``request.data``)"""
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            raise BadRequest('Malformed JSON body')
+    return request.POST
+
+def json_response(data, status=status.HTTP_200_OK) -> JsonResponse:
+    """JSON rendered the way DRF does it, leaving non-ASCII story text unescaped"""
+    return JsonResponse(data, status=status, json_dumps_params={'ensure_ascii': False})
+
+def busy_response(error, response_class=Response):
+    """503 telling the client when story generation can take it again"""
+    response = response_class({
+        'success': False,
+        'error': str(error),
+        'retry_after': retry_after_header(error.retry_after),
+        'message': 'Too many stories are being written right now'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = retry_after_header(error.retry_after)
+    return response
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CreateStoryView(View):
     """Create a new story from voice input or text"""
     
+    async def post(self, request):
+        data = request_data(request)
+        try:
+            async with timed('create_story'):
+                # Shed load up front instead of queueing work the LLM can't take soon
+                async with timed('admission'):
+                    get_story_generator().admit(data.get('length'), data.get('language'))
+                async with timed('request_write'):
+                    story_request = await sync_to_async(create_story_request)(data)
+                
+                # Queue generation; a background worker fills in the story
+                async with timed('enqueue'):
+                    job = await sync_to_async(enqueue_story)(story_request)
+                
+                job_data = await sync_to_async(lambda: StoryJobSerializer(job).data)()
+                
+                return json_response({
+                    'success': True,
+                    'job': job_data,
+                    'story': job_data['story'],
+                    'status_url': reverse('stories:story_job', args=[job.pk]),
+                    'message': 'Story generation started!'
+                }, status=status.HTTP_202_ACCEPTED)
+            
+        except RateLimited as e:
+            return busy_response(e, json_response)
+        except Exception as e:
+            return json_response({
+                'success': False,
+                'error': str(e),
+                'message': 'Failed to generate story'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class BatchCreateStoryView(APIView):
+    """Create many stories in one call; generation runs on the bounded worker pool"""
+    
     def post(self, request):
         try:
-            # Get or create anonymous user for demo
+            items = request.data.get('stories') if isinstance(request.data, dict) else None
+            if not isinstance(items, list) or not items:
+                return Response({
+                    'success': False,
+                    'error': 'Provide a non-empty "stories" list'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if len(items) > settings.STORY_BATCH_MAX_ITEMS:
+                return Response({
+                    'success': False,
+                    'error': f'At most {settings.STORY_BATCH_MAX_ITEMS} stories per batch'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
             user, created = User.objects.get_or_create(
                 username='demo_user',
                 defaults={'email': 'demo@vocaltales.com'}
             )
             
-            data = request.data
-            
-            # Create story request
-            story_request = StoryRequest.objects.create(
-                user=user,
-                voice_input=data.get('voice_input', ''),
-                transcription=data.get('transcription', ''),
-                genre=data.get('genre', 'adventure'),
-                length=data.get('length', 'medium'),
-                language=data.get('language', 'auto'),
-                age_group=int(data.get('age_group', 6)),
-                characters=data.get('characters', ''),
-                setting=data.get('setting', ''),
-                moral_lesson=data.get('moral_lesson', '')
-            )
-            
-            # Generate story using Groq
-            story_generator = GroqStoryGenerator()
-            generated_story = story_generator.generate_story(story_request)
+            # Validate every item; invalid ones are reported without failing the rest
+            results = []
+            story_requests = []
+            for index, item in enumerate(items):
+                serializer = StoryBatchItemSerializer(data=item)
+                if serializer.is_valid():
+                    results.append({'index': index})
+                    story_requests.append(StoryRequest(user=user, **serializer.validated_data))
+                else:
+                    results.append({'index': index, 'status': 'invalid', 'errors': serializer.errors})
             
-            # Serialize and return the generated story
-            serializer = GeneratedStorySerializer(generated_story)
+            jobs = iter(enqueue_story_batch(story_requests) if story_requests else [])
+            for result in results:
+                if 'errors' in result:
+                    continue
+                job = next(jobs)
+                result.update({
+                    'status': job.status,
+                    'job': job.pk,
+                    'story': job.story_id,
+                    'status_url': reverse('stories:story_job', args=[job.pk])
+                })
             
+            accepted = len(story_requests)
             return Response({
-                'success': True,
-                'story': serializer.data,
-                'message': 'Story generated successfully!'
-            }, status=status.HTTP_201_CREATED)
+                'success': accepted > 0,
+                'accepted': accepted,
+                'rejected': len(items) - accepted,
+                'results': results,
+                'message': f'{accepted} of {len(items)} stories queued'
+            }, status=status.HTTP_202_ACCEPTED if accepted else status.HTTP_400_BAD_REQUEST)
             
         except Exception as e:
             return Response({
                 'success': False,
                 'error': str(e),
-                'message': 'Failed to generate story'
+                'message': 'Failed to create stories'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    def get(self, request):
+        """Poll several jobs at once: ?jobs=1,2,3"""
+        try:
+            job_ids = [int(job_id) for job_id in request.query_params.get('jobs', '').split(',') if job_id]
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'jobs must be a comma-separated list of ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        jobs = list(
+            StoryJob.objects.filter(pk__in=job_ids[:settings.STORY_BATCH_MAX_ITEMS])
+            .select_related('story').order_by('id')
+        )
+        summary = {}
+        for job in jobs:
+            summary[job.status] = summary.get(job.status, 0) + 1
+        return Response({
+            'success': True,
+            'summary': summary,
+            'jobs': [
+                {
+                    'job': job.pk,
+                    'status': job.status,
+                    'story': job.story_id,
+                    'story_status': job.story.status,
+                    'title': job.story.title,
+                    'error': job.last_error or None
+                }
+                for job in jobs
+            ]
+        })
 
-class StoryListView(generics.ListAPIView):
+@csrf_exempt
+@require_POST
+async def stream_story(request):
+    """Create a story and stream it to the browser as Server-Sent Events"""
+    generator = get_story_generator()
+    try:
+        data = json.loads(request.body or b'{}')
+        generator.admit(data.get('length'), data.get('language'))
+        story_request = await sync_to_async(create_story_request)(data)
+        story = await GeneratedStory.objects.acreate(
+            request=story_request,
+            title='',
+            content='',
+            status='generating'
+        )
+    except RateLimited as e:
+        return busy_response(e, JsonResponse)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'message': 'Failed to generate story'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    response = StreamingHttpResponse(
+        stream_story_events(generator, story_request, story),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx from buffering the stream
+    return response
+
+class StoryListView(View):
     """List all stories for a user"""
-    serializer_class = GeneratedStorySerializer
+    serializer_class = StoryListSerializer
+    pagination_class = StoryCursorPagination
+    
+    async def get(self, request):
+        try:
+            return await sync_to_async(self.paginate)(request)
+        except NotFound as e:
+            return json_response({'detail': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+    
+    def paginate(self, request) -> HttpResponse:
+        """One page of story cards; the query and serialization share one hop to the ORM thread.
+        
+        The page's ETag comes from the rows the query returned, so an
+        unchanged page is answered with a 304, or from the rendered cache,
+        without serializing it again. A new or deleted story shifts the rows
+        and so changes the tag.
+        """
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(self.get_queryset(), Request(request), view=self)
+        url = request.build_absolute_uri()
+        versions = ','.join(f"{story.pk}:{story.updated_at.timestamp()}" for story in page)
+        etag = f'"stories-{hashlib.sha256(f"{url}|{versions}".encode()).hexdigest()[:32]}"'
+        
+        response = not_modified(request, etag)
+        if response is None:
+            key = list_response_key(url)
+            body = get_rendered(key, etag)
+            if body is None:
+                body = json_response(
+                    paginator.get_paginated_response(self.serializer_class(page, many=True).data).data
+                ).content
+                store_rendered(key, etag, body)
+            response = HttpResponse(body, content_type='application/json')
+        # New stories arrive at any time: always revalidate, which is cheap
+        return set_validators(response, etag, cache_control=REVALIDATE_CACHE_CONTROL)
     
     def get_queryset(self):
-        # For demo, show all stories
-        return GeneratedStory.objects.filter(status='completed').order_by('-created_at')
+        # For demo, show all stories. One query per page: the request is joined
+        # and only a short excerpt of each body leaves the database.
+        return (
+            GeneratedStory.objects.filter(status='completed')
+            .select_related('request')
+            .only(
+                'id', 'title', 'excerpt', 'word_count', 'estimated_duration', 'created_at', 'updated_at',
+                'request__genre', 'request__language'
+            )
+            .order_by('-created_at')
+        )
+
+class StorySearchView(APIView):
+    """Full-text search over completed stories, best matches first"""
+    
+    def get(self, request):
+        try:
+            query = request.query_params.get('q', '').strip()
+            if not query:
+                return Response({
+                    'success': False,
+                    'error': 'No search query provided'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            try:
+                days = request.query_params.get('days')
+                since = timezone.now() - timedelta(days=int(days)) if days else None
+                limit = min(max(int(request.query_params.get('limit', 20)), 1), 50)
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'error': 'days and limit must be whole numbers'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            hits = search_stories(
+                query,
+                genre=request.query_params.get('genre') or None,
+                language=request.query_params.get('language') or None,
+                since=since,
+                limit=limit
+            )
+            
+            return Response({
+                'success': True,
+                'query': query,
+                'results': [hit._asdict() for hit in hits]
+            })
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class StoryDetailView(generics.RetrieveAPIView):
+class StoryDetailView(View):
     """Get a specific story"""
-    queryset = GeneratedStory.objects.all()
+    queryset = GeneratedStory.objects.select_related('request').with_content()
     serializer_class = GeneratedStorySerializer
+    
+    async def get(self, request, pk):
+        return await sync_to_async(self.respond)(request, pk)
+    
+    def respond(self, request, pk) -> HttpResponse:
+        """Revalidate against the story's version before loading the full row"""
+        version = (
+            GeneratedStory.objects.filter(pk=pk)
+            .values('status', 'audio_file', 'updated_at', 'audio_rendered_at')
+            .first()
+        )
+        if version is None:
+            return json_response({
+                'detail': 'No GeneratedStory matches the given query.'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        etag, last_modified, cache_control = self.validators(pk, **version)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            completed = version['status'] == 'completed'
+            body = get_rendered(story_response_key(pk), etag) if completed else None
+            if body is None:
+                # Everything the serializer reads comes with one query
+                story = self.queryset.filter(pk=pk).first()
+                if story is None:
+                    return json_response({
+                        'detail': 'No GeneratedStory matches the given query.'
+                    }, status=status.HTTP_404_NOT_FOUND)
+                # The story may have changed since the version lookup: tag what was rendered
+                etag, last_modified, cache_control = self.validators(
+                    pk, story.status, story.audio_file, story.updated_at, story.audio_rendered_at
+                )
+                body = json_response(self.serializer_class(story).data).content
+                if story.status == 'completed':
+                    store_rendered(story_response_key(pk), etag, body)
+            response = HttpResponse(body, content_type='application/json')
+        return set_validators(response, etag, last_modified, cache_control)
+    
+    @staticmethod
+    def validators(pk, status, audio_file, updated_at, audio_rendered_at):
+        """The row's own writes (updated_at) and the narration render version the response"""
+        rendered = int(audio_rendered_at.timestamp() * 1_000_000) if audio_rendered_at else 0
+        etag = f'"story-{pk}-{int(updated_at.timestamp() * 1_000_000):x}-{rendered:x}"'
+        last_modified = max(updated_at, audio_rendered_at) if audio_rendered_at else updated_at
+        settled = status == 'completed' and audio_file
+        return etag, last_modified, SETTLED_STORY_CACHE_CONTROL if settled else REVALIDATE_CACHE_CONTROL
+
+def story_audio_response(request, story, as_attachment=False):
+    """Serve a story's rendered narration from disk; completed stories never change"""
+    path = os.path.join(settings.MEDIA_ROOT, story.audio_file)
+    filename = f"{story.title or 'story'}.mp3" if as_attachment else f"story_{story.pk}.mp3"
+    return file_response(
+        request, path, f"story-{story.pk}-{story.audio_size}", 'audio/mpeg',
+        filename=filename, as_attachment=as_attachment,
+        cache_control='public, max-age=31536000, immutable'
+    )
+
+class StoryAudioView(APIView):
+    """Stream a story's pre-rendered narration (supports seeking)"""
+    
+    def get(self, request, pk):
+        story = GeneratedStory.objects.filter(pk=pk).only('title', 'audio_file', 'audio_size').first()
+        if story is None or not story.audio_file:
+            return Response({
+                'error': 'Audio not ready'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return story_audio_response(request, story)
+
+class StoryAudioDownloadView(APIView):
+    """Download a story's narration as an MP3, rendering it first if needed"""
+    
+    def get(self, request, story_id):
+        try:
+            story = GeneratedStory.objects.select_related('request').with_content().get(pk=story_id, status='completed')
+            
+            if not story.audio_file:
+                # Joins a pre-render already in flight rather than duplicating it
+                ensure_story_audio(story)
+            
+            return story_audio_response(request, story, as_attachment=True)
+            
+        except GeneratedStory.DoesNotExist:
+            return Response({
+                'success': False,
+                'error': 'Story not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class StoryJobView(generics.RetrieveAPIView):
+    """Poll the status of a background story generation job"""
+    queryset = StoryJob.objects.select_related('story__request')
+    serializer_class = StoryJobSerializer
 
 class VoiceUploadView(APIView):
     """Handle voice file uploads and transcription"""
@@ -151,63 +537,164 @@ class FavoriteStoryView(APIView):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class StartListeningView(APIView):
+    """Open a listening session for a story; the player then reports progress to it"""
+    
+    def post(self, request, story_id):
+        try:
+            # Get or create demo user
+            user, created = User.objects.get_or_create(
+                username='demo_user',
+                defaults={'email': 'demo@vocaltales.com'}
+            )
+            
+            if not GeneratedStory.objects.filter(id=story_id).exists():
+                return Response({
+                    'success': False,
+                    'error': 'Story not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            session = StorySession.objects.create(user=user, story_id=story_id)
+            remember_session(session.pk)
+            
+            return Response({
+                'success': True,
+                'session_id': session.pk,
+                'progress_url': reverse('stories:listening_progress', args=[session.pk])
+            }, status=status.HTTP_201_CREATED)
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ListeningProgressView(APIView):
+    """Player heartbeat; buffered and written to the session in batches"""
+    
+    def post(self, request, pk):
+        serializer = ListeningProgressSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            if not session_exists(pk):
+                return Response({
+                    'success': False,
+                    'error': 'Listening session not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+            
+            progress = serializer.validated_data
+            position = record_progress(
+                pk, int(progress['position']), completed=progress['completed'], rating=progress['rating']
+            )
+            
+            return Response({
+                'success': True,
+                'duration_listened': position
+            }, status=status.HTTP_202_ACCEPTED)
+            
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def story_stats(request):
     """Get basic statistics about stories"""
     try:
-        total_stories = GeneratedStory.objects.filter(status='completed').count()
-        total_requests = StoryRequest.objects.count()
-        
+        # Served from incrementally maintained counters, not table scans
         return Response({
-            'total_stories': total_stories,
-            'total_requests': total_requests,
-            'success_rate': round((total_stories / total_requests * 100) if total_requests > 0 else 0, 2)
+            **stats_snapshot(),
+            'prompt_cache': cache_stats(),
+            'llm_rate_limit': rate_limit_stats(),
+            'llm_routing': routing_stats()
         })
     except Exception as e:
         return Response({
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class GTTSAudioView(APIView):
+@require_GET
+def metrics(request):
+    """Per-stage latency histograms, token usage and cache hit rates for Prometheus"""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@method_decorator(csrf_exempt, name='dispatch')
+class GTTSAudioView(View):
     """Generate audio using Google Text-to-Speech"""
     
-    def post(self, request):
+    async def post(self, request):
+        data = request_data(request)
         try:
-            from gtts import gTTS
-            import io
-            
-            text = request.data.get('text', '')
-            language = request.data.get('language', 'en')
+            text = data.get('text', '')
             
             if not text:
-                return Response({
+                return json_response({
                     'error': 'No text provided'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Language mapping for gTTS
-            gtts_lang_map = {
-                'hi': 'hi', 'en': 'en', 'es': 'es', 'fr': 'fr',
-                'de': 'de', 'it': 'it', 'pt': 'pt', 'zh': 'zh',
-                'ja': 'ja', 'ko': 'ko', 'ar': 'ar', 'ru': 'ru'
-            }
-            
-            gtts_lang = gtts_lang_map.get(language, 'en')
-            
-            # Generate TTS
-            tts = gTTS(text=text, lang=gtts_lang, slow=False)
+            try:
+                options = voice_options(
+                    data.get('language', 'en'),
+                    slow=data.get('slow', False),
+                    tld=data.get('tld', 'com')
+                )
+            except ValueError as e:
+                return json_response({
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Create audio file in memory
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
+            # Reuse the cached MP3 when this narration was rendered before
+            async with timed('narration_lookup'):
+                key = narration_key(text, options)
+                path = cached_narration(key)
+            await arecord_narration_event('misses' if path is None else 'hits')
             
-            # Return audio file
-            response = HttpResponse(audio_buffer.getvalue(), content_type='audio/mpeg')
-            response['Content-Disposition'] = 'inline; filename="story_audio.mp3"'
+            if path is not None:
+                response = file_response(request, path, key, 'audio/mpeg', filename='story_audio.mp3')
+            else:
+                # Stream chunks as they are synthesized; the full file is cached at the end.
+                # Over ASGI the event loop awaits the TTS pool rather than a thread per narration.
+                narrate = astream_narration if isinstance(request, ASGIRequest) else stream_narration
+                response = StreamingHttpResponse(narrate(text, options, key), content_type='audio/mpeg')
+                response['Content-Disposition'] = 'inline; filename="story_audio.mp3"'
+                response['ETag'] = f'"{key}"'
             
+            response['Content-Location'] = reverse('stories:gtts_audio_file', args=[key])
             return response
             
         except Exception as e:
-            return Response({
+            return json_response({
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@require_safe
+def static_asset(request, name):
+    """Collected static files, precompressed when the client accepts it"""
+    path = find_asset(name)
+    if path is None:
+        if settings.DEBUG:
+            # Not collected yet: serve the source file
+            return serve_uncollected(request, name)
+        raise Http404('Static file not found')
+    return asset_response(request, name, path)
+
+class GTTSAudioFileView(APIView):
+    """Serve previously rendered narration by its content hash (supports seeking)"""
+    
+    def get(self, request, key):
+        path = cached_narration(key)
+        if path is None:
+            return Response({
+                'error': 'Audio not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return file_response(
+            request, path, key, 'audio/mpeg', filename='story_audio.mp3',
+            cache_control='public, max-age=31536000, immutable'
+        )